@@ -1,13 +1,116 @@
 import os
+import re
 import json
+import time
 import hashlib
-import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
 from log.logger import logger
+from executors import SBT_NOT_FOUND, Executor, create_executor
+from profiles import (
+    BUILD_PROFILES,
+    FULL_PROFILE,
+    ensure_profile_template,
+    import_profile,
+    needs_full_profile,
+    select_build_profile,
+)
+from retry import RetryPolicy
+from shared_state import RunHistory, SharedMetrics, VerdictCache
+from timeouts import AdaptiveTimeout
+from workspace_pool import WorkspacePool, file_lock, tmpfs_root
+
+# Trivial program compiled and run at startup so that sbt boot, dependency
+# resolution and the first full compile are paid before real snippets arrive.
+WARMUP_PROGRAM = """object Main extends App {
+  println("warmup")
+}
+"""
+
+# Outcome of a snippet check, from the most to the least successful
+STATUS_PASSED = "passed"
+# Passed after failed run attempts; counts as a success
+STATUS_FLAKY = "flaky"
+STATUS_BUILD_FAILED = "build_failed"
+STATUS_RUN_FAILED = "run_failed"
+STATUS_TIMEOUT = "timeout"
+STATUS_EMPTY = "empty"
+
+PHASES = ("queue", "write", "build", "run", "total")
+
+# File locations such as "/path/Main.scala:12:5:" vary between workspaces and runs
+ERROR_LOCATION = re.compile(r"[\w./-]*\.scala:\d+(?::\d+)?:?\s*")
+ERROR_SIGNATURE_LENGTH = 120
+
+
+def snippet_status(success: bool, message: str) -> str:
+    """Classify a check verdict as passed, build/run failure, timeout or empty snippet."""
+    if success:
+        return STATUS_PASSED
+    if message.startswith("Build failed"):
+        return STATUS_BUILD_FAILED
+    if message.startswith("Run timed out"):
+        return STATUS_TIMEOUT
+    if message == "No code provided":
+        return STATUS_EMPTY
+    return STATUS_RUN_FAILED
+
+
+def error_signature(message: str) -> str:
+    """
+    Short, location independent summary of a failure message, so that failures
+    can be grouped without shipping the full compiler or runtime output.
+    """
+    lines = [line.strip() for line in message.splitlines()]
+    lines = [line for line in lines if line and line not in ("STDOUT:", "STDERR:")]
+    if not lines:
+        return ""
+    candidates = (
+        [line for line in lines if "[error]" in line]
+        or [line for line in lines if "Exception" in line or "Error" in line]
+        or lines
+    )
+    signature = candidates[0]
+    for prefix in ("Build failed:", "[error]"):
+        signature = signature.replace(prefix, "").strip()
+    signature = ERROR_LOCATION.sub("", signature)
+    return signature[:ERROR_SIGNATURE_LENGTH]
+
+
+def encode_verdicts(results) -> dict:
+    """
+    Encode `check_snippet` results column-wise: one list per field, aligned with
+    the input order, with phase timings in integer milliseconds (None when the
+    phase did not run). Clients expand them with `build_client.verdict_rows`.
+    """
+    return {
+        "conversation": [r.get("conversation") for r in results],
+        "snippet": [r.get("snippet") for r in results],
+        "status": [r["status"] for r in results],
+        "cache_hit": [r["cache_hit"] for r in results],
+        "attempts": [r.get("attempts", 0) for r in results],
+        "error": [error_signature(r["message"]) if not r["success"] else "" for r in results],
+        "timings_ms": {
+            phase: [
+                round(r["timings"][phase] * 1000) if phase in r["timings"] else None
+                for r in results
+            ]
+            for phase in PHASES
+        },
+    }
 
 
 class BuildCheckerAPI:
-    def __init__(self):
+    def __init__(
+        self,
+        pool_size: int = None,
+        state_dir: str = None,
+        executor=None,
+        tmpfs: bool = None,
+        build_profiles: bool = None,
+    ):
         self.current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         root_path = os.path.dirname(self.current_dir)
         self.output_directory = root_path + "/build_checker" + "/res/akka_placeholder"
@@ -16,14 +119,90 @@ class BuildCheckerAPI:
         root_path = Path(self.current_dir).parent
         build_checker_path = root_path / "build_checker"
         akka_project_path = build_checker_path / "res/akka_placeholder"
-        self.failing_snippets_path = (
-            build_checker_path / "res/config/failing_snippets.json"
+        self.failing_snippets_path = os.environ.get(
+            "BUILD_CHECKER_FAILING_SNIPPETS",
+            str(build_checker_path / "res/config/failing_snippets.json"),
         )
         self.main_scala_path = os.path.join(
             akka_project_path, "src/main/scala/Main.scala"
         )
 
-    def load_json_dataset(self, json_file_path) -> dict:
+        # Snippets are checked in a pool of copies of the placeholder project,
+        # leased through file locks so that several uvicorn workers can share it.
+        if pool_size is None:
+            pool_size = int(os.environ.get("BUILD_CHECKER_POOL_SIZE", "1"))
+        if tmpfs is None:
+            tmpfs = os.environ.get("BUILD_CHECKER_TMPFS", "0") == "1"
+        workspaces_root = tmpfs_root() if tmpfs else None
+        if tmpfs and workspaces_root is None:
+            logger.warning("No tmpfs mount found, keeping workspaces on disk")
+
+        # With build profiles, snippets that only use part of Akka are checked in
+        # copies of the project whose build.sbt declares only the modules they import.
+        if build_profiles is None:
+            build_profiles = os.environ.get("BUILD_CHECKER_BUILD_PROFILES", "0") == "1"
+        self.build_profiles = build_profiles
+        profile_names = list(BUILD_PROFILES) if build_profiles else [FULL_PROFILE]
+
+        self.pools = {}
+        if workspaces_root is not None:
+            # Every workspace, including its target/ directories, lives in RAM;
+            # the budget is shared evenly by the profiles
+            budget_mb = int(os.environ.get("BUILD_CHECKER_TMPFS_BUDGET_MB", "2048"))
+            for name in profile_names:
+                self.pools[name] = WorkspacePool(
+                    ensure_profile_template(
+                        str(akka_project_path), os.path.join(workspaces_root, "profiles"), name
+                    ),
+                    workspaces_root if name == FULL_PROFILE else os.path.join(workspaces_root, name),
+                    pool_size,
+                    use_template=False,
+                    budget_bytes=budget_mb * 2**20 // len(profile_names),
+                )
+        else:
+            # With BUILD_CHECKER_WORKSPACES_DIR, every workspace is a copy made there
+            # and the placeholder project itself is never written to
+            workspaces_dir = os.environ.get("BUILD_CHECKER_WORKSPACES_DIR")
+            disk_root = workspaces_dir or str(build_checker_path / "res/workspaces")
+            for name in profile_names:
+                self.pools[name] = WorkspacePool(
+                    ensure_profile_template(
+                        str(akka_project_path), os.path.join(disk_root, "profiles"), name
+                    ),
+                    disk_root if name == FULL_PROFILE else os.path.join(disk_root, name),
+                    pool_size,
+                    use_template=workspaces_dir is None,
+                )
+        self.pool = self.pools[FULL_PROFILE]
+        self.pool_size = self.pool.size
+
+        # Backend that compiles and runs the workspaces (cold sbt, warm sbt, java, ...)
+        self.executor = (
+            executor if isinstance(executor, Executor) else create_executor(executor)
+        )
+
+        # Verdict cache and metrics live in SQLite so every worker process shares them
+        if state_dir is None:
+            state_dir = os.environ.get(
+                "BUILD_CHECKER_STATE_DIR", str(build_checker_path / "res/state")
+            )
+        self.verdict_cache = VerdictCache(os.path.join(state_dir, "verdicts.sqlite"))
+        self.metrics = SharedMetrics(os.path.join(state_dir, "metrics.sqlite"))
+
+        # Run timeouts adapt to how long similar snippets took to succeed
+        self.run_history = RunHistory(os.path.join(state_dir, "run_history.sqlite"))
+        self.run_timeouts = AdaptiveTimeout(self.run_history)
+        # Run failures and timeouts may be timing dependent; compile errors never are
+        self.retry_policy = RetryPolicy(retry_on=(STATUS_RUN_FAILED, STATUS_TIMEOUT))
+
+        # Readiness: without a warmup phase the checker is ready (but cold)
+        self.warming_up = False
+        self.warm = False
+        self.warmup_seconds = None
+        self.warmup_error = None
+
+    @staticmethod
+    def load_json_dataset(json_file_path) -> dict:
         if not os.path.exists(json_file_path):
             logger.error(f"The file '{json_file_path}' does not exist.")
             return None
@@ -51,58 +230,81 @@ class BuildCheckerAPI:
     def process_snippets(self, dataset, build_flag, run_flag, use_hashes=False):
         if not dataset:
             return False, "No dataset provided"
+        report = self.validate_dataset(dataset, build_flag, run_flag, use_hashes)
+        return report["successful_runs"], report["total_snippets"]
 
+    def validate_dataset(self, dataset, build_flag, run_flag, use_hashes=False) -> dict:
+        """
+        Check every assistant snippet of a conversation dataset.
+
+        Returns:
+            dict: `successful_runs`, `total_snippets` and `verdicts`, the per-snippet
+            results in input order encoded column-wise (see `encode_verdicts`).
+        """
         processed_hashes = self._load_processed_hashes() if use_hashes else set()
-        successful_runs = 0
-        total_snippets = 0
+        snippets = self.dataset_snippets(dataset)
+        results = self.check_snippets(snippets, build_flag, run_flag)
         failing_snippets = []
-
-        for idx, conversation in enumerate(dataset):
-            assistant_msgs, human_prompts = self._get_prompt_and_code(conversation)
-            is_multi_snippet = len(assistant_msgs) > 1
-
-            if is_multi_snippet:
-                logger.info(
-                    f"\nProcessing multi-snippet conversation {idx} ({len(assistant_msgs)} snippets)"
+        for snippet, result in zip(snippets, results):
+            result["conversation"] = snippet["idx"]
+            result["snippet"] = snippet["position"]
+            if not result["success"]:
+                failing_snippets.append(
+                    {
+                        "idx": snippet["idx"],
+                        "prompt": snippet["prompt"],
+                        "code": snippet["code"],
+                        "error": result["message"],
+                    }
                 )
-            else:
-                logger.info(f"\nProcessing single-snippet conversation {idx}")
-
-            for snippet_idx, (code, prompt) in enumerate(
-                zip(assistant_msgs, human_prompts)
-            ):
-                if is_multi_snippet:
-                    logger.info(
-                        f"Testing snippet {snippet_idx + 1}/{len(assistant_msgs)}"
-                    )
-                    logger.info(f"Context up to this point:\n{prompt}")
-
-                logger.debug(f"Processing code:\n{code}")
-
-                success, msg = self.test_single_snippet(
-                    code,
-                    build_flag,
-                    run_flag,
-                    idx=idx,
-                    prompt=prompt,
-                    snippet_idx=snippet_idx if is_multi_snippet else None,
-                )
-                if success:
-                    successful_runs += 1
-                else:
-                    failing_snippets.append(
-                        {"idx": idx, "prompt": prompt, "code": code, "error": msg}
-                    )
-                total_snippets += 1
 
         self._save_failing_snippets(failing_snippets)
-        return successful_runs, total_snippets
+        successful_runs = sum(result["success"] for result in results)
+        return {
+            "successful_runs": successful_runs,
+            "total_snippets": len(results),
+            "verdicts": encode_verdicts(results),
+        }
 
     def test_single_snippet(
         self, code: str, build=True, run=True, idx=None, prompt=None, snippet_idx=None
     ) -> tuple[bool, str]:
+        result = self.check_snippet(code, build, run, idx, prompt, snippet_idx)
+        return result["success"], result["message"]
+
+    def check_snippet(
+        self,
+        code: str,
+        build=True,
+        run=True,
+        idx=None,
+        prompt=None,
+        snippet_idx=None,
+        use_cache=True,
+    ) -> dict:
+        """
+        Check a single snippet and report how long each phase took.
+
+        Returns:
+            dict: `success`, `message`, `status` (see `snippet_status`), `cache_hit`,
+            `profile` (the build profile that gave the verdict) and `timings`, the seconds spent in each phase (`queue`, `write`,
+            `build`, `run`, `total`).
+        """
+        start = time.perf_counter()
+        timings = {}
+        result = {
+            "success": False,
+            "message": "",
+            "status": STATUS_EMPTY,
+            "cache_hit": False,
+            "profile": None,
+            "attempts": 0,
+            "flaky": False,
+            "timings": timings,
+        }
         if not code.strip():
-            return False, "No code provided"
+            result["message"] = "No code provided"
+            return result
 
         # Clean up and unwrap the code instead of just removing special tokens
         code = self.clean_and_unwrap_code(code)
@@ -116,26 +318,185 @@ class BuildCheckerAPI:
 
         # Log only first 100 chars if single snippet, otherwise log the differential prompt
         if snippet_idx is None:
-            logger.info(f"Prompt: {prompt[:100]}...")
+            logger.info(f"Prompt: {(prompt or '')[:100]}...")
         else:
             # Get just the last human message from the conversation context
             last_prompt = prompt.split("Human: ")[-1]
             logger.info(f"Current prompt: {last_prompt}")
 
-        with open(self.main_scala_path, "w") as f:
+        cache_key = self._verdict_key(code, build, run, self.executor.name)
+        if use_cache and (build or run):
+            cached = self.verdict_cache.get(cache_key)
+            self.metrics.incr("cache_lookups")
+            if cached is not None:
+                self.metrics.incr("cache_hits")
+                logger.info(f"Cached verdict for {snippet_info}")
+                result["success"], result["message"], result["flaky"] = cached
+                result["status"] = (
+                    STATUS_FLAKY if result["flaky"] else snippet_status(*cached[:2])
+                )
+                result["cache_hit"] = True
+                timings["total"] = time.perf_counter() - start
+                return result
+
+        profile = select_build_profile(code) if self.build_profiles else FULL_PROFILE
+        while True:
+            queued = time.perf_counter()
+            with self._acquire_workspace(profile) as workspace:
+                timings["queue"] = time.perf_counter() - queued
+                success, msg, run_outcomes = self._check_snippet(
+                    workspace, code, build, run, idx, prompt, snippet_info, timings
+                )
+            # A reduced profile may lack a module the snippet reaches in a way the
+            # import scan missed; the full profile gives the authoritative verdict
+            if success or profile == FULL_PROFILE or not needs_full_profile(msg):
+                break
+            logger.info(f"Checking {snippet_info} again with the full build profile")
+            self.metrics.incr("profile_fallbacks")
+            profile = FULL_PROFILE
+
+        # Runs that both passed and failed depend on timing, not on the code alone
+        flaky = True in run_outcomes and False in run_outcomes
+        if (build or run) and not msg.endswith(SBT_NOT_FOUND):
+            self.verdict_cache.put(cache_key, success, msg, flaky)
+            self.metrics.incr("snippets_checked")
+            self.metrics.incr("snippets_passed" if success else "snippets_failed")
+            if flaky:
+                self.metrics.incr("snippets_flaky")
+
+        result["success"], result["message"] = success, msg
+        result["status"] = STATUS_FLAKY if flaky else snippet_status(success, msg)
+        result["attempts"] = len(run_outcomes)
+        result["flaky"] = flaky
+        result["profile"] = profile
+        timings["total"] = time.perf_counter() - start
+        return result
+
+    def check_snippets(self, snippets, build=True, run=True, use_cache=True) -> list:
+        """
+        Check a batch of snippets, spreading them over the workspace pool.
+
+        Args:
+            snippets: list of dicts with `code` and optionally `prompt`, and the
+                `idx` / `snippet_idx` of the snippet in its dataset.
+
+        Returns:
+            list: one `check_snippet` result per snippet, in the same order.
+        """
+        results = [None] * len(snippets)
+        for position, result in self.iter_check_snippets(snippets, build, run, use_cache):
+            results[position] = result
+        return results
+
+    def iter_check_snippets(self, snippets, build=True, run=True, use_cache=True):
+        """
+        Check snippets like `check_snippets`, yielding `(position, result)` pairs
+        as soon as each one is checked. Snippets not started yet are cancelled
+        when the generator is closed.
+        """
+        def check(position):
+            snippet = snippets[position]
+            return self.check_snippet(
+                snippet["code"],
+                build,
+                run,
+                idx=snippet.get("idx", position),
+                prompt=snippet.get("prompt"),
+                snippet_idx=snippet.get("snippet_idx"),
+                use_cache=use_cache,
+            )
+
+        if self.pool_size == 1 or len(snippets) < 2:
+            for position in range(len(snippets)):
+                yield position, check(position)
+            return
+        executor = ThreadPoolExecutor(max_workers=self.pool_size)
+        try:
+            futures = {
+                executor.submit(check, position): position for position in range(len(snippets))
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def dataset_snippets(self, dataset) -> list:
+        """
+        Assistant snippets of a conversation dataset, in order, as dicts with the
+        `code`, its `prompt` (the human messages so far), the `question` it
+        answers (the last human message), the conversation `idx`, its `position`
+        in the conversation and `snippet_idx` (None for single-snippet ones).
+        Conversations without human messages, such as the generated samples of
+        evaluation results, yield their code with an empty prompt and question.
+        """
+        snippets = []
+        for idx, conversation in enumerate(dataset or []):
+            assistant_msgs, human_prompts = self._get_prompt_and_code(conversation)
+            questions = [
+                msg["value"]
+                for msg in conversation.get("conversations", [])
+                if msg.get("from") == "human"
+            ]
+            if not human_prompts:
+                human_prompts = questions = [""] * len(assistant_msgs)
+            is_multi_snippet = len(assistant_msgs) > 1
+            for position, (code, prompt, question) in enumerate(
+                zip(assistant_msgs, human_prompts, questions)
+            ):
+                snippets.append(
+                    {
+                        "code": code,
+                        "prompt": prompt,
+                        "question": question,
+                        "idx": idx,
+                        "position": position,
+                        "snippet_idx": position if is_multi_snippet else None,
+                    }
+                )
+        return snippets
+
+    def check_batch(self, snippets, build=True, run=True, use_cache=True) -> dict:
+        """Check a batch of snippets and summarize it as the `/check-batch` response."""
+        results = self.check_snippets(snippets, build, run, use_cache)
+        verdicts = [
+            {
+                "success": r["success"],
+                "message": r["message"],
+                "status": r["status"],
+                "error": error_signature(r["message"]) if not r["success"] else "",
+                "cache_hit": r["cache_hit"],
+            }
+            for r in results
+        ]
+        return {
+            "results": verdicts,
+            "successful_runs": sum(v["success"] for v in verdicts),
+            "total_snippets": len(verdicts),
+        }
+
+    def _check_snippet(
+        self, workspace, code, build, run, idx, prompt, snippet_info, timings
+    ):
+        phase_start = time.perf_counter()
+        with open(workspace.main_scala_path, "w") as f:
             f.write(code)
-            logger.debug(f"Wrote code to {self.main_scala_path}")
+            logger.debug(f"Wrote code to {workspace.main_scala_path}")
+        timings["write"] = time.perf_counter() - phase_start
 
         logger.debug(f"Processing code:\n{code}")
 
         if build:
-            build_success, build_msg = self.build_project()
+            phase_start = time.perf_counter()
+            build_success, build_msg = self.build_project(workspace.path)
+            timings["build"] = time.perf_counter() - phase_start
             if not build_success:
                 logger.error(f"Build failed for {snippet_info}")
-                return False, f"Build failed: {build_msg}"
+                return False, f"Build failed: {build_msg}", []
 
         if run:
-            success, msg, stdout = self.run_project()  # Modified to return stdout
+            success, msg, stdout, run_outcomes = self._run_with_retries(
+                workspace, code, snippet_info, timings
+            )
             if not success:
                 logger.error(f"Run failed for {snippet_info}")
                 logger.error(f"Run output: {msg}")
@@ -150,48 +511,164 @@ class BuildCheckerAPI:
                 self._save_failing_snippet(failing_snippet)
             else:
                 logger.info(f"Successfully ran {snippet_info}")
-            return success, msg
+            return success, msg, run_outcomes
 
-        return True, "Code written successfully"
+        return True, "Code written successfully", []
 
-    def build_project(self) -> tuple[bool, str]:
-        try:
-            result = subprocess.run(
-                ["sbt", "compile"],
-                cwd=self.output_directory,
-                check=True,
-                capture_output=True,
-                text=True,
+    def _run_with_retries(self, workspace, code, snippet_info, timings):
+        """
+        Run the workspace, retrying run failures and timeouts as the retry policy
+        allows. Timed out runs are retried with twice the timeout (up to the cap).
+
+        Returns:
+            tuple: `(success, message, stdout, outcomes)` of the last attempt, with
+            `outcomes` the success of every attempt.
+        """
+        profile = import_profile(code)
+        timeout = self.run_timeouts.timeout_for(self.executor.name, profile)
+        outcomes = []
+        timings["run"] = 0.0
+        while True:
+            phase_start = time.perf_counter()
+            success, msg, stdout = self.run_project(workspace.path, timeout)  # Modified to return stdout
+            duration = time.perf_counter() - phase_start
+            timings["run"] += duration
+            if msg.endswith(SBT_NOT_FOUND):
+                return success, msg, stdout, outcomes
+            self.run_history.record(
+                self.executor.name,
+                profile,
+                "" if success else error_signature(msg),
+                success,
+                duration,
             )
-            return True, result.stdout
-        except subprocess.CalledProcessError as e:
-            error_msg = e.stderr
-            logger.error(f"Build error: {error_msg}")
-            return False, error_msg
-        except FileNotFoundError as e:
-            logger.error(f"Build error: {e}")
-            return False, "sbt not found"
-
-    def run_project(self) -> tuple[bool, str, str]:  # Modified return type
-        try:
-            result = subprocess.run(
-                ["sbt", "run"],
-                cwd=self.output_directory,
-                capture_output=True,
-                text=True,
-                check=True,
+            outcomes.append(success)
+
+            status = snippet_status(success, msg)
+            if success or not self.retry_policy.should_retry(status, msg, len(outcomes)):
+                return success, msg, stdout, outcomes
+            if status == STATUS_TIMEOUT:
+                timeout = min(timeout * 2, self.run_timeouts.max_timeout)
+            logger.warning(
+                f"Run {status} for {snippet_info}, retry {len(outcomes)}/{self.retry_policy.max_retries}"
             )
-            logger.info("Successfully ran snippet")
-            return True, result.stdout, result.stdout
-        except subprocess.CalledProcessError as e:
-            # Include both stderr and stdout in error output for better debugging
-            error_msg = f"STDOUT:\n{e.stdout}\nSTDERR:\n{e.stderr}"
-            logger.error(f"Run error: {error_msg}")
-            return False, error_msg, e.stdout  # Return stdout separately
-        except FileNotFoundError:
-            error_msg = "sbt not found"
-            logger.error(error_msg)
-            return False, error_msg, ""
+            self.metrics.incr("run_retries")
+            time.sleep(self.retry_policy.delay(len(outcomes)))
+
+    def warmup(self) -> bool:
+        """
+        Compile and run a trivial program so that sbt, the dependency set and the
+        compiler are loaded before the first real snippet is checked.
+
+        Returns:
+            bool: True if the warmup program compiled and ran successfully, or
+            if every workspace was leased by another worker.
+        """
+        self.warming_up = True
+        logger.info(
+            f"Warming up {self.pool_size} workspace(s) per build profile "
+            f"({', '.join(self.pools)})..."
+        )
+        start = time.perf_counter()
+        success, msg = True, ""
+        warmed = 0
+        try:
+            workspaces = [
+                (pool, workspace) for pool in self.pools.values() for workspace in pool.workspaces
+            ]
+            for pool, workspace in workspaces:
+                with pool.try_lease(workspace) as leased:
+                    # A workspace leased by another worker is already being used
+                    if leased is None:
+                        continue
+                    with open(leased.main_scala_path, "w") as f:
+                        f.write(WARMUP_PROGRAM)
+                    success, msg = self.build_project(leased.path)
+                    if success:
+                        success, msg, _ = self.run_project(leased.path)
+                    warmed += success
+                if not success:
+                    break
+        except Exception as e:
+            success, msg = False, str(e)
+        finally:
+            self.warming_up = False
+
+        self.warmup_seconds = time.perf_counter() - start
+        # Workspaces warmed by other workers do not make this one's executor warm
+        self.warm = success and warmed > 0
+        self.warmup_error = None if success else msg
+        if success and not warmed:
+            logger.info("Every workspace is leased by another worker, nothing to warm up")
+        elif success:
+            logger.info(f"Warmup completed in {self.warmup_seconds:.2f}s")
+        else:
+            logger.error(f"Warmup failed after {self.warmup_seconds:.2f}s: {msg}")
+        return success
+
+    def start_warmup(self) -> threading.Thread:
+        """Run the warmup in the background; the checker reports not ready until it ends."""
+        self.warming_up = True
+        thread = threading.Thread(target=self.warmup, name="warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def readiness(self) -> dict:
+        """
+        Report whether the checker can take load, with its capacity and cache stats.
+        Counters and queue depth are aggregated over every worker process.
+        """
+        counters = self.metrics.counters()
+        lookups = counters.get("cache_lookups", 0)
+        hit_rate = counters.get("cache_hits", 0) / lookups if lookups else 0.0
+        return {
+            "ready": not self.warming_up and self.warmup_error is None,
+            "warm": self.warm,
+            "warmup_seconds": self.warmup_seconds,
+            "warmup_error": self.warmup_error,
+            "executor": self.executor.name,
+            "pool_size": self.pool_size,
+            "workspace_root": self.pool.root_dir,
+            "workspace_usage_mb": (
+                sum(pool.usage_bytes or 0 for pool in self.pools.values()) / 2**20
+                if any(pool.usage_bytes is not None for pool in self.pools.values())
+                else None
+            ),
+            "build_profiles": list(self.pools),
+            "queue_depth": int(self.metrics.gauge_total("queue_depth")),
+            "cache_hit_rate": hit_rate,
+            "cache_entries": len(self.verdict_cache),
+            "snippets_checked": int(counters.get("snippets_checked", 0)),
+        }
+
+    @contextmanager
+    def _acquire_workspace(self, profile: str = FULL_PROFILE):
+        """
+        Lease a workspace of build `profile` for the duration of a build/run,
+        publishing the queue depth.
+        """
+        with self.pools[profile].lease() as workspace:
+            self.metrics.set_gauge("queue_depth", self._waiting())
+            yield workspace
+        self.metrics.set_gauge("queue_depth", self._waiting())
+
+    def _waiting(self) -> int:
+        return sum(pool.waiting for pool in self.pools.values())
+
+    @staticmethod
+    def _verdict_key(code: str, build: bool, run: bool, executor: str) -> str:
+        flags = f"executor={executor}-build={build}-run={run}"
+        return hashlib.sha256(f"{flags}\n{code}".encode("utf-8")).hexdigest()
+
+    def build_project(self, project_dir: str = None) -> tuple[bool, str]:
+        return self.executor.build(project_dir or self.output_directory)
+
+    def run_project(self, project_dir: str = None, timeout: float = None) -> tuple[bool, str, str]:
+        return self.executor.run(project_dir or self.output_directory, timeout)
+
+    def close(self) -> None:
+        """Shut down long-lived executor resources such as warm sbt servers."""
+        self.executor.close()
 
     def evaluate_generated_code(self, dataset_path, run_flag) -> tuple:
         dataset = self.load_json_dataset(dataset_path)
@@ -202,7 +679,7 @@ class BuildCheckerAPI:
         return self.__calc_working_code_samples(dataset, run_flag)
 
     def __calc_working_code_samples(self, dataset, run_flag):
-        from retrieve_model_output import extract_prompt_and_code
+        from retrieve_model_output import extract_result_prompt_and_code
 
         if dataset is None:
             logger.error("No dataset file provided. Stopping further processing.")
@@ -212,8 +689,7 @@ class BuildCheckerAPI:
         results = dataset["detailed_results"]
         dataset_len = dataset["training_dataset_size"]
         for chat in results:
-            generated = chat["generated"]
-            prompt, code = extract_prompt_and_code(generated)
+            prompt, code = extract_result_prompt_and_code(chat)
             # Code cleaning is already integrated here, no changes needed
             code = self.clean_and_unwrap_code(code)
 
@@ -237,11 +713,16 @@ class BuildCheckerAPI:
         return set()
 
     def _save_failing_snippets(self, snippets):
-        with open(self.failing_snippets_path, "w") as f:
-            json.dump(snippets, f, indent=2)
+        with file_lock(f"{self.failing_snippets_path}.lock"):
+            with open(self.failing_snippets_path, "w") as f:
+                json.dump(snippets, f, indent=2)
 
     def _save_failing_snippet(self, snippet):
         """Save a single failing snippet by appending it to the failing_snippets.json file"""
+        with file_lock(f"{self.failing_snippets_path}.lock"):
+            self._append_failing_snippet(snippet)
+
+    def _append_failing_snippet(self, snippet):
         failing_snippets = []
         if os.path.exists(self.failing_snippets_path):
             with open(self.failing_snippets_path, "r") as f:
@@ -255,7 +736,8 @@ class BuildCheckerAPI:
         with open(self.failing_snippets_path, "w") as f:
             json.dump(failing_snippets, f, indent=2)
 
-    def _get_prompt_and_code(self, conversation):
+    @staticmethod
+    def _get_prompt_and_code(conversation):
         """Get all prompts and responses from a conversation, combining previous context"""
         messages = conversation.get("conversations", [])
         prompts = []
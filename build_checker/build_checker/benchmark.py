@@ -0,0 +1,409 @@
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+import resource
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from log.logger import logger
+from executors import EXECUTORS, create_executor
+from stats import percentile
+from workspace_pool import WorkspacePool
+
+BUILD_CHECKER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(BUILD_CHECKER_DIR)
+TEMPLATE_DIR = os.path.join(BUILD_CHECKER_DIR, "res/akka_placeholder")
+WORKSPACES_DIR = os.path.join(BUILD_CHECKER_DIR, "res/workspaces")
+BACKEND_CORPUS_PATH = os.path.join(BUILD_CHECKER_DIR, "res/bench/backend_corpus.json")
+BASELINE_DIR = os.path.join(BUILD_CHECKER_DIR, "res/bench")
+
+# Recorded snippets replayed by default: past failures, the training set and
+# the responses generated in the Qwen notebooks
+DEFAULT_REPLAY_SOURCES = [
+    os.path.join(BUILD_CHECKER_DIR, "res/config/failing_snippets.json"),
+    os.path.join(ROOT_DIR, "llama_finetune/res/data/dataset_llama.json"),
+    *sorted(glob.glob(os.path.join(ROOT_DIR, "qwen_notebooks/*generated_responses*.json"))),
+]
+
+PHASES = ("queue", "write", "build", "run", "total")
+
+
+def summarize_latencies(latencies) -> dict:
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+        "max": max(latencies) if latencies else 0.0,
+    }
+
+
+def load_backend_corpus(corpus_path: str = BACKEND_CORPUS_PATH) -> list:
+    with open(corpus_path) as f:
+        return json.load(f)
+
+
+def benchmark_backend(executor, corpus, workspace, repeats=3, warmup=True, timeout=None) -> dict:
+    """
+    Build and run every snippet of `corpus` `repeats` times in `workspace`.
+
+    The first build/run of a backend pays for its startup (sbt boot, compile
+    server, ...); it is measured separately as `cold_start_seconds` and excluded
+    from the steady-state statistics unless `warmup` is off.
+    """
+    cold_start = None
+    if warmup:
+        start = time.perf_counter()
+        _check(executor, workspace, corpus[0]["code"], timeout)
+        cold_start = time.perf_counter() - start
+
+    latencies, build_latencies, run_latencies = [], [], []
+    mismatches = []
+    wall_start = time.perf_counter()
+    for _ in range(repeats):
+        for snippet in corpus:
+            success, build_seconds, run_seconds = _check(
+                executor, workspace, snippet["code"], timeout
+            )
+            build_latencies.append(build_seconds)
+            run_latencies.append(run_seconds)
+            latencies.append(build_seconds + run_seconds)
+            if "expected" in snippet and success != snippet["expected"]:
+                mismatches.append(snippet["name"])
+    wall_seconds = time.perf_counter() - wall_start
+
+    return {
+        "executor": executor.name,
+        "snippets": len(latencies),
+        "wall_seconds": wall_seconds,
+        "snippets_per_sec": len(latencies) / wall_seconds if wall_seconds else 0.0,
+        "cold_start_seconds": cold_start,
+        "latency": summarize_latencies(latencies),
+        "build_latency": summarize_latencies(build_latencies),
+        "run_latency": summarize_latencies(run_latencies),
+        "verdict_mismatches": sorted(set(mismatches)),
+    }
+
+
+def _check(executor, workspace, code, timeout):
+    with open(workspace.main_scala_path, "w") as f:
+        f.write(code)
+    start = time.perf_counter()
+    success, _ = executor.build(workspace.path)
+    build_seconds = time.perf_counter() - start
+    run_seconds = 0.0
+    if success:
+        start = time.perf_counter()
+        success, _, _ = executor.run(workspace.path, timeout)
+        run_seconds = time.perf_counter() - start
+    return success, build_seconds, run_seconds
+
+
+def run_backend_benchmark(names, corpus_path=BACKEND_CORPUS_PATH, repeats=3, warmup=True, timeout=None) -> list:
+    """Benchmark each available backend in `names` on the bundled snippet corpus."""
+    corpus = load_backend_corpus(corpus_path)
+    pool = WorkspacePool(TEMPLATE_DIR, WORKSPACES_DIR)
+    results = []
+    for name in names:
+        executor = create_executor(name)
+        if not executor.available():
+            logger.warning(f"Skipping {name}: required tools are not installed")
+            continue
+        logger.info(f"Benchmarking {name} backend...")
+        try:
+            with pool.lease() as workspace:
+                results.append(
+                    benchmark_backend(executor, corpus, workspace, repeats, warmup, timeout)
+                )
+        finally:
+            executor.close()
+    return results
+
+
+def load_recorded_snippets(paths, limit=None) -> list:
+    """
+    Load `{source, prompt, code}` records from recorded files: conversation
+    datasets, evaluation results (`detailed_results`) and failing snippet dumps.
+    """
+    from api import BuildCheckerAPI
+
+    snippets = []
+    for path in paths:
+        data = BuildCheckerAPI.load_json_dataset(path)
+        if not data:
+            continue
+        source = os.path.basename(path)
+        for entry in data:
+            if "code" in entry:
+                snippets.append(
+                    {"source": source, "prompt": entry.get("prompt"), "code": entry["code"]}
+                )
+                continue
+            codes, prompts = BuildCheckerAPI._get_prompt_and_code(entry)
+            prompts += [None] * (len(codes) - len(prompts))
+            for code, prompt in zip(codes, prompts):
+                snippets.append({"source": source, "prompt": prompt, "code": code})
+    return snippets[:limit] if limit else snippets
+
+
+def replay_benchmark(api, snippets, concurrency=1, build=False, run=True, use_cache=False) -> dict:
+    """
+    Replay `snippets` through `api.check_snippet` from `concurrency` threads and
+    report throughput, per-phase latency percentiles and peak RSS.
+    """
+
+    def check(snippet):
+        return api.check_snippet(
+            snippet["code"], build, run, prompt=snippet["prompt"], use_cache=use_cache
+        )
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(check, snippets))
+    wall_seconds = time.perf_counter() - wall_start
+
+    phases = {}
+    for phase in PHASES:
+        values = [r["timings"][phase] for r in results if phase in r["timings"]]
+        if values:
+            phases[phase] = summarize_latencies(values)
+
+    return {
+        "executor": api.executor.name,
+        "concurrency": concurrency,
+        "snippets": len(results),
+        "passed": sum(r["success"] for r in results),
+        "cache_hits": sum(r["cache_hit"] for r in results),
+        "wall_seconds": wall_seconds,
+        "snippets_per_sec": len(results) / wall_seconds if wall_seconds else 0.0,
+        "phases": phases,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_child_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+
+def compare_to_baseline(report, baseline, max_regression=0.1, min_seconds=0.01) -> list:
+    """
+    List the regressions of `report` against `baseline`: a throughput drop or a
+    p95 phase latency increase larger than `max_regression` (a fraction).
+    Latency changes smaller than `min_seconds` are treated as noise.
+    """
+    regressions = []
+    floor = baseline["snippets_per_sec"] * (1 - max_regression)
+    if report["snippets_per_sec"] < floor:
+        regressions.append(
+            f"throughput {report['snippets_per_sec']:.2f} snippets/s "
+            f"< {floor:.2f} (baseline {baseline['snippets_per_sec']:.2f})"
+        )
+    for phase, stats in baseline.get("phases", {}).items():
+        if phase not in report["phases"]:
+            continue
+        current, previous = report["phases"][phase]["p95"], stats["p95"]
+        if current > previous * (1 + max_regression) and current - previous > min_seconds:
+            regressions.append(
+                f"{phase} p95 {current:.3f}s > {previous * (1 + max_regression):.3f}s "
+                f"(baseline {previous:.3f}s)"
+            )
+    return regressions
+
+
+def print_replay_report(report) -> None:
+    print(
+        f"\n{report['snippets']} snippets ({report['passed']} passed, "
+        f"{report['cache_hits']} cache hits) with {report['executor']} "
+        f"at concurrency {report['concurrency']}"
+    )
+    print(f"Throughput: {report['snippets_per_sec']:.2f} snippets/s "
+          f"({report['wall_seconds']:.2f}s wall)")
+    print(f"\n{'phase':<8}{'p50 s':>10}{'p95 s':>10}{'p99 s':>10}{'max s':>10}")
+    for phase, stats in report["phases"].items():
+        print(
+            f"{phase:<8}{stats['p50']:>10.3f}{stats['p95']:>10.3f}"
+            f"{stats['p99']:>10.3f}{stats['max']:>10.3f}"
+        )
+    print(
+        f"\nPeak RSS: {report['peak_rss_mb']:.1f} MiB (checker), "
+        f"{report['peak_child_rss_mb']:.1f} MiB (largest build/run process)"
+    )
+
+
+def print_backend_report(results) -> None:
+    print(
+        f"\n{'backend':<16}{'snip/s':>9}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}"
+        f"{'run p50':>9}{'cold s':>9}  verdicts"
+    )
+    for r in results:
+        cold = f"{r['cold_start_seconds']:.2f}" if r["cold_start_seconds"] is not None else "-"
+        verdicts = "ok" if not r["verdict_mismatches"] else ", ".join(r["verdict_mismatches"])
+        print(
+            f"{r['executor']:<16}{r['snippets_per_sec']:>9.2f}{r['latency']['p50']:>9.2f}"
+            f"{r['latency']['p95']:>9.2f}{r['latency']['p99']:>9.2f}"
+            f"{r['run_latency']['p50']:>9.2f}{cold:>9}  {verdicts}"
+        )
+
+    # Both launch java on the same classpath; the difference is JVM startup
+    by_name = {r["executor"]: r for r in results}
+    if "direct_java" in by_name and "appcds" in by_name:
+        plain = by_name["direct_java"]["run_latency"]["p50"]
+        tuned = by_name["appcds"]["run_latency"]["p50"]
+        print(
+            f"\nJVM startup with class data sharing: run p50 {tuned:.2f}s vs {plain:.2f}s "
+            f"({tuned - plain:+.2f}s)"
+        )
+
+    # Only backends that agree with the expected verdicts are eligible
+    eligible = [r for r in results if not r["verdict_mismatches"] and r["executor"] != "fake"]
+    if eligible:
+        best = max(eligible, key=lambda r: r["snippets_per_sec"])
+        print(f"\nFastest backend on this machine: {best['executor']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build checker benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backends = subparsers.add_parser(
+        "backends", help="Compare execution backends on a fixed snippet corpus"
+    )
+    backends.add_argument(
+        "--executors",
+        type=str,
+        default=",".join(name for name in EXECUTORS if name != "fake"),
+        help="Comma separated list of backends to compare",
+    )
+    backends.add_argument("--corpus", type=str, default=BACKEND_CORPUS_PATH)
+    backends.add_argument("--repeats", type=int, default=3)
+    backends.add_argument("--timeout", type=float, default=None)
+    backends.add_argument(
+        "--no-warmup", action="store_true", help="Include the cold start in the statistics"
+    )
+    backends.add_argument("--output", type=str, default=None, help="Write results as JSON")
+
+    replay = subparsers.add_parser(
+        "replay", help="Replay recorded snippets through BuildCheckerAPI"
+    )
+    replay.add_argument(
+        "--sources",
+        nargs="+",
+        default=DEFAULT_REPLAY_SOURCES,
+        help="Recorded snippet files (datasets, evaluation results, failing snippets)",
+    )
+    replay.add_argument("--limit", type=int, default=None, help="Replay at most N snippets")
+    replay.add_argument("--concurrency", type=int, default=1)
+    replay.add_argument("--executor", choices=sorted(EXECUTORS), default=None)
+    replay.add_argument("--build", action="store_true", help="Build before running")
+    replay.add_argument("--no-run", action="store_true", help="Only build the snippets")
+    replay.add_argument(
+        "--use-cache", action="store_true", help="Consult the verdict cache"
+    )
+    replay.add_argument("--fake-build-latency", type=float, default=0.05)
+    replay.add_argument("--fake-run-latency", type=float, default=0.1)
+    replay.add_argument(
+        "--baseline",
+        type=str,
+        default=None,
+        help="Baseline JSON (default: res/bench/replay_baseline_<executor>.json)",
+    )
+    replay.add_argument(
+        "--save-baseline", action="store_true", help="Store this run as the new baseline"
+    )
+    replay.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.1,
+        help="Allowed relative throughput drop / p95 increase before failing",
+    )
+    replay.add_argument("--output", type=str, default=None, help="Write the report as JSON")
+    replay.add_argument("--verbose", action="store_true", help="Keep per-snippet logs")
+
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        sys.exit(run_replay(args))
+
+    if args.command == "backends":
+        results = run_backend_benchmark(
+            args.executors.split(","),
+            args.corpus,
+            args.repeats,
+            warmup=not args.no_warmup,
+            timeout=args.timeout,
+        )
+        print_backend_report(results)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+
+
+def run_replay(args) -> int:
+    from api import BuildCheckerAPI
+
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+
+    options = {}
+    if args.executor == "fake":
+        options = {
+            "build_latency": args.fake_build_latency,
+            "run_latency": args.fake_run_latency,
+        }
+    executor = create_executor(args.executor, **options)
+    snippets = load_recorded_snippets(args.sources, args.limit)
+    if not snippets:
+        print("No snippets found in the given sources")
+        return 1
+
+    # Keep the benchmark's verdicts and failures out of the server state
+    with tempfile.TemporaryDirectory() as state_dir:
+        api = BuildCheckerAPI(
+            pool_size=args.concurrency, state_dir=state_dir, executor=executor
+        )
+        api.failing_snippets_path = os.path.join(state_dir, "failing_snippets.json")
+        try:
+            report = replay_benchmark(
+                api,
+                snippets,
+                args.concurrency,
+                build=args.build,
+                run=not args.no_run,
+                use_cache=args.use_cache,
+            )
+        finally:
+            api.close()
+
+    print_replay_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    baseline_path = args.baseline or os.path.join(
+        BASELINE_DIR, f"replay_baseline_{report['executor']}.json"
+    )
+    if args.save_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print(f"\nNo baseline at {baseline_path}; run with --save-baseline to create one")
+        return 0
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(report, baseline, args.max_regression)
+    if regressions:
+        print("\nRegressions against baseline:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+    print(f"\nNo regression against {baseline_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    main()
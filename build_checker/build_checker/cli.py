@@ -0,0 +1,282 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+
+# The build checker modules use flat imports (`from api import ...`): make them
+# resolvable when this runs as the `build-checker` script of the installed package
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api import BuildCheckerAPI, error_signature
+from executors import EXECUTORS
+from log.logger import logger
+
+# Exit codes: thresholds are checked only once every snippet has a verdict
+EXIT_OK = 0
+EXIT_THRESHOLD = 1
+EXIT_USAGE = 2
+
+
+def snippet_key(snippet: dict, build: bool, run: bool) -> str:
+    """Identity of a snippet check in the checkpoint file."""
+    content = f"{snippet['prompt']}\0{snippet['code']}\0build={build}-run={run}"
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def load_checkpoint(path: str) -> dict:
+    """Verdicts recorded by previous runs, by snippet key. Truncated lines are skipped."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[record["key"]] = record
+    # New records start on their own line, after a truncated one if any
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+    return done
+
+
+def append_to_dataset(path: str, snippets: list, prompt_field: str = "question") -> int:
+    """
+    Append passing snippets to the conversation dataset at `path` as
+    question/answer pairs, skipping those without a question (generated samples
+    of evaluation results) and those whose question or code it already has.
+    The human message is the snippet's `prompt_field`. Returns the number of
+    conversations added.
+    """
+    dataset = []
+    if os.path.exists(path):
+        with open(path) as f:
+            dataset = json.load(f)
+    known = {
+        message.get("value")
+        for entry in dataset
+        for message in entry.get("conversations", [])
+    }
+    added = 0
+    for snippet in snippets:
+        question = snippet[prompt_field]
+        if not question or question in known or snippet["code"] in known:
+            continue
+        dataset.append(
+            {
+                "conversations": [
+                    {"from": "human", "value": question},
+                    {"from": "assistant", "value": snippet["code"]},
+                ]
+            }
+        )
+        known.update((question, snippet["code"]))
+        added += 1
+    staging = path + ".tmp"
+    with open(staging, "w") as f:
+        json.dump(dataset, f, indent=2)
+    os.replace(staging, path)
+    return added
+
+
+class ProgressReporter:
+    """Writes one line per checked snippet and a final summary, as text or NDJSON."""
+
+    def __init__(self, total: int, ndjson: bool = False, stream=None):
+        self.total = total
+        self.ndjson = ndjson
+        self.stream = stream or sys.stdout
+        self.done = 0
+        self.started = time.perf_counter()
+
+    def snippet(self, snippet: dict, record: dict) -> None:
+        self.done += 1
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        if self.ndjson:
+            self._write(
+                {
+                    "type": "snippet",
+                    "done": self.done,
+                    "total": self.total,
+                    "snippets_per_sec": rate,
+                    **{k: v for k, v in record.items() if k != "key"},
+                }
+            )
+        else:
+            error = f"  {record['error']}" if record["error"] else ""
+            self.stream.write(
+                f"[{self.done}/{self.total}] {record['status']:<12} conversation "
+                f"{snippet['idx']} snippet {snippet['position'] + 1} "
+                f"({rate:.2f} snippets/s){error}\n"
+            )
+        self.stream.flush()
+
+    def summary(self, summary: dict) -> None:
+        if self.ndjson:
+            self._write({"type": "summary", **summary})
+        else:
+            statuses = ", ".join(f"{k}: {v}" for k, v in sorted(summary["statuses"].items()))
+            self.stream.write(
+                f"\n{summary['passed']}/{summary['total_snippets']} snippets passed "
+                f"({summary['pass_rate']:.1%}; {statuses}) in {summary['elapsed_seconds']:.1f}s, "
+                f"{summary['resumed']} from the checkpoint\n"
+            )
+            for violation in summary["violations"]:
+                self.stream.write(f"Threshold violated: {violation}\n")
+        self.stream.flush()
+
+    def _write(self, record: dict) -> None:
+        self.stream.write(json.dumps(record) + "\n")
+
+
+def validate(args) -> int:
+    dataset = BuildCheckerAPI.load_json_dataset(args.dataset)
+    if dataset is None:
+        return EXIT_USAGE
+
+    api = BuildCheckerAPI(pool_size=args.workers, executor=args.executor)
+    snippets = api.dataset_snippets(dataset)
+    if not snippets:
+        logger.error(f"No assistant snippets in '{args.dataset}'.")
+        api.close()
+        return EXIT_USAGE
+    keys = [snippet_key(snippet, args.build, args.run) for snippet in snippets]
+
+    checkpoint_path = args.checkpoint or f"{args.dataset}.checkpoint.ndjson"
+    done = load_checkpoint(checkpoint_path) if args.resume else {}
+    if not args.resume and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    pending = [position for position, key in enumerate(keys) if key not in done]
+    records = {
+        position: done[key] for position, key in enumerate(keys) if key in done
+    }
+
+    reporter = ProgressReporter(len(pending), ndjson=args.ndjson)
+    started = time.perf_counter()
+    try:
+        with open(checkpoint_path, "a") as checkpoint:
+            batch = [snippets[position] for position in pending]
+            for batch_position, result in api.iter_check_snippets(
+                batch, args.build, args.run, use_cache=not args.no_cache
+            ):
+                position = pending[batch_position]
+                snippet = snippets[position]
+                record = {
+                    "key": keys[position],
+                    "conversation": snippet["idx"],
+                    "snippet": snippet["position"],
+                    "status": result["status"],
+                    "success": result["success"],
+                    "cache_hit": result["cache_hit"],
+                    "error": "" if result["success"] else error_signature(result["message"]),
+                    "seconds": result["timings"].get("total", 0.0),
+                }
+                # Written before it is reported, so an interrupted run resumes after it
+                checkpoint.write(json.dumps(record) + "\n")
+                checkpoint.flush()
+                records[position] = record
+                reporter.snippet(snippet, record)
+    finally:
+        api.close()
+
+    passing = [snippets[p] for p in sorted(records) if records[p]["success"]]
+    appended = append_to_dataset(args.append_to, passing) if args.append_to else None
+
+    statuses = {}
+    for record in records.values():
+        statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+    total = len(snippets)
+    failed = total - len(passing)
+    pass_rate = len(passing) / total if total else 0.0
+    violations = []
+    if args.min_pass_rate is not None and pass_rate < args.min_pass_rate:
+        violations.append(f"pass rate {pass_rate:.1%} < {args.min_pass_rate:.1%}")
+    if args.max_failures is not None and failed > args.max_failures:
+        violations.append(f"{failed} failures > {args.max_failures}")
+    elapsed = time.perf_counter() - started
+
+    reporter.summary(
+        {
+            "total_snippets": total,
+            "passed": len(passing),
+            "failed": failed,
+            "pass_rate": pass_rate,
+            "statuses": statuses,
+            "resumed": total - len(pending),
+            "elapsed_seconds": elapsed,
+            "snippets_per_sec": len(pending) / elapsed if elapsed else 0.0,
+            "appended": appended,
+            "violations": violations,
+        }
+    )
+    return EXIT_THRESHOLD if violations else EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="build-checker", description="Headless build checker for Scala snippet datasets"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    validate_parser = subparsers.add_parser(
+        "validate", help="Build and run every assistant snippet of a conversation dataset"
+    )
+    validate_parser.add_argument("dataset", help="Dataset JSON (conversations or evaluation results)")
+    validate_parser.add_argument(
+        "--workers", type=int, default=1, help="Snippets checked in parallel (workspace pool size)"
+    )
+    validate_parser.add_argument("--build", action="store_true", help="Build before running")
+    validate_parser.add_argument(
+        "--run", action=argparse.BooleanOptionalAction, default=True, help="Run the snippets"
+    )
+    validate_parser.add_argument("--executor", choices=sorted(EXECUTORS), default=None)
+    validate_parser.add_argument(
+        "--no-cache", action="store_true", help="Ignore the shared verdict cache"
+    )
+    validate_parser.add_argument(
+        "--append-to", type=str, default=None,
+        help="Append passing snippets to this dataset, skipping duplicates",
+    )
+    validate_parser.add_argument(
+        "--checkpoint", type=str, default=None,
+        help="Verdicts file used by --resume (default: <dataset>.checkpoint.ndjson)",
+    )
+    validate_parser.add_argument(
+        "--resume", action="store_true", help="Skip snippets already in the checkpoint"
+    )
+    validate_parser.add_argument(
+        "--ndjson", action="store_true", help="Report progress as one JSON object per line"
+    )
+    validate_parser.add_argument(
+        "--min-pass-rate", type=float, default=None,
+        help="Exit with status 1 if fewer snippets pass (0-1)",
+    )
+    validate_parser.add_argument(
+        "--max-failures", type=int, default=None,
+        help="Exit with status 1 if more snippets fail",
+    )
+    validate_parser.add_argument(
+        "--log-level", type=str, default="WARNING", help="Level of the logs written to stderr"
+    )
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logger.setLevel(getattr(logging, args.log_level.upper(), logging.WARNING))
+    if args.command == "validate":
+        return validate(args)
+    return EXIT_USAGE
+
+
+if __name__ == "__main__":
+    sys.exit(main())
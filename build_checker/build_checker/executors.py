@@ -0,0 +1,578 @@
+import os
+import re
+import time
+import shutil
+import signal
+import hashlib
+import subprocess
+from log.logger import logger
+from jvm import ClassDataArchive, profile_options, split_classpath
+
+# Returned when the toolchain itself is missing; not a verdict on the snippet
+SBT_NOT_FOUND = "sbt not found"
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+
+class Executor:
+    """
+    Compiles and runs the Scala project found in a workspace directory.
+
+    Every backend exposes the same two operations, with the return values the
+    build checker has always used:
+        build(project_dir) -> (success, output)
+        run(project_dir, timeout) -> (success, output, stdout)
+    """
+
+    name = "base"
+
+    def available(self) -> bool:
+        """Whether the tools this backend needs are installed on this machine."""
+        return True
+
+    def build(self, project_dir: str) -> tuple[bool, str]:
+        raise NotImplementedError
+
+    def run(self, project_dir: str, timeout: float = None) -> tuple[bool, str, str]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release long-lived resources (servers, daemons) held by the backend."""
+
+
+def _run_command(cmd, cwd, timeout=None) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        cmd, cwd=cwd, capture_output=True, text=True, check=True, timeout=timeout
+    )
+
+
+def _kill_session(session: int) -> None:
+    """
+    Kill every process of the session `session`, such as an sbt server booted by
+    a client started in a new session and the JVMs it forked. Needs /proc (Linux).
+    """
+    if not os.path.isdir("/proc"):
+        logger.warning(f"Cannot find the processes of session {session} without /proc")
+        return
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # Fields after the command name: state, ppid, pgrp, session, ...
+                fields = f.read().rsplit(")", 1)[1].split()
+            if int(fields[3]) == session and int(pid) != os.getpid():
+                os.kill(int(pid), signal.SIGKILL)
+        except (OSError, IndexError, ValueError):
+            continue  # Exited meanwhile, or not ours to inspect
+
+
+def _run_failure(e: subprocess.CalledProcessError) -> tuple[bool, str, str]:
+    # Include both stderr and stdout in error output for better debugging
+    error_msg = f"STDOUT:\n{e.stdout}\nSTDERR:\n{e.stderr}"
+    logger.error(f"Run error: {error_msg}")
+    return False, error_msg, e.stdout
+
+
+def _timeout_failure(e: subprocess.TimeoutExpired) -> tuple[bool, str, str]:
+    stdout = e.stdout.decode() if isinstance(e.stdout, bytes) else (e.stdout or "")
+    error_msg = f"Run timed out after {e.timeout:.0f}s\nSTDOUT:\n{stdout}"
+    logger.error(error_msg)
+    return False, error_msg, stdout
+
+
+class ColdSbtExecutor(Executor):
+    """Boots a fresh sbt for every build and run (the original behaviour)."""
+
+    name = "cold_sbt"
+    sbt_command = ["sbt"]
+
+    def available(self) -> bool:
+        return shutil.which("sbt") is not None
+
+    def build(self, project_dir: str) -> tuple[bool, str]:
+        try:
+            result = _run_command(self.sbt_command + ["compile"], project_dir)
+            return True, result.stdout
+        except subprocess.CalledProcessError as e:
+            error_msg = e.stderr or e.stdout
+            logger.error(f"Build error: {error_msg}")
+            return False, error_msg
+        except FileNotFoundError as e:
+            logger.error(f"Build error: {e}")
+            return False, SBT_NOT_FOUND
+
+    def run(self, project_dir: str, timeout: float = None) -> tuple[bool, str, str]:
+        try:
+            result = _run_command(self.sbt_command + ["run"], project_dir, timeout)
+            logger.info("Successfully ran snippet")
+            return True, result.stdout, result.stdout
+        except subprocess.CalledProcessError as e:
+            return _run_failure(e)
+        except subprocess.TimeoutExpired as e:
+            return _timeout_failure(e)
+        except FileNotFoundError:
+            logger.error(SBT_NOT_FOUND)
+            return False, SBT_NOT_FOUND, ""
+
+    def export(self, project_dir: str, key: str) -> str:
+        """Return the value of an sbt setting or task, e.g. `Runtime / fullClasspath`."""
+        result = _run_command(self.sbt_command + [f"export {key}"], project_dir)
+        lines = [
+            ANSI_ESCAPE.sub("", line).strip() for line in result.stdout.splitlines()
+        ]
+        values = [line for line in lines if line and not line.startswith("[")]
+        if not values:
+            raise RuntimeError(f"sbt did not export {key}")
+        return values[-1]
+
+
+class WarmSbtExecutor(ColdSbtExecutor):
+    """
+    Keeps one sbt server per workspace alive and talks to it through the thin
+    client (`sbt --client`), so sbt boot and project loading are paid once.
+    Runs are forked, so a snippet calling `System.exit` cannot kill the server.
+    """
+
+    name = "warm_sbt"
+    sbt_command = ["sbt", "--client"]
+    # Seconds a timed-out run gets to stop once the thin client asked the server
+    # to cancel it, before the server and its forked JVM are killed
+    cancel_grace = 10.0
+
+    def __init__(self):
+        # Workspace -> session of the client that booted its sbt server. The
+        # server and the JVMs it forks stay in that session, and nothing else
+        # does: a timed-out run can kill them without touching other processes
+        # working in the same directory
+        self._sessions = {}
+
+    def _ensure_session(self, project_dir: str) -> None:
+        if project_dir in self._sessions:
+            return
+        cmd = self.sbt_command + ["set Compile / run / fork := true"]
+        client = subprocess.Popen(
+            cmd,
+            cwd=project_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            start_new_session=True,
+        )
+        stdout, stderr = client.communicate()
+        if client.returncode != 0:
+            raise subprocess.CalledProcessError(client.returncode, cmd, stdout, stderr)
+        # A session is identified by the pid of the process that created it
+        self._sessions[project_dir] = client.pid
+
+    def build(self, project_dir: str) -> tuple[bool, str]:
+        try:
+            self._ensure_session(project_dir)
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            pass  # Reported by the build itself
+        return super().build(project_dir)
+
+    def run(self, project_dir: str, timeout: float = None) -> tuple[bool, str, str]:
+        try:
+            self._ensure_session(project_dir)
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            pass
+        cmd = self.sbt_command + ["run"]
+        try:
+            client = subprocess.Popen(
+                cmd,
+                cwd=project_dir,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                start_new_session=True,
+            )
+        except FileNotFoundError:
+            logger.error(SBT_NOT_FOUND)
+            return False, SBT_NOT_FOUND, ""
+        try:
+            stdout, stderr = client.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            stdout = self._cancel_run(client, project_dir)
+            return _timeout_failure(subprocess.TimeoutExpired(cmd, timeout, output=stdout))
+        if client.returncode != 0:
+            return _run_failure(
+                subprocess.CalledProcessError(client.returncode, cmd, stdout, stderr)
+            )
+        logger.info("Successfully ran snippet")
+        return True, stdout, stdout
+
+    def _cancel_run(self, client: subprocess.Popen, project_dir: str) -> str:
+        """
+        Stop a timed-out run and return its output so far. The run goes on in the
+        server after the thin client exits, holding the workspace for the next
+        snippet: interrupt the client, which asks the server to cancel the run
+        (and destroy its forked JVM), and kill the server this executor booted
+        if that does not work.
+        """
+        client.send_signal(signal.SIGINT)
+        try:
+            stdout, _ = client.communicate(timeout=self.cancel_grace)
+            return stdout or ""
+        except subprocess.TimeoutExpired:
+            pass
+        logger.warning(f"sbt did not cancel the run in {project_dir}, killing its server")
+        os.killpg(client.pid, signal.SIGKILL)
+        # The thin client boots a new server on the next command; set it up again
+        session = self._sessions.pop(project_dir, None)
+        if session is not None:
+            _kill_session(session)
+        try:
+            stdout, _ = client.communicate(timeout=self.cancel_grace)
+        except subprocess.TimeoutExpired:
+            stdout = ""  # Output still held open by a server this executor did not boot
+        return stdout or ""
+
+    def close(self) -> None:
+        for project_dir in self._sessions:
+            try:
+                _run_command(self.sbt_command + ["shutdown"], project_dir, timeout=60)
+            except Exception as e:
+                logger.warning(f"Could not shut down sbt server in {project_dir}: {e}")
+        self._sessions.clear()
+
+
+class DirectJavaExecutor(Executor):
+    """
+    Compiles through sbt, then launches `java` directly on the exported runtime
+    classpath instead of going through `sbt run`. The classpath is exported once
+    per workspace and refreshed when `build.sbt` changes.
+
+    The JVM options come from a JVM profile (see `jvm.JVM_PROFILES`) followed by
+    `jvm_options`. With `cds`, runs share a class data archive of the dependency
+    jars (see `jvm.ClassDataArchive`).
+    """
+
+    name = "direct_java"
+    default_jvm_profile = "default"
+
+    def __init__(
+        self,
+        compiler: Executor = None,
+        java: str = "java",
+        jvm_options=None,
+        jvm_profile: str = None,
+        cds: bool = None,
+    ):
+        self.compiler = compiler or WarmSbtExecutor()
+        self.java = java
+        self.jvm_options = profile_options(jvm_profile, self.default_jvm_profile)
+        self.jvm_options += list(jvm_options or [])
+        if cds is None:
+            cds = os.environ.get("BUILD_CHECKER_CDS", "0") == "1"
+        self.class_data = ClassDataArchive(java) if cds else None
+        self._classpaths = {}
+        self._built_sources = {}
+
+    def available(self) -> bool:
+        return self.compiler.available() and shutil.which(self.java) is not None
+
+    def build(self, project_dir: str) -> tuple[bool, str]:
+        success, output = self.compiler.build(project_dir)
+        self._built_sources[project_dir] = (
+            _source_digest(project_dir) if success else None
+        )
+        return success, output
+
+    def run(self, project_dir: str, timeout: float = None) -> tuple[bool, str, str]:
+        # `sbt run` compiles implicitly; skip it only if these sources were just built
+        if self._built_sources.get(project_dir) != _source_digest(project_dir):
+            success, output = self.build(project_dir)
+            if not success:
+                # Prefixed like the API's own build step, so it is not a run failure
+                return False, f"Build failed: {output}", ""
+
+        main_class = find_main_class(_read_main_scala(project_dir))
+        if main_class is None:
+            return False, "No main class detected", ""
+
+        try:
+            classpath = self.classpath(project_dir)
+        except (RuntimeError, subprocess.CalledProcessError, FileNotFoundError) as e:
+            return False, f"Could not export the runtime classpath: {e}", ""
+
+        cds_options, jars = [], None
+        if self.class_data is not None:
+            # Archived jars must come first: the runtime classpath may only extend
+            # the one the archive was dumped with
+            jars, class_dirs = split_classpath(classpath)
+            classpath = os.pathsep.join(jars + class_dirs)
+            cds_options = self.class_data.options(jars)
+
+        cmd = [self.java, *self.jvm_options, *cds_options, "-cp", classpath, main_class]
+        training = any(option.startswith("-XX:DumpLoadedClassList") for option in cds_options)
+        try:
+            result = _run_command(cmd, project_dir, timeout)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError) as e:
+            # Only a run that exited cleanly recorded a complete class list; let
+            # the next run record another
+            if training:
+                self.class_data.abandon(jars)
+            if isinstance(e, subprocess.CalledProcessError):
+                return _run_failure(e)
+            if isinstance(e, subprocess.TimeoutExpired):
+                return _timeout_failure(e)
+            logger.error("java not found")
+            return False, "java not found", ""
+        if training:
+            self.class_data.dump(jars)
+        logger.info("Successfully ran snippet")
+        return True, result.stdout, result.stdout
+
+    def classpath(self, project_dir: str) -> str:
+        build_sbt = os.path.join(project_dir, "build.sbt")
+        stamp = os.path.getmtime(build_sbt) if os.path.exists(build_sbt) else None
+        cached = self._classpaths.get(project_dir)
+        if cached is None or cached[0] != stamp:
+            exporter = (
+                self.compiler
+                if isinstance(self.compiler, ColdSbtExecutor)
+                else ColdSbtExecutor()
+            )
+            cached = (stamp, exporter.export(project_dir, "Runtime / fullClasspath"))
+            self._classpaths[project_dir] = cached
+        return cached[1]
+
+    def close(self) -> None:
+        self.compiler.close()
+
+
+class AppCdsExecutor(DirectJavaExecutor):
+    """
+    Direct java launches tuned for short-lived programs: the `short_lived` JVM
+    profile and a class data archive of the Scala and Akka jars.
+    """
+
+    name = "appcds"
+    default_jvm_profile = "short_lived"
+
+    def __init__(
+        self,
+        compiler: Executor = None,
+        java: str = "java",
+        jvm_options=None,
+        jvm_profile: str = None,
+    ):
+        super().__init__(compiler, java, jvm_options, jvm_profile, cds=True)
+
+
+class CompileDaemonExecutor(Executor):
+    """
+    Compiles and runs `src/main/scala` with scala-cli, which keeps a Bloop compile
+    server alive between invocations. Dependencies and the Scala version are read
+    from the workspace `build.sbt`, so the classpath matches the sbt backends.
+    """
+
+    name = "compile_daemon"
+
+    def __init__(self, scala_cli: str = "scala-cli"):
+        self.scala_cli = scala_cli
+        self._options = {}
+
+    def available(self) -> bool:
+        return shutil.which(self.scala_cli) is not None
+
+    def _command(self, action: str, project_dir: str) -> list[str]:
+        if project_dir not in self._options:
+            self._options[project_dir] = scala_cli_options(
+                os.path.join(project_dir, "build.sbt")
+            )
+        return [self.scala_cli, action, "src/main/scala", "--server=true"] + self._options[
+            project_dir
+        ]
+
+    def build(self, project_dir: str) -> tuple[bool, str]:
+        try:
+            result = _run_command(self._command("compile", project_dir), project_dir)
+            return True, result.stdout
+        except subprocess.CalledProcessError as e:
+            error_msg = e.stderr or e.stdout
+            logger.error(f"Build error: {error_msg}")
+            return False, error_msg
+        except FileNotFoundError:
+            logger.error("scala-cli not found")
+            return False, "scala-cli not found"
+
+    def run(self, project_dir: str, timeout: float = None) -> tuple[bool, str, str]:
+        try:
+            result = _run_command(self._command("run", project_dir), project_dir, timeout)
+            logger.info("Successfully ran snippet")
+            return True, result.stdout, result.stdout
+        except subprocess.CalledProcessError as e:
+            return _run_failure(e)
+        except subprocess.TimeoutExpired as e:
+            return _timeout_failure(e)
+        except FileNotFoundError:
+            logger.error("scala-cli not found")
+            return False, "scala-cli not found", ""
+
+
+class FakeExecutor(Executor):
+    """
+    Deterministic stand-in for sbt, used by tests and benchmarks on machines
+    without a JVM. The verdict depends only on the code:
+        - build fails if delimiters are unbalanced or there is no entry point;
+        - run fails if the code contains `???` or `sys.exit(<non zero>)`.
+    Latencies are fixed per snippet, derived from its hash; when not given they
+    are read from BUILD_CHECKER_FAKE_BUILD_LATENCY / BUILD_CHECKER_FAKE_RUN_LATENCY
+    so that a server started in a subprocess can be configured too.
+    """
+
+    name = "fake"
+
+    def __init__(self, build_latency: float = None, run_latency: float = None):
+        if build_latency is None:
+            build_latency = float(os.environ.get("BUILD_CHECKER_FAKE_BUILD_LATENCY", "0"))
+        if run_latency is None:
+            run_latency = float(os.environ.get("BUILD_CHECKER_FAKE_RUN_LATENCY", "0"))
+        self.build_latency = build_latency
+        self.run_latency = run_latency
+
+    def build(self, project_dir: str) -> tuple[bool, str]:
+        code = _read_main_scala(project_dir)
+        self._sleep(code, self.build_latency)
+        error = _fake_compile_error(code)
+        if error:
+            return False, f"[error] Main.scala: {error}"
+        return True, "[success] Total time: 0 s"
+
+    def run(self, project_dir: str, timeout: float = None) -> tuple[bool, str, str]:
+        code = _read_main_scala(project_dir)
+        error = _fake_compile_error(code)
+        if error:
+            msg = f"[error] Main.scala: {error}"
+            return False, f"STDOUT:\n{msg}\nSTDERR:\n", msg
+        latency = self._sleep(code, self.run_latency, timeout)
+        if timeout is not None and latency >= timeout:
+            return False, f"Run timed out after {timeout:.0f}s\nSTDOUT:\n", ""
+        if "???" in code or re.search(r"sys\.exit\(\s*[1-9]", code):
+            msg = "Exception in thread \"main\" scala.NotImplementedError"
+            return False, f"STDOUT:\n\nSTDERR:\n{msg}", ""
+        return True, "fake run output", "fake run output"
+
+    @staticmethod
+    def _sleep(code: str, latency: float, timeout: float = None) -> float:
+        if latency <= 0:
+            return 0.0
+        jitter = int(hashlib.sha256(code.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+        duration = latency * (0.5 + jitter)
+        time.sleep(min(duration, timeout) if timeout is not None else duration)
+        return duration
+
+
+EXECUTORS = {
+    executor.name: executor
+    for executor in (
+        ColdSbtExecutor,
+        WarmSbtExecutor,
+        DirectJavaExecutor,
+        AppCdsExecutor,
+        CompileDaemonExecutor,
+        FakeExecutor,
+    )
+}
+
+DEFAULT_EXECUTOR = "cold_sbt"
+
+
+def create_executor(name: str = None, **options) -> Executor:
+    """
+    Instantiate the backend registered as `name`.
+    Defaults to the BUILD_CHECKER_EXECUTOR environment variable, then cold sbt.
+    """
+    name = name or os.environ.get("BUILD_CHECKER_EXECUTOR", DEFAULT_EXECUTOR)
+    if name not in EXECUTORS:
+        raise ValueError(
+            f"Unknown executor '{name}'. Available: {', '.join(sorted(EXECUTORS))}"
+        )
+    return EXECUTORS[name](**options)
+
+
+def find_main_class(code: str):
+    """Best-effort detection of the fully qualified entry point of a snippet."""
+    code = strip_comments_and_strings(code)
+    package = re.search(r"^\s*package\s+([\w.]+)", code, re.MULTILINE)
+    prefix = f"{package.group(1)}." if package else ""
+
+    main_method = re.search(r"@main\s+def\s+(\w+)", code)
+    if main_method:
+        return prefix + main_method.group(1)
+
+    for match in re.finditer(r"\bobject\s+(\w+)([^{]*)", code):
+        if re.search(r"\bextends\s+App\b", match.group(2)):
+            return prefix + match.group(1)
+        if re.search(r"\bdef\s+main\s*\(", _block_at(code, match.end())):
+            return prefix + match.group(1)
+    return None
+
+
+def strip_comments_and_strings(code: str) -> str:
+    """Blank out comments and string literals, so their content is not parsed as code."""
+    return re.sub(
+        r'//[^\n]*|/\*.*?\*/|""".*?"""|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\])\'',
+        '""',
+        code,
+        flags=re.DOTALL,
+    )
+
+
+def _block_at(code: str, start: int) -> str:
+    """Return the brace-delimited block opening at `start` (empty if there is none)."""
+    if start >= len(code) or code[start] != "{":
+        return ""
+    depth = 0
+    for i in range(start, len(code)):
+        if code[i] == "{":
+            depth += 1
+        elif code[i] == "}":
+            depth -= 1
+            if depth == 0:
+                return code[start : i + 1]
+    return code[start:]
+
+
+def scala_cli_options(build_sbt_path: str) -> list[str]:
+    """Translate the Scala version and compile dependencies of a build.sbt for scala-cli."""
+    with open(build_sbt_path) as f:
+        build_sbt = f.read()
+    # Drop line comments so commented-out dependencies are ignored
+    build_sbt = re.sub(r"//.*", "", build_sbt)
+
+    options = []
+    version = re.search(r'scala3Version\s*=\s*"([^"]+)"', build_sbt) or re.search(
+        r'scalaVersion\s*:=\s*"([^"]+)"', build_sbt
+    )
+    if version:
+        options += ["--scala", version.group(1)]
+
+    dependency = re.compile(
+        r'"([\w.\-]+)"\s*(%%?)\s*"([\w.\-]+)"\s*%\s*"([\w.\-]+)"(\s*%\s*Test)?'
+    )
+    for org, sep, artifact, rev, test_scope in dependency.findall(build_sbt):
+        if test_scope:
+            continue
+        colon = "::" if sep == "%%" else ":"
+        options += ["--dep", f"{org}{colon}{artifact}:{rev}"]
+    return options
+
+
+def _read_main_scala(project_dir: str) -> str:
+    with open(os.path.join(project_dir, "src/main/scala/Main.scala")) as f:
+        return f.read()
+
+
+def _source_digest(project_dir: str) -> str:
+    return hashlib.sha256(_read_main_scala(project_dir).encode("utf-8")).hexdigest()
+
+
+def _fake_compile_error(code: str):
+    stripped = strip_comments_and_strings(code)
+    for opening, closing in ("{}", "()", "[]"):
+        if stripped.count(opening) != stripped.count(closing):
+            return f"unbalanced '{opening}{closing}'"
+    if find_main_class(code) is None:
+        return "no main class detected"
+    return None
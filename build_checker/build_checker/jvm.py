@@ -0,0 +1,142 @@
+import os
+import time
+import shlex
+import hashlib
+import subprocess
+from log.logger import logger
+from workspace_pool import file_lock
+
+BUILD_CHECKER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# JVM options for the programs that run snippets, selected by name with
+# BUILD_CHECKER_JVM_PROFILE. Snippets are short-lived: they rarely run long enough
+# for C2 to pay off, and need neither a large heap nor a parallel collector.
+JVM_PROFILES = {
+    "default": [],
+    "short_lived": [
+        "-XX:TieredStopAtLevel=1",
+        "-XX:+UseSerialGC",
+        "-Xms64m",
+        "-Xmx512m",
+        "-XX:-UsePerfData",
+    ],
+}
+
+# Class list of a training run that never finished (the process was killed)
+STALE_CLASS_LIST_SECONDS = 3600
+
+
+def profile_options(profile: str = None, default_profile: str = "default") -> list:
+    """
+    Options of JVM profile `profile` (default: BUILD_CHECKER_JVM_PROFILE, then
+    `default_profile`), followed by the extra options in BUILD_CHECKER_JVM_OPTIONS.
+    """
+    profile = profile or os.environ.get("BUILD_CHECKER_JVM_PROFILE", default_profile)
+    if profile not in JVM_PROFILES:
+        raise ValueError(
+            f"Unknown JVM profile '{profile}'. Available: {', '.join(sorted(JVM_PROFILES))}"
+        )
+    return JVM_PROFILES[profile] + shlex.split(os.environ.get("BUILD_CHECKER_JVM_OPTIONS", ""))
+
+
+def split_classpath(classpath: str) -> tuple[list, list]:
+    """Split a runtime classpath into its jars and its class directories."""
+    entries = [entry for entry in classpath.split(os.pathsep) if entry]
+    jars = [entry for entry in entries if entry.endswith(".jar")]
+    return jars, [entry for entry in entries if not entry.endswith(".jar")]
+
+
+def default_archive_dir() -> str:
+    state_dir = os.environ.get(
+        "BUILD_CHECKER_STATE_DIR", os.path.join(BUILD_CHECKER_DIR, "res/state")
+    )
+    return os.environ.get("BUILD_CHECKER_CDS_DIR", os.path.join(state_dir, "cds"))
+
+
+class ClassDataArchive:
+    """
+    Application class-data sharing (AppCDS) archives of the dependency jars of
+    runtime classpaths, so that run JVMs map the Scala and Akka classes they load
+    instead of parsing and verifying them on every start.
+
+    An archive is keyed by the jars of the classpath, which change whenever the
+    dependencies in `build.sbt` do, and shared by every workspace and worker with
+    the same dependencies. The first run without an archive records the classes
+    it loads; the archive is then dumped from that list, or the list dropped if
+    the run failed. Only jars are archived:
+    the snippet's own classes live in directories and change with every snippet.
+    """
+
+    def __init__(self, java: str = "java", archive_dir: str = None):
+        self.java = java
+        self.archive_dir = archive_dir or default_archive_dir()
+        self._failed = set()
+
+    def paths(self, jars: list) -> tuple[str, str]:
+        digest = hashlib.sha256(os.pathsep.join(jars).encode()).hexdigest()[:16]
+        base = os.path.join(self.archive_dir, digest)
+        return base + ".jsa", base + ".classlist"
+
+    def options(self, jars: list) -> list:
+        """
+        JVM options for a run on `jars`: use the archive if it exists, otherwise
+        record the loaded classes so that `dump` can create it after the run.
+        """
+        archive, class_list = self.paths(jars)
+        if os.path.exists(archive):
+            # -Xshare:auto silently runs without the archive if it does not match
+            return [f"-XX:SharedArchiveFile={archive}", "-Xshare:auto"]
+        if archive in self._failed or not jars:
+            return []
+        os.makedirs(self.archive_dir, exist_ok=True)
+        # One training run at a time; the others start without an archive
+        if (
+            os.path.exists(class_list)
+            and time.time() - os.path.getmtime(class_list) > STALE_CLASS_LIST_SECONDS
+        ):
+            os.remove(class_list)
+        try:
+            os.close(os.open(class_list, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+        except FileExistsError:
+            return []
+        return [f"-XX:DumpLoadedClassList={class_list}"]
+
+    def abandon(self, jars: list) -> None:
+        """
+        Discard the class list of a training run that failed or timed out, so
+        that the next run records a new one instead of going without an archive.
+        """
+        _, class_list = self.paths(jars)
+        try:
+            os.remove(class_list)
+        except FileNotFoundError:
+            pass
+
+    def dump(self, jars: list) -> bool:
+        """Create the archive of `jars` from the class list of a training run."""
+        archive, class_list = self.paths(jars)
+        with file_lock(archive + ".lock"):
+            if os.path.exists(archive):
+                return True
+            if not os.path.exists(class_list):
+                return False
+            staging = archive + ".tmp"
+            cmd = [
+                self.java,
+                "-Xshare:dump",
+                f"-XX:SharedClassListFile={class_list}",
+                f"-XX:SharedArchiveFile={staging}",
+                "-cp",
+                os.pathsep.join(jars),
+            ]
+            try:
+                subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=300)
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError) as e:
+                # Do not record another class list per run for a JVM that cannot dump
+                logger.warning(f"Could not create class data archive {archive}: {e}")
+                self._failed.add(archive)
+                return False
+            os.replace(staging, archive)
+            os.remove(class_list)
+        logger.info(f"Created class data archive {archive}")
+        return True
@@ -0,0 +1,335 @@
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from benchmark import summarize_latencies
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+ENDPOINTS = ("test-snippet", "process-dataset-inline")
+
+HELLO_WORLD = """object Main extends App {
+  println("Hello, load test")
+}
+"""
+
+
+def make_snippet(code_size: int = 0, seed: int = 0) -> str:
+    """
+    Hello world padded with comments to roughly `code_size` bytes. The seed is
+    embedded so that distinct requests do not hit the verdict cache.
+    """
+    code = f"// request {seed}\n{HELLO_WORLD}"
+    padding = "// " + "x" * 76 + "\n"
+    while len(code) < code_size:
+        code += padding
+    return code
+
+
+def make_payload(endpoint: str, code_size: int, dataset_size: int, seed: int, build: bool, run: bool) -> dict:
+    if endpoint == "test-snippet":
+        return {"code": make_snippet(code_size, seed), "build": build, "run": run}
+    data = [
+        {
+            "conversations": [
+                {"from": "human", "value": f"Write a hello world program ({seed}-{i})"},
+                {"from": "assistant", "value": make_snippet(code_size, f"{seed}-{i}")},
+            ]
+        }
+        for i in range(dataset_size)
+    ]
+    return {"data": data, "build": build, "run": run}
+
+
+class LoadTest:
+    """
+    Drives one endpoint of a running build checker server.
+
+    Closed loop: `concurrency` clients send requests back to back.
+    Open loop: requests are scheduled at `rate` per second (constant or Poisson
+    arrivals) regardless of how fast the server answers; latency is measured
+    from the scheduled send time so that a slow server is not hidden by
+    clients that stop sending (coordinated omission).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        endpoint: str = "test-snippet",
+        code_size: int = 0,
+        dataset_size: int = 1,
+        build: bool = False,
+        run: bool = True,
+        unique: bool = True,
+        timeout: float = 60,
+    ):
+        if endpoint not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{endpoint}', expected one of {ENDPOINTS}")
+        self.base_url = base_url.rstrip("/")
+        self.endpoint = endpoint
+        self.code_size = code_size
+        self.dataset_size = dataset_size
+        self.build = build
+        self.run = run
+        self.unique = unique
+        self.timeout = timeout
+        self._local = threading.local()
+        self._counter = 0
+        self._counter_lock = threading.Lock()
+        self._results = []
+        self._results_lock = threading.Lock()
+
+    def _session(self) -> requests.Session:
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _next_payload(self) -> dict:
+        with self._counter_lock:
+            self._counter += 1
+            seed = self._counter if self.unique else 0
+        return make_payload(
+            self.endpoint, self.code_size, self.dataset_size, seed, self.build, self.run
+        )
+
+    def _send(self, scheduled: float) -> None:
+        payload = self._next_payload()
+        error = None
+        try:
+            response = self._session().post(
+                f"{self.base_url}/{self.endpoint}", json=payload, timeout=self.timeout
+            )
+            if response.status_code != 200:
+                error = f"HTTP {response.status_code}"
+        except requests.RequestException as e:
+            error = type(e).__name__
+        with self._results_lock:
+            self._results.append((time.perf_counter() - scheduled, error))
+
+    def run_closed_loop(self, concurrency: int, duration: float) -> dict:
+        deadline = time.perf_counter() + duration
+
+        def client():
+            while time.perf_counter() < deadline:
+                self._send(time.perf_counter())
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self._report("closed", time.perf_counter() - started, concurrency=concurrency)
+
+    def run_open_loop(self, rate: float, duration: float, arrivals: str = "constant", max_in_flight: int = 256, seed: int = 0) -> dict:
+        rng = random.Random(seed)
+        started = time.perf_counter()
+        scheduled = started
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            while scheduled < started + duration:
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._send, scheduled)
+                interval = rng.expovariate(rate) if arrivals == "poisson" else 1 / rate
+                scheduled += interval
+        return self._report(
+            "open", time.perf_counter() - started, rate=rate, arrivals=arrivals
+        )
+
+    def _report(self, mode: str, wall_seconds: float, **settings) -> dict:
+        with self._results_lock:
+            results, self._results = self._results, []
+        latencies = [latency for latency, error in results if error is None]
+        errors = {}
+        for _, error in results:
+            if error is not None:
+                errors[error] = errors.get(error, 0) + 1
+        snippets_per_request = self.dataset_size if self.endpoint != "test-snippet" else 1
+        return {
+            "mode": mode,
+            **settings,
+            "endpoint": self.endpoint,
+            "code_size": self.code_size,
+            "dataset_size": snippets_per_request,
+            "requests": len(results),
+            "errors": errors,
+            "error_rate": sum(errors.values()) / len(results) if results else 0.0,
+            "wall_seconds": wall_seconds,
+            "requests_per_sec": len(latencies) / wall_seconds if wall_seconds else 0.0,
+            "snippets_per_sec": len(latencies) * snippets_per_request / wall_seconds
+            if wall_seconds
+            else 0.0,
+            "latency": summarize_latencies(latencies),
+        }
+
+    def server_metrics(self, window: float) -> dict:
+        response = requests.get(
+            f"{self.base_url}/metrics", params={"window": window}, timeout=10
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(port: int, executor: str, workers: int, pool_size: int, state_dir: str, env: dict = None) -> subprocess.Popen:
+    """Start server.py in a subprocess with its state kept under `state_dir`."""
+    server_env = {
+        **os.environ,
+        "BUILD_CHECKER_STATE_DIR": state_dir,
+        "BUILD_CHECKER_FAILING_SNIPPETS": os.path.join(state_dir, "failing_snippets.json"),
+        **(env or {}),
+    }
+    command = [
+        sys.executable, "server.py",
+        "--port", str(port),
+        "--executor", executor,
+        "--workers", str(workers),
+    ]
+    if pool_size:
+        command += ["--pool-size", str(pool_size)]
+    return subprocess.Popen(
+        command,
+        cwd=SERVER_DIR,
+        env=server_env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_until_ready(base_url: str, timeout: float = 60) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/ready", timeout=2).json().get("ready"):
+                return
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Server at {base_url} did not become ready in {timeout}s")
+
+
+def print_report(report: dict) -> None:
+    if report["mode"] == "closed":
+        load = f"closed loop, {report['concurrency']} clients"
+    else:
+        load = f"open loop, {report['rate']:g} req/s {report['arrivals']} arrivals"
+    print(
+        f"\n/{report['endpoint']} ({load}, {report['code_size']} B snippets, "
+        f"{report['dataset_size']} per request)"
+    )
+    print(
+        f"Requests: {report['requests']} in {report['wall_seconds']:.2f}s, "
+        f"{report['requests_per_sec']:.2f} req/s, {report['snippets_per_sec']:.2f} snippets/s"
+    )
+    errors = ", ".join(f"{name}: {count}" for name, count in report["errors"].items())
+    print(f"Error rate: {report['error_rate']:.2%}" + (f" ({errors})" if errors else ""))
+    latency = report["latency"]
+    print(
+        f"Latency s: p50 {latency['p50']:.3f}  p95 {latency['p95']:.3f}  "
+        f"p99 {latency['p99']:.3f}  max {latency['max']:.3f}"
+    )
+    lag = report.get("event_loop_lag_ms")
+    if lag:
+        print(
+            f"Event loop lag ms: p50 {lag['p50']:.1f}  p99 {lag['p99']:.1f}  "
+            f"max {lag['max']:.1f} ({lag['samples']} samples)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load test for the build checker server")
+    parser.add_argument("--url", type=str, default=None, help="Server to test (default: spawn one)")
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="test-snippet")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed loop clients")
+    parser.add_argument(
+        "--rate", type=float, default=None, help="Open loop arrival rate in req/s"
+    )
+    parser.add_argument("--arrivals", choices=("constant", "poisson"), default="constant")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load")
+    parser.add_argument("--code-size", type=int, default=0, help="Snippet size in bytes")
+    parser.add_argument(
+        "--dataset-size", type=int, default=1,
+        help="Conversations per /process-dataset-inline request",
+    )
+    parser.add_argument("--build", action="store_true", help="Build before running")
+    parser.add_argument("--no-run", action="store_true", help="Only build the snippets")
+    parser.add_argument(
+        "--repeat-snippet", action="store_true",
+        help="Send the same snippet every time, so the verdict cache answers",
+    )
+    parser.add_argument("--timeout", type=float, default=60, help="Per request timeout")
+    parser.add_argument("--executor", type=str, default="fake", help="Backend of a spawned server")
+    parser.add_argument("--workers", type=int, default=1, help="Workers of a spawned server")
+    parser.add_argument(
+        "--pool-size", type=int, default=None, help="Workspaces of a spawned server"
+    )
+    parser.add_argument("--fake-build-latency", type=float, default=0.05)
+    parser.add_argument("--fake-run-latency", type=float, default=0.1)
+    parser.add_argument("--output", type=str, default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    server = None
+    state_dir = None
+    base_url = args.url
+    if base_url is None:
+        state_dir = tempfile.TemporaryDirectory()
+        port = free_port()
+        base_url = f"http://localhost:{port}"
+        server = spawn_server(
+            port,
+            args.executor,
+            args.workers,
+            args.pool_size,
+            state_dir.name,
+            env={
+                "BUILD_CHECKER_FAKE_BUILD_LATENCY": str(args.fake_build_latency),
+                "BUILD_CHECKER_FAKE_RUN_LATENCY": str(args.fake_run_latency),
+            },
+        )
+
+    try:
+        wait_until_ready(base_url)
+        load_test = LoadTest(
+            base_url,
+            args.endpoint,
+            code_size=args.code_size,
+            dataset_size=args.dataset_size,
+            build=args.build,
+            run=not args.no_run,
+            unique=not args.repeat_snippet,
+            timeout=args.timeout,
+        )
+        if args.rate:
+            report = load_test.run_open_loop(args.rate, args.duration, args.arrivals)
+        else:
+            report = load_test.run_closed_loop(args.concurrency, args.duration)
+        # Lag is sampled per worker; with several workers this is whichever answered
+        metrics = load_test.server_metrics(report["wall_seconds"])
+        report["event_loop_lag_ms"] = metrics["event_loop_lag_ms"]
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+            state_dir.cleanup()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,15 @@ import hashlib
 import json
 import os
 import sys
+import time
 import logging
+import threading
 from pathlib import Path
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
 from PyQt5.QtWidgets import (
-    QMainWindow, QWidget, QVBoxLayout, QLabel, QPushButton, 
-    QCheckBox, QApplication, QFileDialog, QTextEdit
+    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QCheckBox, QApplication, QFileDialog, QTextEdit, QProgressBar, QListWidget,
+    QSpinBox
 )
 from config_manager import ConfigManager
 
@@ -27,7 +31,12 @@ logger.propagate = False
 ROOT_DIR = Path(__file__).parent.parent.parent
 sys.path.append(str(ROOT_DIR))
 
-from api import BuildCheckerAPI
+from api import BuildCheckerAPI, error_signature
+from cli import append_to_dataset
+from executors import create_executor
+
+# Same backend as the API server, selected through $BUILD_CHECKER_EXECUTOR
+executor = create_executor()
 
 hash_file_path = "res/config/processed_hashes.json"
 current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -97,50 +106,6 @@ def save_failing_snippets(failing_snippets, failing_snippets_path):
         json.dump(failing_snippets, f, indent=4)
     logger.info(f"Saved {len(failing_snippets)} failing snippets.")
 
-def process_snippets(dataset, build_flag, run_flag, use_hashes=False, on_working_snippet=None):
-    if dataset is None:
-        logger.error("No dataset file provided. Stopping further processing.")
-        return
-
-    processed_hashes = load_processed_hashes(hash_file_path) if use_hashes else set()
-    successful_runs = 0
-    total_snippets = 0
-    failing_snippets = []
-    api = BuildCheckerAPI()
-
-    # Iterate over each conversation
-    for idx, conversation in enumerate(dataset):
-        assistant_messages, human_prompts = api._get_prompt_and_code(conversation)
-
-        for code, human_prompt in zip(assistant_messages, human_prompts):
-            total_snippets += 1
-            current_hash = compute_hash(human_prompt, code)
-            if use_hashes and current_hash in processed_hashes:
-                continue
-
-            success, error_msg = api.test_single_snippet(code, build_flag, run_flag, idx=idx, prompt=human_prompt)
-            
-            if success:
-                successful_runs += 1
-                if on_working_snippet:
-                    on_working_snippet(idx, human_prompt, code)
-            else:
-                failing_snippets.append({
-                    "idx": idx,
-                    "prompt": human_prompt,
-                    "code": code,
-                    "error_output": error_msg,
-                    "error_cause": error_msg.split('\n')[-1] if error_msg else "Unknown error"
-                })
-
-            if use_hashes:
-                processed_hashes.add(current_hash)
-                save_processed_hashes(processed_hashes, hash_file_path)
-
-    save_failing_snippets(failing_snippets, failing_snippets_path)
-    logger.info(f"{successful_runs}/{total_snippets} snippets ran successfully.")
-    logger.info(f"{len(dataset)} conversations processed successfully.")
-
 def get_prompt_and_code(conversation):
     assistant_messages = [
         msg["value"]
@@ -155,53 +120,22 @@ def get_prompt_and_code(conversation):
     return assistant_messages, human_prompts
 
 def run_project(project_directory) -> tuple:
-    import subprocess
-
     logger.debug(f"Running project in directory: {project_directory}")
-    try:
-        result = subprocess.run(
-            ["sbt", "run"],
-            cwd=project_directory,
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True  # Use text mode for string output
-        )
-        return True, result.stdout
-    except subprocess.CalledProcessError as e:
-        # Include both stderr and stdout in error output for better debugging
-        error_output = f"STDOUT:\n{e.stdout}\nSTDERR:\n{e.stderr}"
-        return False, error_output
-    except FileNotFoundError:
-        logger.error("sbt not found. Please ensure sbt is installed and in your PATH")
-        return False, "sbt not found. Please ensure sbt is installed and in your PATH"
+    run_status, run_output, _ = executor.run(project_directory)
+    return run_status, run_output
 
 def build_project(project_directory):
-    import subprocess
-
     logger.debug(f"Building project in directory: {project_directory}")
-    try:
-        result = subprocess.run(
-            ["sbt", ""],
-            cwd=project_directory,
-            # If the command launch fails, an exception is raised
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
-        logger.info(f"Build stdout: {result.stdout.decode('utf-8')}")
-        logger.error(f"Build stderr: {result.stderr.decode('utf-8')}")
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error building project: {e}")
-    except FileNotFoundError:
-        logger.error("sbt not found. Please ensure sbt is installed and in your PATH")
-        return False
+    build_status, build_output = executor.build(project_directory)
+    if not build_status:
+        logger.error(f"Error building project: {build_output}")
+    return build_status
 
 def __calc_working_code_samples(dataset, run_flag) -> tuple:
     """
     Calculate the number of working code samples in the dataset
     """
-    from retrieve_model_output import extract_prompt_and_code
+    from retrieve_model_output import extract_result_prompt_and_code
 
     if dataset is None:
         logger.error("No dataset file provided. Stopping further processing.")
@@ -212,8 +146,7 @@ def __calc_working_code_samples(dataset, run_flag) -> tuple:
     results = dataset["detailed_results"]
     dataset_len = dataset["training_dataset_size"]
     for chat in results:
-        generated = chat["generated"]
-        prompt, code = extract_prompt_and_code(generated)
+        prompt, code = extract_result_prompt_and_code(chat)
 
         # Define the path to the Main.scala file
         main_scala_path = os.path.join(scala_proj_dir, "src/main/scala/Main.scala")
@@ -255,9 +188,99 @@ def evaluate_generated_code(dataset_path, run_flag) -> tuple:
 
     return __calc_working_code_samples(dataset, run_flag)
 
+class BackgroundTask(QObject):
+    """Runs a function on a worker thread and reports its return value or error."""
+
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, function):
+        super().__init__()
+        self.function = function
+
+    def run(self):
+        try:
+            result = self.function()
+        except Exception as e:
+            logger.exception("Background task failed")
+            self.failed.emit(str(e))
+            return
+        self.finished.emit(result)
+
+
+class DatasetWorker(QObject):
+    """
+    Checks dataset snippets on a worker thread through the engine shared with
+    the server, spreading them over the workspace pool of `api`. Emits every
+    verdict as soon as it is known; `cancel` stops after the snippets being
+    checked, skipping all the others.
+    """
+
+    snippet_checked = pyqtSignal(dict)
+    progress = pyqtSignal(int, int, float)
+    finished = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    def __init__(self, api, snippets, build_flag, run_flag):
+        super().__init__()
+        self.api = api
+        self.snippets = snippets
+        self.build_flag = build_flag
+        self.run_flag = run_flag
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        start = time.perf_counter()
+        passed = 0
+        done = 0
+        checks = self.api.iter_check_snippets(self.snippets, self.build_flag, self.run_flag)
+        try:
+            for position, result in checks:
+                done += 1
+                passed += result["success"]
+                self.snippet_checked.emit({**self.snippets[position], **result})
+                elapsed = time.perf_counter() - start
+                self.progress.emit(done, len(self.snippets), done / elapsed if elapsed else 0.0)
+                if self._cancelled.is_set():
+                    break
+        except Exception as e:
+            logger.exception("Dataset processing failed")
+            self.failed.emit(str(e))
+            return
+        finally:
+            checks.close()
+        self.finished.emit(
+            {
+                "checked": done,
+                "passed": passed,
+                "total": len(self.snippets),
+                "cancelled": self._cancelled.is_set(),
+                "seconds": time.perf_counter() - start,
+            }
+        )
+
+
+def start_worker(owner, worker):
+    """Move `worker` to a new QThread owned by `owner` and start its `run`."""
+    thread = QThread(owner)
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    worker.finished.connect(thread.quit)
+    worker.failed.connect(thread.quit)
+    thread.finished.connect(thread.deleteLater)
+    thread.start()
+    return thread
+
+
 class TestSnippetWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, api=None):
         super().__init__()
+        self.api = api
+        self.task = None
+        self.thread = None
         self.setWindowTitle("Test Snippet")
         self.setGeometry(200, 200, 800, 600)
 
@@ -290,15 +313,23 @@ class TestSnippetWindow(QMainWindow):
 
         # Format and de-minify the code
         formatted_code = self.format_scala_code(code)
-
-        # Write code to scala file
-        with open(main_scala_path, "w") as scala_file:
-            scala_file.write(formatted_code)
-
-        # Run the project
-        run_status, run_output = run_project(output_directory)
-        
-        if run_status:
+        if self.api is None:
+            self.api = BuildCheckerAPI(executor=executor)
+
+        # Run the project on a worker thread, in a leased workspace
+        self.test_button.setEnabled(False)
+        self.result_label.setText("Running...")
+        self.task = BackgroundTask(
+            lambda: self.api.check_snippet(formatted_code, build=False, run=True, use_cache=False)
+        )
+        self.task.finished.connect(self.show_result)
+        self.task.failed.connect(self.show_error)
+        self.thread = start_worker(self, self.task)
+
+    def show_result(self, result):
+        self.test_button.setEnabled(True)
+        run_output = result["message"]
+        if result["success"]:
             self.result_label.setText("Success! Code ran without errors.")
             logger.info("Success! Code ran without errors.")  # Print to stdout
         else:
@@ -308,6 +339,10 @@ class TestSnippetWindow(QMainWindow):
             logger.error(f"Error: {error_cause}")  # Print to stdout
             logger.error(f"Run output: {run_output}") # Print full output to stdout
 
+    def show_error(self, message):
+        self.test_button.setEnabled(True)
+        self.result_label.setText(f"Error: {message}")
+
     def format_scala_code(self, code):
         formatted_code = code.replace("\\n", "\n").replace("\\t", "\t")
         return formatted_code # Print full output to stdout
@@ -356,6 +391,24 @@ class DatasetProcessorGUI(QMainWindow):
         self.process_button.clicked.connect(self.process_dataset)
         self.process_button.setEnabled(False)
 
+        # Snippets checked in parallel, each in its own workspace
+        self.workers_spinbox = QSpinBox()
+        self.workers_spinbox.setRange(1, max(1, os.cpu_count() or 1))
+        self.workers_spinbox.setValue(int(os.environ.get("BUILD_CHECKER_POOL_SIZE", "1")))
+        workers_row = QHBoxLayout()
+        workers_row.addWidget(QLabel("Parallel workspaces"))
+        workers_row.addWidget(self.workers_spinbox)
+
+        # Cancel button, enabled while a dataset is being processed
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_processing)
+        self.cancel_button.setEnabled(False)
+
+        # Progress, throughput and per-snippet verdicts
+        self.progress_bar = QProgressBar()
+        self.throughput_label = QLabel("")
+        self.results_list = QListWidget()
+
         # Status label
         self.status_label = QLabel("")
 
@@ -368,11 +421,23 @@ class DatasetProcessorGUI(QMainWindow):
         layout.addWidget(self.append_checkbox)
         layout.addWidget(self.main_dataset_label)
         layout.addWidget(self.select_main_dataset_button)
+        layout.addLayout(workers_row)
         layout.addWidget(self.process_button)
+        layout.addWidget(self.cancel_button)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.throughput_label)
+        layout.addWidget(self.results_list)
         layout.addWidget(self.status_label)
 
         self.selected_file = None
         self.main_dataset_path = None
+
+        # Checker shared by the dataset processing and the test window, and the
+        # background processing state
+        self.api = None
+        self.worker = None
+        self.worker_thread = None
+        self.processing = None
         
         # Add test snippet button
         self.test_button = QPushButton("Test Snippet")
@@ -404,7 +469,7 @@ class DatasetProcessorGUI(QMainWindow):
     
     def open_test_window(self):
         if not self.test_window:
-            self.test_window = TestSnippetWindow()
+            self.test_window = TestSnippetWindow(self.get_api())
         self.test_window.show()
 
     def handle_append_state(self, state):
@@ -446,60 +511,129 @@ class DatasetProcessorGUI(QMainWindow):
                     return True
         return False
 
+    def get_api(self):
+        """Checker with as many workspaces as selected, created on first use."""
+        pool_size = self.workers_spinbox.value()
+        if self.api is None or self.api.pool_size != pool_size:
+            if self.api is not None:
+                # Shut down the sbt servers and daemons the replaced checker booted
+                self.api.close()
+            self.api = BuildCheckerAPI(pool_size=pool_size, executor=executor)
+            if self.test_window is not None:
+                self.test_window.api = self.api
+        return self.api
+
     def process_dataset(self):
-        if self.selected_file:
-            self.status_label.setText("Loading dataset...")
-            dataset = load_json_dataset(self.selected_file)
-
-            if dataset:
-                self.status_label.setText("Processing dataset...")
-                try:
-                    working_snippets = []
-                    
-                    # Load main dataset early if we need to check for duplicates
-                    main_dataset = None
-                    if self.append_checkbox.isChecked() and self.main_dataset_path:
-                        with open(self.main_dataset_path, 'r') as f:
-                            main_dataset = json.load(f)
-                    
-                    def append_snippet_to_main_dataset(idx, prompt, code):
-                        if main_dataset and not self.is_duplicate_snippet(prompt, code, main_dataset):
-                            logger.info(f"Appending working snippet n°{idx} to main dataset: {prompt[:10]}...")
-                            working_snippets.append({
-                                "conversations": [
-                                    {"from": "human", "value": prompt},
-                                    {"from": "assistant", "value": code}
-                                ]
-                            })
-                        else:
-                            logger.info(f"Skipping duplicate snippet n°{idx}")
-
-                    process_snippets(
-                        dataset,
-                        build_flag=self.build_checkbox.isChecked(),
-                        run_flag=self.run_checkbox.isChecked(),
-                        use_hashes=self.hash_checkbox.isChecked(),
-                        on_working_snippet=append_snippet_to_main_dataset if self.append_checkbox.isChecked() else None
-                    )
-
-                    if self.append_checkbox.isChecked() and working_snippets and main_dataset:
-                        # Append working snippets
-                        main_dataset.extend(working_snippets)
-                        
-                        # Save updated dataset
-                        with open(self.main_dataset_path, 'w') as f:
-                            json.dump(main_dataset, f, indent=2)
-                        
-                        self.status_label.setText(
-                            f"Processing completed! Added {len(working_snippets)} new working snippets to main dataset"
-                        )
-                    else:
-                        self.status_label.setText("Processing completed successfully!")
-                except Exception as e:
-                    self.status_label.setText(f"Error during processing: {str(e)}")
-                    raise e
-            else:
-                self.status_label.setText("Error loading dataset")
+        if not self.selected_file:
+            return
+        self.status_label.setText("Loading dataset...")
+        dataset = load_json_dataset(self.selected_file)
+        if not dataset:
+            self.status_label.setText("Error loading dataset")
+            return
+
+        # Load main dataset early if we need to check for duplicates
+        append = self.append_checkbox.isChecked() and self.main_dataset_path
+        use_hashes = self.hash_checkbox.isChecked()
+        api = self.get_api()
+        snippets = api.dataset_snippets(dataset)
+        processed_hashes = load_processed_hashes(hash_file_path) if use_hashes else set()
+        if use_hashes:
+            snippets = [
+                snippet for snippet in snippets
+                if compute_hash(snippet["prompt"], snippet["code"]) not in processed_hashes
+            ]
+        self.processing = {
+            "append": append,
+            "use_hashes": use_hashes,
+            "processed_hashes": processed_hashes,
+            "working_snippets": [],
+            "failing_snippets": [],
+        }
+
+        self.results_list.clear()
+        self.progress_bar.setRange(0, len(snippets))
+        self.progress_bar.setValue(0)
+        self.throughput_label.setText("")
+        self.status_label.setText(f"Processing {len(snippets)} snippets...")
+        self.set_processing(True)
+
+        self.worker = DatasetWorker(
+            api, snippets, self.build_checkbox.isChecked(), self.run_checkbox.isChecked()
+        )
+        self.worker.snippet_checked.connect(self.on_snippet_checked)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.finished.connect(self.on_processing_finished)
+        self.worker.failed.connect(self.on_processing_failed)
+        self.worker_thread = start_worker(self, self.worker)
+
+    def set_processing(self, running):
+        self.process_button.setEnabled(not running)
+        self.select_button.setEnabled(not running)
+        self.workers_spinbox.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+
+    def cancel_processing(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.cancel_button.setEnabled(False)
+            self.status_label.setText("Cancelling after the snippets being checked...")
+
+    def on_snippet_checked(self, result):
+        label = f"Conversation {result['idx']}, snippet {result['position'] + 1}: {result['status']}"
+        if not result["success"]:
+            label += f" ({error_signature(result['message'])})"
+            self.processing["failing_snippets"].append({
+                "idx": result["idx"],
+                "prompt": result["prompt"],
+                "code": result["code"],
+                "error_output": result["message"],
+                "error_cause": result["message"].split('\n')[-1] if result["message"] else "Unknown error"
+            })
+        elif self.processing["append"]:
+            self.processing["working_snippets"].append(result)
+        if self.processing["use_hashes"]:
+            # Saved after every snippet, so that a crash loses no progress
+            self.processing["processed_hashes"].add(compute_hash(result["prompt"], result["code"]))
+            save_processed_hashes(self.processing["processed_hashes"], hash_file_path)
+        self.results_list.addItem(label)
+        self.results_list.scrollToBottom()
+
+    def on_progress(self, done, total, snippets_per_sec):
+        self.progress_bar.setValue(done)
+        self.throughput_label.setText(f"{done}/{total} snippets, {snippets_per_sec:.2f} snippets/s")
+
+    def on_processing_finished(self, summary):
+        self.set_processing(False)
+        processing = self.processing
+        save_failing_snippets(processing["failing_snippets"], failing_snippets_path)
+        logger.info(f"{summary['passed']}/{summary['checked']} snippets ran successfully.")
+
+        status = "Processing cancelled" if summary["cancelled"] else "Processing completed"
+        status += f": {summary['passed']}/{summary['checked']} passed in {summary['seconds']:.1f}s"
+        if processing["append"] and processing["working_snippets"]:
+            # Append working snippets, skipping those already in the main dataset
+            added = append_to_dataset(
+                self.main_dataset_path, processing["working_snippets"], prompt_field="prompt"
+            )
+            status += f". Added {added} new working snippets to main dataset"
+        self.status_label.setText(status)
+        self.worker = None
+
+    def on_processing_failed(self, message):
+        self.set_processing(False)
+        self.status_label.setText(f"Error during processing: {message}")
+        self.worker = None
+
+    def closeEvent(self, event):
+        # Let the snippets being checked finish before the interpreter exits
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker_thread.quit()
+            self.worker_thread.wait()
+        if self.api is not None:
+            self.api.close()
+        super().closeEvent(event)
 
     def save_current_config(self):
         """Save current GUI state to config file"""
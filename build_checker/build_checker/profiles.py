@@ -0,0 +1,146 @@
+import os
+import re
+import shutil
+
+IMPORT_PATTERN = re.compile(r"^\s*import\s+([\w.]+)", re.MULTILINE)
+
+# "akka.actor.typed.scaladsl.Behaviors" and "akka.actor.ActorSystem" both count as "akka.actor"
+PROFILE_DEPTH = 2
+NO_IMPORTS = "none"
+
+
+def imported_packages(code: str) -> list:
+    """Sorted packages imported by `code`, truncated to PROFILE_DEPTH segments."""
+    packages = set()
+    for match in IMPORT_PATTERN.finditer(code):
+        segments = [s for s in match.group(1).split(".") if s and s != "_"]
+        if segments:
+            packages.add(".".join(segments[:PROFILE_DEPTH]))
+    return sorted(packages)
+
+
+def import_profile(code: str) -> str:
+    """
+    Key grouping snippets that use the same libraries, e.g. "akka.actor+akka.cluster".
+    Snippets with similar imports tend to have similar build and run times.
+    """
+    return "+".join(imported_packages(code)) or NO_IMPORTS
+
+
+# Build profiles from the smallest to the largest dependency set. Each one lists
+# the optional Akka modules it provides and the artifacts of build.sbt it keeps;
+# "full" keeps the placeholder project's build.sbt as it is.
+BASE_ARTIFACTS = ("munit", "akka-actor-typed", "akka-actor", "akka-slf4j", "logback-classic")
+BUILD_PROFILES = {
+    "typed": {"modules": set(), "artifacts": BASE_ARTIFACTS},
+    "streams": {"modules": {"streams"}, "artifacts": BASE_ARTIFACTS + ("akka-stream",)},
+    "http": {
+        "modules": {"streams", "http"},
+        "artifacts": BASE_ARTIFACTS + ("akka-stream", "akka-http"),
+    },
+    "cluster": {
+        "modules": {"cluster"},
+        "artifacts": BASE_ARTIFACTS
+        + ("akka-cluster-typed", "akka-cluster", "akka-distributed-data"),
+    },
+    "full": {"modules": {"streams", "http", "cluster", "persistence"}, "artifacts": None},
+}
+FULL_PROFILE = "full"
+
+# Packages that are only available with an optional module
+MODULE_PACKAGES = {
+    "streams": ("akka.stream",),
+    "http": ("akka.http",),
+    "cluster": ("akka.cluster", "akka.remote", "akka.ddata"),
+    "persistence": ("akka.persistence",),
+}
+AKKA_REFERENCE = re.compile(r"\bakka\.\w+")
+DEPENDENCY_LINE = re.compile(r'^\s*"[\w.-]+"\s+%%?\s+"([\w.-]+)"\s+%')
+
+
+def required_modules(code: str) -> set:
+    """Optional Akka modules referenced by `code`, through imports or qualified names."""
+    from executors import strip_comments_and_strings
+
+    references = set(AKKA_REFERENCE.findall(strip_comments_and_strings(code)))
+    return {
+        module
+        for module, packages in MODULE_PACKAGES.items()
+        if any(ref == pkg or ref.startswith(pkg + ".") for ref in references for pkg in packages)
+    }
+
+
+def select_build_profile(code: str) -> str:
+    """Smallest build profile providing every Akka module the snippet uses."""
+    needed = required_modules(code)
+    for name, profile in BUILD_PROFILES.items():
+        if needed <= profile["modules"]:
+            return name
+    return FULL_PROFILE
+
+
+def render_build_sbt(build_sbt: str, artifacts) -> str:
+    """Keep only the dependencies of `build_sbt` whose artifact is in `artifacts`."""
+    lines = build_sbt.splitlines()
+    start = next(i for i, line in enumerate(lines) if "libraryDependencies ++= Seq(" in line)
+    depth, end = 0, start
+    for end in range(start, len(lines)):
+        code = lines[end].split("//")[0]
+        depth += code.count("(") - code.count(")")
+        if depth <= 0:
+            break
+    kept = []
+    for line in lines[start + 1 : end]:
+        match = DEPENDENCY_LINE.match(line)
+        if match and match.group(1) in artifacts:
+            kept.append(line.split("//")[0].rstrip().rstrip(","))
+    closing = lines[end][lines[end].rfind(")") :]
+    indent = lines[end][: len(lines[end]) - len(lines[end].lstrip())]
+    return "\n".join(
+        lines[: start + 1] + [",\n".join(kept), indent + closing] + lines[end + 1 :]
+    ) + "\n"
+
+
+def ensure_profile_template(base_template: str, profiles_dir: str, name: str) -> str:
+    """
+    Directory of the placeholder project restricted to build profile `name`,
+    created from `base_template` on first use. The full profile is the base itself.
+    """
+    from workspace_pool import WORKSPACE_IGNORE, file_lock
+
+    artifacts = BUILD_PROFILES[name]["artifacts"]
+    if artifacts is None:
+        return base_template
+    template = os.path.join(profiles_dir, name)
+    build_sbt_path = os.path.join(template, "build.sbt")
+    with open(os.path.join(base_template, "build.sbt")) as f:
+        build_sbt = render_build_sbt(f.read(), artifacts)
+    with file_lock(os.path.join(profiles_dir, ".create.lock")):
+        if os.path.exists(build_sbt_path):
+            with open(build_sbt_path) as f:
+                if f.read() == build_sbt:
+                    return template
+        staging = template + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.copytree(base_template, staging, ignore=WORKSPACE_IGNORE)
+        with open(os.path.join(staging, "build.sbt"), "w") as f:
+            f.write(build_sbt)
+        shutil.rmtree(template, ignore_errors=True)
+        os.replace(staging, template)
+    return template
+
+
+# Failures that a reduced build profile may cause: an akka package or class from a
+# module it left out (an unresolved import reports the missing package, e.g. "value
+# stream is not a member of akka"). Snippets failing like this are checked again
+# with the full profile; ordinary undefined identifiers are not.
+MISSING_DEPENDENCY = re.compile(
+    r"not found: (?:value |type |object )?akka\b"
+    r"|is not a member of (?:package )?akka\b"
+    r"|(?:NoClassDefFoundError|ClassNotFoundException):? akka",
+    re.IGNORECASE,
+)
+
+
+def needs_full_profile(message: str) -> bool:
+    return MISSING_DEPENDENCY.search(message) is not None
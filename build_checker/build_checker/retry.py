@@ -0,0 +1,52 @@
+import os
+import re
+import random
+
+# sbt compiles before running, so a run can fail on a compile error too. Compile
+# errors start with the source file ("[error] /ws/Main.scala:3:5: ..."), unlike
+# stack trace lines of runtime failures ("[error] \tat Main$.main(Main.scala:5)").
+COMPILE_ERROR = re.compile(r"\[error\]\s+\S*\.scala:|Compilation failed")
+
+
+def is_compile_error(message: str) -> bool:
+    return COMPILE_ERROR.search(message) is not None
+
+
+class RetryPolicy:
+    """
+    Decides which failed runs are worth running again.
+
+    Compile errors are deterministic and never retried. Run failures and
+    timeouts (the statuses in `retry_on`) are retried up to `max_retries`
+    times, after a randomized exponential backoff so that retries of
+    timing-dependent programs do not run in lockstep with the load that
+    made them fail.
+    """
+
+    def __init__(
+        self,
+        retry_on=(),
+        max_retries: int = None,
+        base_delay: float = None,
+        max_delay: float = 5.0,
+    ):
+        self.retry_on = tuple(retry_on)
+        if max_retries is None:
+            max_retries = int(os.environ.get("BUILD_CHECKER_RUN_RETRIES", "1"))
+        if base_delay is None:
+            base_delay = float(os.environ.get("BUILD_CHECKER_RETRY_DELAY", "0.5"))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, status: str, message: str, attempt: int) -> bool:
+        """Whether to run again after `attempt` (1-based) failed with `status`."""
+        return (
+            attempt <= self.max_retries
+            and status in self.retry_on
+            and not is_compile_error(message)
+        )
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt` (full jitter)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
@@ -1,12 +1,53 @@
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, List
 import uvicorn
 from api import BuildCheckerAPI
+from benchmark import summarize_latencies
+from executors import EXECUTORS
 import os
 
-app = FastAPI(title="Build Checker API")
-api = BuildCheckerAPI()
+# Built once per process at startup, from the options start_server forwards
+# through the environment (see lifespan)
+api: Optional[BuildCheckerAPI] = None
+
+# Set BUILD_CHECKER_WARMUP=1 (or pass --warmup) to prime sbt before serving load
+WARMUP_ON_STARTUP = os.environ.get("BUILD_CHECKER_WARMUP", "0") == "1"
+
+
+# Event loop lag samples as (timestamp, seconds late), kept for the last ~10 minutes
+LAG_SAMPLE_INTERVAL = 0.1
+event_loop_lag = deque(maxlen=6000)
+
+
+async def monitor_event_loop_lag():
+    """Measure how late the event loop wakes up from a fixed-interval sleep."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + LAG_SAMPLE_INTERVAL
+        await asyncio.sleep(LAG_SAMPLE_INTERVAL)
+        event_loop_lag.append((time.time(), max(0.0, loop.time() - expected)))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global api
+    api = BuildCheckerAPI()
+    if WARMUP_ON_STARTUP:
+        api.start_warmup()
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+    yield
+    lag_monitor.cancel()
+    api.metrics.clear_gauges()
+    api.close()
+
+
+app = FastAPI(title="Build Checker API", lifespan=lifespan)
 
 class CodeSnippet(BaseModel):
     code: str
@@ -28,17 +69,43 @@ class ProcessResponse(BaseModel):
     total_snippets: int
     completed: bool
     message: str
+    # Per-snippet results in input order, column-wise (see api.encode_verdicts)
+    verdicts: Optional[dict] = None
 
 class InlineDataset(BaseModel):
     data: List
     build: bool = True
     run: bool = True
     use_hashes: bool = False
+    return_verdicts: bool = True
+
+class BatchSnippet(BaseModel):
+    code: str
+    prompt: Optional[str] = None
+
+class SnippetBatch(BaseModel):
+    snippets: List[BatchSnippet]
+    build: bool = True
+    run: bool = True
+    use_cache: bool = True
+
+class SnippetVerdict(BaseModel):
+    success: bool
+    message: str
+    status: str
+    error: str = ""
+    cache_hit: bool = False
+
+class BatchResponse(BaseModel):
+    results: List[SnippetVerdict]
+    successful_runs: int
+    total_snippets: int
 
 @app.post("/test-snippet", response_model=SnippetResponse)
 async def test_snippet(snippet: CodeSnippet):
     """Test a single Scala code snippet"""
-    success, message = api.test_single_snippet(
+    success, message = await run_in_threadpool(
+        api.test_single_snippet,
         snippet.code,
         build=snippet.build,
         run=snippet.run
@@ -46,6 +113,19 @@ async def test_snippet(snippet: CodeSnippet):
     return SnippetResponse(success=success, message=message)
 
 
+@app.post("/check-batch", response_model=BatchResponse)
+async def check_batch(batch: SnippetBatch):
+    """Check many snippets in one request, returning a verdict per snippet"""
+    result = await run_in_threadpool(
+        api.check_batch,
+        [snippet.model_dump() for snippet in batch.snippets],
+        build=batch.build,
+        run=batch.run,
+        use_cache=batch.use_cache,
+    )
+    return BatchResponse(**result)
+
+
 @app.post("/process-dataset-inline", response_model=ProcessResponse)
 async def process_dataset_inline(dataset: InlineDataset):
     """Process a dataset of code snippets passed directly as JSON"""
@@ -67,12 +147,15 @@ async def process_dataset_inline(dataset: InlineDataset):
                             snippets.append(conv['value'])
 
         # Process all snippets
-        successful_runs, total_snippets = api.process_snippets(
+        report = await run_in_threadpool(
+            api.validate_dataset,
             data,
             dataset.build,
             dataset.run,
             dataset.use_hashes
         )
+        successful_runs = report["successful_runs"]
+        total_snippets = report["total_snippets"]
 
         print(f"Processed {successful_runs}/{total_snippets} snippets successfully")
 
@@ -80,7 +163,8 @@ async def process_dataset_inline(dataset: InlineDataset):
             successful_runs=successful_runs,
             total_snippets=total_snippets,
             completed=True,
-            message=f"Processed {successful_runs}/{total_snippets} snippets successfully"
+            message=f"Processed {successful_runs}/{total_snippets} snippets successfully",
+            verdicts=report["verdicts"] if dataset.return_verdicts else None,
         )
     except Exception as e:
         raise e
@@ -90,9 +174,114 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
-def start_server(host="localhost", port=8000):
-    """Start the FastAPI server"""
-    uvicorn.run(app, host=host, port=port)
+# Plain `def` handlers below run in the threadpool: they query SQLite, which
+# would block the event loop
+@app.get("/ready")
+def readiness_check():
+    """Readiness endpoint: reports warm capacity, queue depth and cache hit rate"""
+    return api.readiness()
+
+@app.get("/metrics")
+def metrics(window: float = 60.0):
+    """Event loop lag over the last `window` seconds, shared counters and run timeouts"""
+    since = time.time() - window
+    lag_ms = [lag * 1000 for timestamp, lag in event_loop_lag if timestamp >= since]
+    return {
+        "pid": os.getpid(),
+        "event_loop_lag_ms": {"samples": len(lag_ms), **summarize_latencies(lag_ms)},
+        "counters": api.metrics.counters(),
+        "run_timeouts": api.run_timeouts.stats(api.executor.name),
+    }
+
+def start_server(
+    host="localhost",
+    port=8000,
+    warmup=None,
+    workers=1,
+    pool_size=None,
+    executor=None,
+    tmpfs=None,
+    build_profiles=None,
+):
+    """
+    Start the FastAPI server.
+
+    With `workers` > 1 uvicorn spawns one process per worker, each importing this
+    module; they share the workspace pool, verdict cache and metrics on disk.
+    Options are forwarded to the workers through environment variables, from
+    which each process builds its BuildCheckerAPI at startup.
+    """
+    global WARMUP_ON_STARTUP
+    if warmup is not None:
+        WARMUP_ON_STARTUP = warmup
+        os.environ["BUILD_CHECKER_WARMUP"] = "1" if warmup else "0"
+    if pool_size is None and workers > 1:
+        # One workspace per worker, unless configured otherwise
+        pool_size = int(os.environ.get("BUILD_CHECKER_POOL_SIZE", workers))
+    if pool_size is not None:
+        os.environ["BUILD_CHECKER_POOL_SIZE"] = str(pool_size)
+    if executor is not None:
+        os.environ["BUILD_CHECKER_EXECUTOR"] = executor
+    if tmpfs is not None:
+        os.environ["BUILD_CHECKER_TMPFS"] = "1" if tmpfs else "0"
+    if build_profiles is not None:
+        os.environ["BUILD_CHECKER_BUILD_PROFILES"] = "1" if build_profiles else "0"
+
+    if workers > 1:
+        uvicorn.run("server:app", host=host, port=port, workers=workers)
+    else:
+        uvicorn.run(app, host=host, port=port)
 
 if __name__ == "__main__":
-    start_server()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build Checker API server")
+    parser.add_argument("--host", type=str, default="localhost")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--warmup",
+        action="store_true",
+        default=None,
+        help="Compile and run a trivial program at startup before reporting ready",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of uvicorn worker processes",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=None,
+        help="Number of sbt workspaces shared by the workers (default: one per worker)",
+    )
+    parser.add_argument(
+        "--executor",
+        choices=sorted(EXECUTORS),
+        default=None,
+        help="Execution backend (default: $BUILD_CHECKER_EXECUTOR or cold_sbt)",
+    )
+    parser.add_argument(
+        "--tmpfs",
+        action="store_true",
+        default=None,
+        help="Keep workspaces and build outputs on a RAM-backed directory (/dev/shm)",
+    )
+    parser.add_argument(
+        "--build-profiles",
+        action="store_true",
+        default=None,
+        help="Check snippets in projects that only declare the Akka modules they import",
+    )
+    args = parser.parse_args()
+    start_server(
+        args.host,
+        args.port,
+        args.warmup,
+        args.workers,
+        args.pool_size,
+        args.executor,
+        args.tmpfs,
+        args.build_profiles,
+    )
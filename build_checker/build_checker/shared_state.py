@@ -0,0 +1,186 @@
+import os
+import time
+import sqlite3
+from contextlib import closing
+
+
+class _SqliteStore:
+    """
+    Small SQLite-backed store shared by every process of the build checker.
+
+    A connection is opened per operation, so instances are safe to use from
+    request threads and from several uvicorn workers at the same time.
+    """
+
+    SCHEMA = ""
+    # Columns added after a table was first released, as {table: [(name, definition)]}
+    ADDED_COLUMNS = {}
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+            self._add_missing_columns(conn)
+
+    def _add_missing_columns(self, conn: sqlite3.Connection) -> None:
+        for table, columns in self.ADDED_COLUMNS.items():
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for name, definition in columns:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+
+class VerdictCache(_SqliteStore):
+    """Build/run verdicts of already checked snippets, keyed by code and flags."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS verdicts (
+        key TEXT PRIMARY KEY,
+        success INTEGER NOT NULL,
+        message TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        flaky INTEGER NOT NULL DEFAULT 0
+    );
+    """
+    ADDED_COLUMNS = {"verdicts": [("flaky", "INTEGER NOT NULL DEFAULT 0")]}
+
+    def get(self, key: str):
+        """Return the cached `(success, message, flaky)` for `key`, or None."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT success, message, flaky FROM verdicts WHERE key = ?", (key,)
+            ).fetchone()
+        return (bool(row[0]), row[1], bool(row[2])) if row else None
+
+    def put(self, key: str, success: bool, message: str, flaky: bool = False) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO verdicts (key, success, message, created_at, flaky) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, int(success), message, time.time(), int(flaky)),
+            )
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+
+
+class SharedMetrics(_SqliteStore):
+    """
+    Counters aggregated across worker processes, plus per-process gauges
+    (e.g. queue depth) that are summed when read.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS counters (
+        name TEXT PRIMARY KEY,
+        value REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS gauges (
+        pid INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        value REAL NOT NULL,
+        PRIMARY KEY (pid, name)
+    );
+    """
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO counters VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, amount),
+            )
+
+    def counters(self) -> dict:
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT name, value FROM counters").fetchall())
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set this process's value of gauge `name`."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO gauges VALUES (?, ?, ?)",
+                (os.getpid(), name, value),
+            )
+
+    def gauge_total(self, name: str) -> float:
+        """Sum of gauge `name` over every live process."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT pid, value FROM gauges WHERE name = ?", (name,)
+            ).fetchall()
+        return sum(value for pid, value in rows if _pid_alive(pid))
+
+    def clear_gauges(self) -> None:
+        """Drop the gauges of this process, e.g. on shutdown."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM gauges WHERE pid = ?", (os.getpid(),))
+
+
+class RunHistory(_SqliteStore):
+    """
+    Duration of every snippet run, per executor, import profile and error
+    signature (empty for successful runs). Used to derive adaptive timeouts.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        executor TEXT NOT NULL,
+        profile TEXT NOT NULL,
+        signature TEXT NOT NULL,
+        success INTEGER NOT NULL,
+        seconds REAL NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS runs_by_profile
+        ON runs (executor, profile, success, created_at);
+    """
+
+    def record(self, executor: str, profile: str, signature: str, success: bool, seconds: float) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?)",
+                (executor, profile, signature, int(success), seconds, time.time()),
+            )
+
+    def durations(self, executor: str, profile: str = None, success: bool = True, limit: int = 500) -> list:
+        """Most recent run durations of `executor`, for one profile or all of them."""
+        query = "SELECT seconds FROM runs WHERE executor = ? AND success = ?"
+        params = [executor, int(success)]
+        if profile is not None:
+            query += " AND profile = ?"
+            params.append(profile)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute(query, params).fetchall()]
+
+    def summary(self, executor: str) -> list:
+        """Run count and mean/max duration per profile and error signature."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT profile, signature, COUNT(*), AVG(seconds), MAX(seconds) "
+                "FROM runs WHERE executor = ? GROUP BY profile, signature "
+                "ORDER BY COUNT(*) DESC",
+                (executor,),
+            ).fetchall()
+        return [
+            {"profile": p, "signature": sig, "runs": n, "mean_seconds": avg, "max_seconds": mx}
+            for p, sig, n, avg, mx in rows
+        ]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,72 @@
+import os
+from shared_state import RunHistory
+from stats import percentile
+
+# Hard upper bound of a single run, also used while there is too little history
+DEFAULT_MAX_TIMEOUT = 300.0
+DEFAULT_MIN_TIMEOUT = 10.0
+
+
+class AdaptiveTimeout:
+    """
+    Run timeouts learned from the durations of past successful runs.
+
+    The timeout of a snippet is a high percentile of the successful runs of
+    snippets with the same import profile (or of all snippets, if the profile
+    has too few), scaled by `1 + margin`, and clamped to [min_timeout,
+    max_timeout]. Programs that are far slower than anything similar that
+    ever succeeded are most likely hung, so they are killed early.
+
+    Runs killed by the timeout are recorded as failures, so they never lower
+    the percentile; the margin absorbs the bias towards fast successes.
+    """
+
+    def __init__(
+        self,
+        history: RunHistory,
+        max_timeout: float = None,
+        min_timeout: float = None,
+        q: float = 95,
+        margin: float = 0.5,
+        min_samples: int = 20,
+        enabled: bool = None,
+    ):
+        self.history = history
+        self.max_timeout = max_timeout or float(
+            os.environ.get("BUILD_CHECKER_RUN_TIMEOUT", DEFAULT_MAX_TIMEOUT)
+        )
+        self.min_timeout = min(
+            min_timeout or float(os.environ.get("BUILD_CHECKER_MIN_RUN_TIMEOUT", DEFAULT_MIN_TIMEOUT)),
+            self.max_timeout,
+        )
+        self.q = q
+        self.margin = margin
+        self.min_samples = min_samples
+        if enabled is None:
+            enabled = os.environ.get("BUILD_CHECKER_ADAPTIVE_TIMEOUT", "1") == "1"
+        self.enabled = enabled
+
+    def timeout_for(self, executor: str, profile: str) -> float:
+        """Timeout in seconds for a run of a snippet with import profile `profile`."""
+        if not self.enabled:
+            return self.max_timeout
+        durations = self.history.durations(executor, profile)
+        if len(durations) < self.min_samples:
+            durations = self.history.durations(executor)
+        if len(durations) < self.min_samples:
+            return self.max_timeout
+        timeout = percentile(durations, self.q) * (1 + self.margin)
+        return min(max(timeout, self.min_timeout), self.max_timeout)
+
+    def stats(self, executor: str) -> dict:
+        """Current timeout per known profile, plus the history it is derived from."""
+        summary = self.history.summary(executor)
+        profiles = sorted({row["profile"] for row in summary})
+        return {
+            "enabled": self.enabled,
+            "max_timeout": self.max_timeout,
+            "min_timeout": self.min_timeout,
+            "default": self.timeout_for(executor, None),
+            "profiles": {p: self.timeout_for(executor, p) for p in profiles},
+            "history": summary,
+        }
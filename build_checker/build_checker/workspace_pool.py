@@ -0,0 +1,221 @@
+import os
+import time
+import fcntl
+import shutil
+import threading
+from contextlib import contextmanager
+from log.logger import logger
+
+# Build outputs and IDE state are never copied between workspaces
+WORKSPACE_IGNORE = shutil.ignore_patterns(
+    "target", ".bsp", ".bloop", ".metals", ".lease", "application.log"
+)
+
+# RAM-backed directory used for workspaces when tmpfs is enabled
+DEFAULT_TMPFS_DIR = "/dev/shm"
+# Build output directories that garbage collection may delete from idle workspaces
+BUILD_OUTPUT_DIRS = ("target", "project/target", "project/project/target")
+
+
+def tmpfs_root(name: str = "build_checker"):
+    """
+    Per-user directory on tmpfs (BUILD_CHECKER_TMPFS_DIR, default /dev/shm),
+    or None if there is no such mount.
+    """
+    base = os.environ.get("BUILD_CHECKER_TMPFS_DIR", DEFAULT_TMPFS_DIR)
+    if not os.path.isdir(base):
+        return None
+    return os.path.join(base, f"{name}-{os.getuid()}")
+
+
+def directory_size(path: str) -> int:
+    """Bytes used by the files under `path`."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+@contextmanager
+def file_lock(lock_path: str):
+    """Hold an exclusive advisory lock on `lock_path`, shared by every process on the host."""
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        _release(fd)
+
+
+class Workspace:
+    """A copy of the placeholder sbt project that one snippet at a time is checked in."""
+
+    def __init__(self, index: int, path: str):
+        self.index = index
+        self.path = path
+        self.name = os.path.basename(path)
+        self.main_scala_path = os.path.join(path, "src/main/scala/Main.scala")
+        self.lock_path = os.path.join(path, ".lease")
+
+    def __repr__(self):
+        return f"Workspace({self.index}, {self.path!r})"
+
+
+class WorkspacePool:
+    """
+    Fixed set of sbt workspaces leased through file locks, so that threads and
+    uvicorn worker processes never write to the same Main.scala concurrently.
+
+    Workspace 0 is the template project itself, unless `use_template` is False;
+    the others are created under `root_dir` as copies of it on first use.
+
+    With a `budget_bytes`, build outputs of idle workspaces are deleted, least
+    recently used first, whenever the pool grows beyond the budget (checked at
+    most every `gc_interval` seconds). This keeps RAM-backed pools bounded.
+    """
+
+    def __init__(
+        self,
+        template_dir: str,
+        root_dir: str,
+        size: int = 1,
+        use_template: bool = True,
+        budget_bytes: int = None,
+        gc_interval: float = 60,
+    ):
+        if size < 1:
+            raise ValueError("Workspace pool size must be at least 1")
+        self.template_dir = template_dir
+        self.root_dir = root_dir
+        self.size = size
+        first_copy = 1 if use_template else 0
+        self.workspaces = [Workspace(0, template_dir)] if use_template else []
+        self.workspaces += [
+            Workspace(i, os.path.join(root_dir, f"akka_placeholder_{i}"))
+            for i in range(first_copy, size)
+        ]
+        self.budget_bytes = budget_bytes
+        self.gc_interval = gc_interval
+        self.usage_bytes = None
+        self._last_gc = time.monotonic()
+        self._waiting = 0
+        self._waiting_lock = threading.Lock()
+
+    @property
+    def waiting(self) -> int:
+        """Number of callers in this process waiting for a free workspace."""
+        return self._waiting
+
+    def ensure_created(self, workspace: Workspace) -> None:
+        """Copy the template project into `workspace` if it does not exist yet."""
+        if os.path.exists(workspace.main_scala_path):
+            return
+        with file_lock(os.path.join(self.root_dir, ".create.lock")):
+            if os.path.exists(workspace.main_scala_path):
+                return
+            logger.info(f"Creating workspace {workspace.path}")
+            staging = workspace.path + ".tmp"
+            shutil.rmtree(staging, ignore_errors=True)
+            shutil.copytree(self.template_dir, staging, ignore=WORKSPACE_IGNORE)
+            shutil.rmtree(workspace.path, ignore_errors=True)
+            os.replace(staging, workspace.path)
+
+    @contextmanager
+    def lease(self, poll_interval: float = 0.05):
+        """Block until a workspace is free and hold it for the duration of the block."""
+        with self._waiting_lock:
+            self._waiting += 1
+        try:
+            workspace, fd = None, None
+            while fd is None:
+                for candidate in self.workspaces:
+                    fd = self._try_acquire(candidate)
+                    if fd is not None:
+                        workspace = candidate
+                        break
+                else:
+                    time.sleep(poll_interval)
+        finally:
+            with self._waiting_lock:
+                self._waiting -= 1
+        try:
+            os.utime(workspace.lock_path)
+            yield workspace
+        finally:
+            _release(fd)
+        self._maybe_collect_garbage()
+
+    @contextmanager
+    def try_lease(self, workspace: Workspace):
+        """Lease a specific workspace, yielding None if another caller holds it."""
+        fd = self._try_acquire(workspace)
+        try:
+            yield workspace if fd is not None else None
+        finally:
+            if fd is not None:
+                _release(fd)
+
+    def _try_acquire(self, workspace: Workspace):
+        self.ensure_created(workspace)
+        return _try_flock(workspace.lock_path)
+
+    def _maybe_collect_garbage(self) -> None:
+        if self.budget_bytes is None or time.monotonic() - self._last_gc < self.gc_interval:
+            return
+        self._last_gc = time.monotonic()
+        self.collect_garbage()
+
+    def collect_garbage(self) -> int:
+        """
+        Delete build outputs of idle workspaces, least recently leased first,
+        until the pool fits in its budget. Returns the number of bytes freed.
+        """
+        freed = 0
+        with file_lock(os.path.join(self.root_dir, ".gc.lock")):
+            sizes = {ws.index: directory_size(ws.path) for ws in self.workspaces}
+            self.usage_bytes = sum(sizes.values())
+            if self.budget_bytes is None or self.usage_bytes <= self.budget_bytes:
+                return 0
+            by_last_use = sorted(
+                self.workspaces,
+                key=lambda ws: os.path.getmtime(ws.lock_path) if os.path.exists(ws.lock_path) else 0,
+            )
+            for workspace in by_last_use:
+                if self.usage_bytes - freed <= self.budget_bytes:
+                    break
+                with self.try_lease(workspace) as idle:
+                    if idle is None:
+                        continue
+                    for output_dir in BUILD_OUTPUT_DIRS:
+                        path = os.path.join(workspace.path, output_dir)
+                        if os.path.isdir(path):
+                            size = directory_size(path)
+                            shutil.rmtree(path, ignore_errors=True)
+                            freed += size
+            self.usage_bytes -= freed
+        logger.info(
+            f"Workspace GC freed {freed / 2**20:.1f} MiB, "
+            f"{self.usage_bytes / 2**20:.1f} MiB in use (budget {self.budget_bytes / 2**20:.0f} MiB)"
+        )
+        return freed
+
+
+def _try_flock(lock_path: str):
+    """Take an exclusive lock without blocking, returning its fd or None if taken."""
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _release(fd: int) -> None:
+    fcntl.flock(fd, fcntl.LOCK_UN)
+    os.close(fd)
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The build checker modules use flat imports (`from api import ...`), as when
+# running the server from inside build_checker/build_checker
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "build_checker"
+)
+sys.path.append(package_dir)
@@ -0,0 +1,21 @@
+from benchmark import compare_to_baseline
+from stats import percentile
+
+
+def test_percentile_interpolates():
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4.0
+    assert percentile([], 95) == 0.0
+
+
+def test_compare_to_baseline_flags_regressions():
+    baseline = {"snippets_per_sec": 10.0, "phases": {"run": {"p95": 1.0}}}
+
+    faster = {"snippets_per_sec": 11.0, "phases": {"run": {"p95": 0.9}}}
+    assert compare_to_baseline(faster, baseline, max_regression=0.1) == []
+
+    slower = {"snippets_per_sec": 8.0, "phases": {"run": {"p95": 1.5}}}
+    regressions = compare_to_baseline(slower, baseline, max_regression=0.1)
+    assert len(regressions) == 2
@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+import subprocess
+import pytest
+from cli import EXIT_OK, EXIT_THRESHOLD, EXIT_USAGE, append_to_dataset, main
+
+PASSING = "object Main extends App { println(1) }"
+FAILING = "object Main extends App { println(1 }"
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    monkeypatch.setenv("BUILD_CHECKER_STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setenv("BUILD_CHECKER_WORKSPACES_DIR", str(tmp_path / "workspaces"))
+    monkeypatch.setenv("BUILD_CHECKER_FAILING_SNIPPETS", str(tmp_path / "failing.json"))
+    monkeypatch.setenv("BUILD_CHECKER_FAKE_RUN_LATENCY", "0")
+    data = [
+        {"conversations": [
+            {"from": "human", "value": f"question {i}"},
+            {"from": "assistant", "value": FAILING if i == 0 else PASSING.replace("1", str(i))},
+        ]}
+        for i in range(4)
+    ]
+    path = tmp_path / "dataset.json"
+    path.write_text(json.dumps(data))
+    return path
+
+
+def test_validate_reports_ndjson_and_thresholds(dataset, tmp_path, capsys):
+    main_dataset = tmp_path / "main.json"
+    main_dataset.write_text("[]")
+    args = [
+        "validate", str(dataset), "--executor", "fake", "--workers", "2", "--build",
+        "--ndjson", "--append-to", str(main_dataset),
+    ]
+    assert main(args + ["--min-pass-rate", "0.9"]) == EXIT_THRESHOLD
+
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    snippets = [r for r in records if r["type"] == "snippet"]
+    summary = records[-1]
+    assert len(snippets) == 4
+    assert summary["type"] == "summary"
+    assert summary["passed"] == 3 and summary["statuses"] == {"passed": 3, "build_failed": 1}
+    assert summary["appended"] == 3
+    assert len(json.loads(main_dataset.read_text())) == 3
+
+    # Resuming checks nothing again and appends no duplicates
+    assert main(args + ["--resume", "--max-failures", "1"]) == EXIT_OK
+    summary = json.loads(capsys.readouterr().out.splitlines()[-1])
+    assert summary["resumed"] == 4
+    assert summary["appended"] == 0
+
+
+def test_validate_resumes_after_checkpointed_snippets(dataset, capsys):
+    args = ["validate", str(dataset), "--executor", "fake", "--build", "--ndjson"]
+    assert main(args) == EXIT_OK
+    checkpoint = dataset.parent / "dataset.json.checkpoint.ndjson"
+    lines = checkpoint.read_text().splitlines()
+    # Simulate an interrupted run: two verdicts and a truncated line
+    checkpoint.write_text("\n".join(lines[:2]) + "\n" + lines[2][:10])
+    capsys.readouterr()
+
+    assert main(args + ["--resume"]) == EXIT_OK
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert sum(r["type"] == "snippet" for r in records) == 2
+    assert records[-1]["resumed"] == 2
+    assert len(checkpoint.read_text().splitlines()) == 5
+
+
+def test_append_to_dataset_stores_the_chosen_prompt(tmp_path):
+    path = tmp_path / "main.json"
+    path.write_text("[]")
+    snippet = {"question": "question 1", "prompt": "Human: question 0\nHuman: question 1", "code": PASSING}
+    assert append_to_dataset(str(path), [snippet], prompt_field="prompt") == 1
+    assert append_to_dataset(str(path), [snippet], prompt_field="prompt") == 0
+    [conversation] = json.loads(path.read_text())
+    assert conversation["conversations"][0]["value"] == snippet["prompt"]
+
+
+def test_console_script_imports_from_the_package(tmp_path):
+    # As the installed `build-checker` script does: `from build_checker.cli import main`
+    # with only the project root importable, not build_checker/build_checker
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys; from build_checker.cli import main; sys.exit(main())",
+         "validate", str(tmp_path / "missing.json")],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": project_root},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == EXIT_USAGE, result.stderr
+
+
+def test_validate_checks_the_samples_of_evaluation_results(dataset, tmp_path, capsys):
+    results = tmp_path / "evaluation_results.json"
+    results.write_text(json.dumps({"detailed_results": [{"generated": PASSING}, {"generated": FAILING}]}))
+    main_dataset = tmp_path / "main.json"
+    main_dataset.write_text("[]")
+    args = ["validate", str(results), "--executor", "fake", "--build", "--ndjson", "--append-to", str(main_dataset)]
+    assert main(args) == EXIT_OK
+    summary = json.loads(capsys.readouterr().out.splitlines()[-1])
+    assert summary["total_snippets"] == 2 and summary["passed"] == 1
+    # Samples have no question to pair them with in the conversation dataset
+    assert summary["appended"] == 0
+
+
+def test_validate_rejects_datasets_without_snippets(dataset, tmp_path):
+    empty = tmp_path / "empty.json"
+    empty.write_text(json.dumps([{"conversations": [{"from": "human", "value": "question"}]}]))
+    assert main(["validate", str(empty), "--executor", "fake"]) == EXIT_USAGE
@@ -0,0 +1,177 @@
+import os
+import sys
+import time
+import subprocess
+import pytest
+from jvm import ClassDataArchive
+from executors import (
+    DirectJavaExecutor,
+    FakeExecutor,
+    WarmSbtExecutor,
+    create_executor,
+    find_main_class,
+)
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / "src/main/scala").mkdir(parents=True)
+    return tmp_path
+
+
+def write_main(workspace, code):
+    (workspace / "src/main/scala/Main.scala").write_text(code)
+
+
+def test_find_main_class():
+    assert find_main_class("object Main extends App { println(1) }") == "Main"
+    assert find_main_class("package demo\n@main def hello(): Unit = ()") == "demo.hello"
+    code = "object Helper { val x = 1 }\nobject Hello {\n  def main(args: Array[String]) = ()\n}"
+    assert find_main_class(code) == "Hello"
+    assert find_main_class("class NotRunnable") is None
+
+
+def test_fake_executor_verdicts(workspace):
+    executor = FakeExecutor()
+
+    write_main(workspace, 'object Main extends App { println("ok") }')
+    assert executor.build(str(workspace))[0]
+    assert executor.run(str(workspace))[0]
+
+    write_main(workspace, "object Main extends App { println(1 }")
+    assert not executor.build(str(workspace))[0]
+
+    write_main(workspace, "object Main extends App { def f: Int = ???; f }")
+    assert executor.build(str(workspace))[0]
+    assert not executor.run(str(workspace))[0]
+
+
+def test_fake_executor_timeout(workspace):
+    executor = FakeExecutor(run_latency=0.2)
+    write_main(workspace, "object Main extends App {}")
+    success, message, _ = executor.run(str(workspace), timeout=0.01)
+    assert not success
+    assert "timed out" in message
+
+
+def test_create_executor_rejects_unknown_backend():
+    assert create_executor("fake").name == "fake"
+    with pytest.raises(ValueError):
+        create_executor("does_not_exist")
+
+
+class RecordingClassData:
+    """Class data archive that asks every run to record its class list."""
+
+    def __init__(self):
+        self.dumped = []
+
+    def options(self, jars):
+        return ["-XX:DumpLoadedClassList=classes.lst"]
+
+    def dump(self, jars):
+        self.dumped.append(jars)
+        return True
+
+    def abandon(self, jars):
+        pass
+
+
+@pytest.mark.parametrize("java, dumped", [("true", 1), ("false", 0)])
+def test_direct_java_dumps_class_data_only_after_clean_runs(workspace, java, dumped):
+    executor = DirectJavaExecutor(compiler=FakeExecutor(), java=java)
+    executor.class_data = RecordingClassData()
+    executor.classpath = lambda project_dir: "scala-library.jar"
+    write_main(workspace, "object Main extends App {}")
+    assert executor.run(str(workspace))[0] == bool(dumped)
+    assert len(executor.class_data.dumped) == dumped
+
+
+def test_direct_java_trains_again_after_a_failed_training_run(workspace, tmp_path):
+    executor = DirectJavaExecutor(compiler=FakeExecutor(), java="false", cds=True)
+    executor.class_data = ClassDataArchive(java="false", archive_dir=str(tmp_path / "cds"))
+    executor.classpath = lambda project_dir: "scala-library.jar"
+    write_main(workspace, "object Main extends App {}")
+    jars = ["scala-library.jar"]
+    _, class_list = executor.class_data.paths(jars)
+
+    assert not executor.run(str(workspace))[0]
+    assert not os.path.exists(class_list)
+    assert executor.class_data.options(jars) == [f"-XX:DumpLoadedClassList={class_list}"]
+
+
+def test_direct_java_reports_implicit_build_failures(workspace):
+    executor = DirectJavaExecutor(compiler=FakeExecutor())
+    write_main(workspace, "object Main extends App { println(1 }")
+    success, message, _ = executor.run(str(workspace))
+    assert not success
+    assert message.startswith("Build failed:")
+
+
+# Stands in for `sbt --client`: the first command boots a "server" that outlives
+# the client, and a stubborn client ignores the interrupt asking it to cancel a run
+THIN_CLIENT = """
+import signal, subprocess, sys, time
+mode, command = sys.argv[1:]
+if command != "run":
+    server = subprocess.Popen(
+        [sys.executable, "-c", "import time; time.sleep(60)"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    open("server.pid", "w").write(str(server.pid))
+    sys.exit(0)
+if mode == "stubborn":
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+print("started", flush=True)
+try:
+    time.sleep(60)
+except KeyboardInterrupt:
+    pass  # The server cancels the run
+"""
+
+
+def is_running(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def wait_until_stopped(pid, seconds=5):
+    deadline = time.monotonic() + seconds
+    while is_running(pid) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return not is_running(pid)
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc")
+@pytest.mark.parametrize("mode", ["cooperative", "stubborn"])
+def test_warm_sbt_timeout_stops_the_server_side_run(workspace, tmp_path, mode):
+    client = tmp_path / "client.py"
+    client.write_text(THIN_CLIENT)
+    executor = WarmSbtExecutor()
+    executor.sbt_command = [sys.executable, str(client), mode]
+    executor.cancel_grace = 0.5
+    # Somebody else's process working in the same directory, e.g. a shell or an IDE
+    bystander = subprocess.Popen(
+        [sys.executable, "-c", "import time; time.sleep(60)"], cwd=workspace, start_new_session=True
+    )
+    try:
+        success, message, stdout = executor.run(str(workspace), timeout=1)
+        assert not success
+        assert message.startswith("Run timed out")
+        assert "started" in stdout
+        server = int((workspace / "server.pid").read_text())
+        if mode == "stubborn":
+            # Only the server this executor booted is killed; the next run boots another
+            assert wait_until_stopped(server)
+            assert str(workspace) not in executor._sessions
+        else:
+            assert is_running(server) and str(workspace) in executor._sessions
+            os.kill(server, 9)
+        assert is_running(bystander.pid)
+    finally:
+        bystander.kill()
+        bystander.wait()
@@ -0,0 +1,44 @@
+import os
+import pytest
+from jvm import ClassDataArchive, profile_options, split_classpath
+
+
+def test_profile_options(monkeypatch):
+    monkeypatch.delenv("BUILD_CHECKER_JVM_PROFILE", raising=False)
+    monkeypatch.setenv("BUILD_CHECKER_JVM_OPTIONS", "-Xss2m -Dfoo=bar")
+    assert profile_options() == ["-Xss2m", "-Dfoo=bar"]
+    assert "-XX:+UseSerialGC" in profile_options("short_lived")
+    monkeypatch.setenv("BUILD_CHECKER_JVM_PROFILE", "short_lived")
+    assert profile_options()[-2:] == ["-Xss2m", "-Dfoo=bar"]
+    with pytest.raises(ValueError):
+        profile_options("does_not_exist")
+
+
+def test_split_classpath():
+    classpath = os.pathsep.join(["/w/target/classes", "/c/akka.jar", "/c/scala.jar"])
+    assert split_classpath(classpath) == (["/c/akka.jar", "/c/scala.jar"], ["/w/target/classes"])
+
+
+def test_class_data_archive_training_and_use(tmp_path):
+    archives = ClassDataArchive(java=str(tmp_path / "no-java"), archive_dir=str(tmp_path))
+    jars = ["/c/akka.jar", "/c/scala.jar"]
+    archive, class_list = archives.paths(jars)
+
+    # The first run records its classes, concurrent runs go without
+    assert archives.options(jars) == [f"-XX:DumpLoadedClassList={class_list}"]
+    assert archives.options(jars) == []
+
+    # Once dumped, every run maps the archive
+    with open(archive, "w"):
+        pass
+    assert archives.options(jars)[0] == f"-XX:SharedArchiveFile={archive}"
+    # A different dependency set gets its own archive
+    assert archives.paths(jars[:1])[0] != archive
+
+
+def test_class_data_archive_dump_failure(tmp_path):
+    archives = ClassDataArchive(java=str(tmp_path / "no-java"), archive_dir=str(tmp_path))
+    jars = ["/c/akka.jar"]
+    archives.options(jars)
+    assert not archives.dump(jars)
+    assert archives.options(jars) == []
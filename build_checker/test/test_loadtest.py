@@ -0,0 +1,16 @@
+from loadtest import make_payload, make_snippet
+
+
+def test_make_snippet_pads_to_size_and_is_unique():
+    snippet = make_snippet(2000, seed=1)
+    assert len(snippet) >= 2000
+    assert "object Main extends App" in snippet
+    assert make_snippet(seed=1) != make_snippet(seed=2)
+
+
+def test_make_payload_for_inline_dataset():
+    payload = make_payload("process-dataset-inline", 0, 3, 7, build=False, run=True)
+    assert len(payload["data"]) == 3
+    assert payload["run"] and not payload["build"]
+    conversation = payload["data"][0]["conversations"]
+    assert [message["from"] for message in conversation] == ["human", "assistant"]
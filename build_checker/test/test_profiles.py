@@ -0,0 +1,66 @@
+import os
+from profiles import (
+    BUILD_PROFILES,
+    ensure_profile_template,
+    needs_full_profile,
+    render_build_sbt,
+    select_build_profile,
+)
+
+BUILD_SBT = """lazy val root = project
+  .settings(
+    libraryDependencies ++= Seq(
+      "org.scalameta" %% "munit" % "1.0.0" % Test,
+      "com.typesafe.akka" %% "akka-actor-typed" % "2.8.2",
+      "com.typesafe.akka" %% "akka-stream" % "2.8.2", // streams
+      "com.typesafe.akka" %% "akka-persistence" % "2.8.2",
+      "ch.qos.logback" % "logback-classic" % "1.2.11"
+    )
+  )
+"""
+
+
+def test_select_build_profile_from_akka_references():
+    assert select_build_profile("object Main extends App") == "typed"
+    assert select_build_profile("import akka.actor.typed.scaladsl.Behaviors") == "typed"
+    assert select_build_profile("import akka.stream.scaladsl.Source") == "streams"
+    assert select_build_profile("val http = akka.http.scaladsl.Http(system)") == "http"
+    assert select_build_profile("import akka.cluster.typed.Cluster") == "cluster"
+    # Modules no reduced profile combines need the full dependency set
+    assert select_build_profile("import akka.cluster._\nimport akka.stream._") == "full"
+    assert select_build_profile("import akka.persistence.typed.PersistenceId") == "full"
+    # References in comments and strings do not count
+    assert select_build_profile('// akka.stream\nval s = "akka.http"') == "typed"
+
+
+def test_render_build_sbt_keeps_only_profile_artifacts():
+    rendered = render_build_sbt(BUILD_SBT, BUILD_PROFILES["streams"]["artifacts"])
+    assert '"akka-stream" % "2.8.2",' in rendered
+    assert "akka-persistence" not in rendered
+    assert rendered.rstrip().endswith(")\n  )")
+    rendered = render_build_sbt(BUILD_SBT, BUILD_PROFILES["typed"]["artifacts"])
+    assert "akka-stream" not in rendered
+    assert '"logback-classic" % "1.2.11"\n    )' in rendered
+
+
+def test_ensure_profile_template(tmp_path):
+    base = tmp_path / "base"
+    os.makedirs(base / "src/main/scala")
+    (base / "build.sbt").write_text(BUILD_SBT)
+    (base / "src/main/scala/Main.scala").write_text("object Main extends App")
+
+    assert ensure_profile_template(str(base), str(tmp_path / "profiles"), "full") == str(base)
+    template = ensure_profile_template(str(base), str(tmp_path / "profiles"), "typed")
+    assert os.path.exists(os.path.join(template, "src/main/scala/Main.scala"))
+    with open(os.path.join(template, "build.sbt")) as f:
+        assert "akka-stream" not in f.read()
+
+
+def test_needs_full_profile():
+    assert needs_full_profile("Build failed: [error] value stream is not a member of akka")
+    assert needs_full_profile("Build failed: [error] object http is not a member of package akka")
+    assert needs_full_profile("Build failed: [error] Not found: akka")
+    assert needs_full_profile("java.lang.NoClassDefFoundError: akka/stream/Materializer")
+    assert not needs_full_profile("Build failed: [error] Found: Int Required: String")
+    assert not needs_full_profile("Build failed: [error] Not found: value greeting")
+    assert not needs_full_profile("Build failed: [error] Not found: type Source")
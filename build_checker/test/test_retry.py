@@ -0,0 +1,32 @@
+import sqlite3
+
+from retry import RetryPolicy
+from shared_state import VerdictCache
+
+
+def test_retry_policy_skips_compile_errors():
+    policy = RetryPolicy(retry_on=("run_failed", "timeout"), max_retries=2, base_delay=0.1)
+
+    assert policy.should_retry("run_failed", "STDERR:\nboom", attempt=1)
+    assert policy.should_retry("timeout", "Run timed out after 10s", attempt=2)
+    assert not policy.should_retry("timeout", "Run timed out after 10s", attempt=3)
+    assert not policy.should_retry("build_failed", "Build failed: ...", attempt=1)
+    compile_error = "[error] /ws/src/main/scala/Main.scala:3:5: not found: value x"
+    assert not policy.should_retry("run_failed", compile_error, attempt=1)
+    assert all(0 <= policy.delay(attempt) <= 0.4 for attempt in (1, 2, 3))
+
+
+def test_verdict_cache_adds_flaky_column_to_old_databases(tmp_path):
+    db_path = str(tmp_path / "verdicts.sqlite")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE verdicts (key TEXT PRIMARY KEY, success INTEGER NOT NULL, "
+            "message TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.execute("INSERT INTO verdicts VALUES ('old', 1, 'ok', 0)")
+    conn.close()
+
+    cache = VerdictCache(db_path)
+    assert cache.get("old") == (True, "ok", False)
+    cache.put("new", True, "ok", flaky=True)
+    assert cache.get("new") == (True, "ok", True)
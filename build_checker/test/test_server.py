@@ -0,0 +1,39 @@
+import pytest
+from contextlib import ExitStack
+
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient
+import server
+from api import BuildCheckerAPI
+
+
+def test_api_is_built_at_startup_from_the_options(tmp_path, monkeypatch):
+    monkeypatch.setenv("BUILD_CHECKER_STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setenv("BUILD_CHECKER_WORKSPACES_DIR", str(tmp_path / "workspaces"))
+    monkeypatch.setenv("BUILD_CHECKER_EXECUTOR", "fake")
+    monkeypatch.setenv("BUILD_CHECKER_POOL_SIZE", "2")
+    monkeypatch.setenv("BUILD_CHECKER_FAKE_RUN_LATENCY", "0")
+    # Restored once the test is done: the next startup builds a new API
+    monkeypatch.setattr(server, "api", None)
+
+    with TestClient(server.app) as client:
+        ready = client.get("/ready").json()
+        assert ready["executor"] == "fake" and ready["pool_size"] == 2
+        response = client.post("/check-batch", json={"snippets": [{"code": "object Main extends App {}"}]})
+        assert response.json()["successful_runs"] == 1
+        assert client.get("/metrics").json()["counters"]["snippets_checked"] == 1
+
+
+def test_warmup_is_not_warm_when_other_workers_hold_every_workspace(tmp_path, monkeypatch):
+    monkeypatch.setenv("BUILD_CHECKER_WORKSPACES_DIR", str(tmp_path / "workspaces"))
+    monkeypatch.setenv("BUILD_CHECKER_FAKE_RUN_LATENCY", "0")
+    api = BuildCheckerAPI(pool_size=2, state_dir=str(tmp_path / "state"), executor="fake")
+    with ExitStack() as leases:
+        for workspace in api.pool.workspaces:
+            leases.enter_context(api.pool.try_lease(workspace))
+        assert api.warmup()
+        ready = api.readiness()
+        assert ready["ready"] and not ready["warm"]
+
+    assert api.warmup() and api.readiness()["warm"]
+    api.close()
@@ -0,0 +1,34 @@
+from profiles import import_profile
+from shared_state import RunHistory
+from timeouts import AdaptiveTimeout
+
+
+def test_import_profile_groups_packages():
+    code = """
+import akka.actor.typed.{ActorSystem, Behavior}
+import akka.actor.typed.scaladsl.Behaviors
+import akka.cluster.typed.Cluster
+object Main extends App
+"""
+    assert import_profile(code) == "akka.actor+akka.cluster"
+    assert import_profile("object Main extends App") == "none"
+
+
+def test_adaptive_timeout_learns_from_successful_runs(tmp_path):
+    history = RunHistory(str(tmp_path / "runs.sqlite"))
+    timeouts = AdaptiveTimeout(
+        history, max_timeout=60, min_timeout=0.5, margin=0.5, min_samples=5, enabled=True
+    )
+
+    # Not enough history yet: fall back to the global cap
+    assert timeouts.timeout_for("fake", "akka.actor") == 60
+
+    for _ in range(10):
+        history.record("fake", "akka.actor", "", True, 2.0)
+    history.record("fake", "akka.actor", "Run timed out", False, 60.0)
+    assert timeouts.timeout_for("fake", "akka.actor") == 3.0
+
+    # Unknown profiles use the history of every profile
+    assert timeouts.timeout_for("fake", "akka.stream") == 3.0
+    # Other executors have their own history
+    assert timeouts.timeout_for("cold_sbt", "akka.actor") == 60
@@ -0,0 +1,35 @@
+from api import encode_verdicts, error_signature, snippet_status
+
+
+def test_snippet_status_classifies_failures():
+    assert snippet_status(True, "ok") == "passed"
+    assert snippet_status(False, "Build failed: [error] ...") == "build_failed"
+    assert snippet_status(False, "Run timed out after 30s\nSTDOUT:\n") == "timeout"
+    assert snippet_status(False, "No code provided") == "empty"
+    assert snippet_status(False, "STDOUT:\n\nSTDERR:\nboom") == "run_failed"
+
+
+def test_error_signature_drops_locations():
+    build_failure = (
+        "Build failed: [info] compiling 1 Scala source\n"
+        "[error] /tmp/ws_3/src/main/scala/Main.scala:4:7: not found: value foo\n"
+        "[error] one error found"
+    )
+    assert error_signature(build_failure) == "not found: value foo"
+    run_failure = 'STDOUT:\n\nSTDERR:\nException in thread "main" scala.NotImplementedError'
+    assert error_signature(run_failure) == 'Exception in thread "main" scala.NotImplementedError'
+
+
+def test_encode_verdicts_is_column_wise_and_aligned():
+    results = [
+        {"success": True, "message": "ok", "status": "passed", "cache_hit": True,
+         "timings": {"total": 0.0012}, "conversation": 0, "snippet": 0},
+        {"success": False, "message": "Build failed: [error] Main.scala:1:1: oops",
+         "status": "build_failed", "cache_hit": False,
+         "timings": {"build": 1.5, "total": 1.6}, "conversation": 1, "snippet": 0},
+    ]
+    verdicts = encode_verdicts(results)
+    assert verdicts["status"] == ["passed", "build_failed"]
+    assert verdicts["error"] == ["", "oops"]
+    assert verdicts["timings_ms"]["build"] == [None, 1500]
+    assert verdicts["timings_ms"]["total"] == [1, 1600]
@@ -0,0 +1,40 @@
+import os
+
+from workspace_pool import WorkspacePool
+
+
+def make_template(path):
+    os.makedirs(path / "src/main/scala")
+    (path / "src/main/scala/Main.scala").write_text("object Main extends App\n")
+    (path / "build.sbt").write_text('scalaVersion := "2.13.12"\n')
+
+
+def test_pool_without_template_copies_every_workspace(tmp_path):
+    make_template(tmp_path / "template")
+    pool = WorkspacePool(str(tmp_path / "template"), str(tmp_path / "ram"), 2, use_template=False)
+
+    with pool.lease() as first, pool.lease() as second:
+        assert {first.index, second.index} == {0, 1}
+        assert first.path.startswith(str(tmp_path / "ram"))
+        assert os.path.exists(second.main_scala_path)
+
+
+def test_collect_garbage_removes_build_outputs_of_idle_workspaces(tmp_path):
+    make_template(tmp_path / "template")
+    pool = WorkspacePool(
+        str(tmp_path / "template"), str(tmp_path / "ram"), 2, use_template=False, budget_bytes=1024
+    )
+    for workspace in pool.workspaces:
+        pool.ensure_created(workspace)
+        os.makedirs(os.path.join(workspace.path, "target"))
+        with open(os.path.join(workspace.path, "target/classes.bin"), "wb") as f:
+            f.write(b"\0" * 4096)
+
+    with pool.lease() as busy:
+        freed = pool.collect_garbage()
+
+    assert freed == 4096
+    assert os.path.exists(os.path.join(busy.path, "target/classes.bin"))
+    idle = next(ws for ws in pool.workspaces if ws is not busy)
+    assert not os.path.exists(os.path.join(idle.path, "target"))
+    assert os.path.exists(idle.main_scala_path)
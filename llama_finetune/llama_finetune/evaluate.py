@@ -2,6 +2,10 @@ from datetime import datetime
 import json
 import os
 import sys
+import time
+import queue
+import threading
+from contextlib import contextmanager
 from typing import Tuple, List, Dict, Any
 
 import nltk
@@ -11,13 +15,28 @@ from evaluation_utils.build_client import BuildCheckerClient
 from logger import file_logger
 
 # Import the classes from their new files
-from evaluation_utils.code_generator import CodeGenerator
+from evaluation_utils.code_generator import CodeGenerator, GENERATION_TIMINGS
+from evaluation_utils.generation_cache import GenerationCache
 from evaluation_utils.metrics_calculator import MetricsCalculator
 from evaluation_utils.data_processor import DataProcessor
 
 # Constants
 RESULTS_DIR = "../res/data/results"
 GENERATED_CODE_DIR = "../res/data/generated_code"
+# Threads checking generated batches with the build checker during generation,
+# and generated batches allowed to wait for them
+VALIDATION_WORKERS = 2
+VALIDATION_QUEUE_SIZE = 4
+# k of the pass@k metrics reported when sampling several completions per prompt
+PASS_AT_K = (1, 5, 10)
+# Counters of the performance record of an evaluation: the generation phases,
+# plus the BLEU and build check time summed over the validation threads (which
+# overlap generation) and the wall time of the whole evaluation
+EVALUATION_TIMINGS = GENERATION_TIMINGS + ("metrics_seconds", "build_check_seconds", "total_seconds")
+# BLEU is scored on the generated completion only. Results files without a
+# `bleu_scope` scored the whole decoded output, prompt included: their BLEU is
+# higher and not comparable
+BLEU_SCOPE = "completion"
 
 # Setup
 sys.path.append(
@@ -28,11 +47,8 @@ from retrieve_model_output import process_evaluation_results
 nltk.download("punkt")
 nltk.download("punkt_tab")
 
-def compute_bleu_for_model(
-    model, tokenizer, test_dataset_path, train_size, output_prefix="baseline"
-) -> Tuple[str, float]:
-    """Evaluate model performance using BLEU metric."""
-    # Load and prepare test data
+def load_test_examples(test_dataset_path: str) -> List[Dict]:
+    """Prompt and reference of every conversation of the test dataset."""
     test_dataset = load_dataset("json", data_files=test_dataset_path, split="train")
     test_df = test_dataset.to_pandas()
 
@@ -40,39 +56,451 @@ def compute_bleu_for_model(
         DataProcessor.extract_conversations
     )
     test_df.dropna(subset=["prompt", "reference"], inplace=True)
+    return test_df[["prompt", "reference"]].to_dict("records")
 
-    # Generate and evaluate code
-    test_prompts = test_df["prompt"].tolist()
-    test_references = test_df["reference"].tolist()
-    generated_codes = CodeGenerator.generate_code(model, tokenizer, test_prompts)
 
+def score_samples(samples: List[Dict]) -> Tuple[List[Dict], float]:
+    """BLEU of every sample against its reference, as result records, and the average."""
     results, avg_bleu = MetricsCalculator.calculate_metrics(
-        test_references, generated_codes
+        [sample["reference"] for sample in samples],
+        [sample["completion"] for sample in samples],
     )
+    # Keep the prompt next to its completion so that no stage has to parse it back
+    for result, sample in zip(results, samples):
+        result["prompt"] = sample["prompt"]
+        result["token_counts"] = sample["token_counts"]
+        result["cache_hit"] = sample.get("cache_hit", False)
+    return results, avg_bleu
 
-    # Save results
+
+def validate_samples(samples: List[Dict], client: BuildCheckerClient = None) -> Dict:
+    """Build checker report (see `BuildCheckerClient.validate_dataset`) of the samples' code."""
+    conversations = [
+        {
+            "conversations": [
+                {"from": "human", "value": sample["prompt"]},
+                {"from": "assistant", "value": sample["code"]},
+            ]
+        }
+        for sample in samples
+    ]
+    if client is not None:
+        return client.validate_dataset(conversations, run=True)
+    with BuildCheckerClient() as client:
+        return client.validate_dataset(conversations, run=True)
+
+
+def _validate_while_generating(batches, validate, validation_workers: int, queue_size: int) -> None:
+    """
+    Call `validate` on every item of the `batches` iterator from
+    `validation_workers` threads, through a queue of at most `queue_size` items,
+    so that producing the next batches overlaps with validating the previous ones.
+    The first exception raised by `validate` is raised once every thread is done.
+    """
+    pending = queue.Queue(maxsize=queue_size)
+    errors = []
+
+    def validate_batches():
+        while True:
+            batch = pending.get()
+            if batch is None:
+                return
+            # After a failure keep draining, so that generation never blocks
+            if errors:
+                continue
+            try:
+                validate(batch)
+            except Exception as e:
+                errors.append(e)
+
+    workers = [
+        threading.Thread(target=validate_batches, name=f"validation-{i}", daemon=True)
+        for i in range(validation_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for batch in batches:
+            pending.put(batch)
+    finally:
+        for _ in workers:
+            pending.put(None)
+        for worker in workers:
+            worker.join()
+    if errors:
+        raise errors[0]
+
+
+def performance_summary(timings: Dict, total_snippets: int) -> Dict:
+    """The EVALUATION_TIMINGS counters with the throughput and latency derived from them."""
+    counters = {name: timings.get(name, 0) for name in EVALUATION_TIMINGS}
+    generation_seconds = counters["prefill_seconds"] + counters["decode_seconds"]
+    return {
+        **counters,
+        "tokens_per_second": (
+            counters["generated_tokens"] / generation_seconds if generation_seconds else 0.0
+        ),
+        "time_to_first_token_seconds": (
+            counters["prefill_seconds"] / counters["batches"] if counters["batches"] else 0.0
+        ),
+        "snippets_per_second": (
+            total_snippets / counters["total_seconds"] if counters["total_seconds"] else 0.0
+        ),
+    }
+
+
+def load_performance(results_file: str) -> Dict:
+    """Performance record of an evaluation results file, if it has one."""
+    with open(results_file) as f:
+        return json.load(f).get("performance")
+
+
+class _PhaseTimer:
+    """Adds the duration of `phase(name)` blocks to `timings`, from any thread."""
+
+    def __init__(self, timings: Dict):
+        self.timings = timings
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.timings[name] = self.timings.get(name, 0) + elapsed
+
+
+def _verdict_row(conversation: int, snippet: int, verdict: Dict) -> Dict:
+    return {
+        "conversation": conversation,
+        "snippet": snippet,
+        "status": verdict["status"],
+        "success": verdict["success"],
+        "cache_hit": verdict["cache_hit"],
+        "error": verdict["error"],
+    }
+
+
+def evaluate_samples(
+    model,
+    tokenizer,
+    examples: List[Dict],
+    client: BuildCheckerClient,
+    validation_workers: int = VALIDATION_WORKERS,
+    queue_size: int = VALIDATION_QUEUE_SIZE,
+    **generation_options,
+) -> Tuple[List[Dict], float, Dict]:
+    """
+    Generate, score and validate the examples with generation and validation
+    overlapped: every generated batch goes into a bounded queue consumed by
+    `validation_workers` threads, which check it with the build checker and
+    compute its BLEU scores while the next batch is generated.
+    `generation_options` go to `CodeGenerator.iter_generate_records`.
+
+    Returns:
+        Tuple[List[Dict], float, Dict]: the result records in example order (see
+        `score_samples`, with an `execution_status`), the average BLEU and the
+        build checker report (`successful_runs`, `total_snippets`, `verdicts`).
+    """
+    started = time.perf_counter()
+    results = [None] * len(examples)
+    verdicts = [None] * len(examples)
+    timings = {}
+    timer = _PhaseTimer(timings)
+
+    def generated_batches():
+        for positions, generations in CodeGenerator.iter_generate_records(
+            model, tokenizer, [example["prompt"] for example in examples], timings=timings,
+            **generation_options
+        ):
+            yield positions, [
+                {**examples[position], **generation, "code": generation["completion"].strip()}
+                for position, generation in zip(positions, generations)
+            ]
+
+    def validate(batch):
+        positions, samples = batch
+        with timer.phase("build_check_seconds"):
+            checked = client.check_snippets(
+                [{"code": sample["code"], "prompt": sample["prompt"]} for sample in samples],
+                run=True,
+            )
+        with timer.phase("metrics_seconds"):
+            scored, _ = score_samples(samples)
+        for position, result, verdict in zip(positions, scored, checked):
+            result["execution_status"] = verdict["status"]
+            results[position] = result
+            verdicts[position] = _verdict_row(position, 0, verdict)
+
+    _validate_while_generating(generated_batches(), validate, validation_workers, queue_size)
+    timings["total_seconds"] = time.perf_counter() - started
+
+    avg_bleu = sum(r["bleu"] for r in results) / len(results) if results else 0
+    report = {
+        "successful_runs": sum(v["success"] for v in verdicts),
+        "total_snippets": len(verdicts),
+        "verdicts": verdicts,
+        "performance": performance_summary(timings, len(verdicts)),
+    }
+    return results, avg_bleu, report
+
+
+def evaluate_pass_at_k(
+    model,
+    tokenizer,
+    examples: List[Dict],
+    client: BuildCheckerClient,
+    num_samples: int,
+    ks: Tuple[int, ...] = PASS_AT_K,
+    validation_workers: int = VALIDATION_WORKERS,
+    queue_size: int = VALIDATION_QUEUE_SIZE,
+    **generation_options,
+) -> Tuple[List[Dict], float, Dict]:
+    """
+    Like `evaluate_samples`, drawing `num_samples` completions per example in
+    one `generate` call. Identical completions are sent to the build checker
+    once, and the unbiased pass@k estimate is computed for every k of `ks` up
+    to `num_samples`.
+
+    Returns:
+        Tuple[List[Dict], float, Dict]: one result record per example, with its
+        `samples` (`completion`, `bleu`, `status`, `success`), its `num_correct`
+        samples and the average BLEU of its samples as `bleu`; the average BLEU;
+        and the build checker report with one verdict per sample (its index as
+        `snippet`), the `unique_snippets` checked and the `pass_at_k` metrics.
+    """
+    started = time.perf_counter()
+    prompts = [example["prompt"] for example in examples]
+    generations = [None] * len(examples)
+    timings = {}
+    timer = _PhaseTimer(timings)
+    bleus = [None] * len(examples)
+    # First sample of every distinct code, and the verdict it got
+    seen = set()
+    checked = {}
+
+    def generated_batches():
+        for positions, records in CodeGenerator.iter_generate_records(
+            model, tokenizer, prompts, num_samples=num_samples, timings=timings,
+            **generation_options
+        ):
+            new = []
+            for position, record in zip(positions, records):
+                generations[position] = record
+                for sample in record["samples"]:
+                    code = sample["completion"].strip()
+                    if code not in seen:
+                        seen.add(code)
+                        new.append({"code": code, "prompt": record["prompt"]})
+            yield positions, new
+
+    def validate(batch):
+        positions, snippets = batch
+        with timer.phase("build_check_seconds"):
+            verdicts = client.check_snippets(snippets, run=True)
+        for snippet, verdict in zip(snippets, verdicts):
+            checked[snippet["code"]] = verdict
+        with timer.phase("metrics_seconds"):
+            for position in positions:
+                bleus[position] = [
+                    MetricsCalculator.compute_bleu(examples[position]["reference"], sample["completion"])
+                    for sample in generations[position]["samples"]
+                ]
+
+    _validate_while_generating(generated_batches(), validate, validation_workers, queue_size)
+    timings["total_seconds"] = time.perf_counter() - started
+
+    results = []
+    verdicts = []
+    for position, (example, record) in enumerate(zip(examples, generations)):
+        samples = []
+        for index, (sample, bleu) in enumerate(zip(record["samples"], bleus[position])):
+            verdict = checked[sample["completion"].strip()]
+            verdicts.append(_verdict_row(position, index, verdict))
+            samples.append(
+                {
+                    "completion": sample["completion"],
+                    "bleu": bleu,
+                    "status": verdict["status"],
+                    "success": verdict["success"],
+                }
+            )
+        results.append(
+            {
+                "reference": example["reference"],
+                "generated": record["completion"],
+                "bleu": sum(bleus[position]) / num_samples,
+                "prompt": example["prompt"],
+                "token_counts": record["token_counts"],
+                "cache_hit": record["cache_hit"],
+                "execution_status": samples[0]["status"],
+                "num_correct": sum(sample["success"] for sample in samples),
+                "samples": samples,
+            }
+        )
+
+    pass_at_k = {
+        f"pass@{k}": sum(
+            MetricsCalculator.pass_at_k(num_samples, result["num_correct"], k) for result in results
+        ) / len(results) if results else 0.0
+        for k in ks
+        if k <= num_samples
+    }
+    avg_bleu = sum(r["bleu"] for r in results) / len(results) if results else 0
+    report = {
+        "successful_runs": sum(v["success"] for v in verdicts),
+        "total_snippets": len(verdicts),
+        "unique_snippets": len(checked),
+        "verdicts": verdicts,
+        "pass_at_k": pass_at_k,
+        "performance": performance_summary(timings, len(verdicts)),
+    }
+    return results, avg_bleu, report
+
+
+def write_evaluation_results(
+    results: List[Dict],
+    avg_bleu: float,
+    train_size: int,
+    output_prefix: str,
+    report: Dict = None,
+    shard: Dict = None,
+) -> str:
+    """
+    Write the evaluation results file, with the execution verdicts if any. The
+    results of a `shard` (see `shard_examples`) go to a partial results file,
+    for `merge_evaluation_results`.
+    """
     evaluation_results = {
         "timestamp": datetime.now().isoformat(),
-        "average_metrics": {"bleu": avg_bleu},
+        "average_metrics": {"bleu": avg_bleu, **(report or {}).get("pass_at_k", {})},
+        "bleu_scope": BLEU_SCOPE,
         "detailed_results": results,
         "training_dataset_size": train_size,
     }
+    if report is not None:
+        # Per-sample verdicts, so that metrics over samples need no new validation
+        evaluation_results["execution_check"] = {
+            "successful_runs": report["successful_runs"],
+            "total_snippets": report["total_snippets"],
+            "verdicts": report["verdicts"],
+        }
+        if "unique_snippets" in report:
+            evaluation_results["execution_check"]["unique_snippets"] = report["unique_snippets"]
+        if "performance" in report:
+            evaluation_results["performance"] = report["performance"]
+
+    suffix = ""
+    if shard is not None:
+        evaluation_results["shard"] = shard
+        suffix = f'_shard{shard["index"]}of{shard["count"]}'
 
     os.makedirs(RESULTS_DIR, exist_ok=True)
     results_file = os.path.join(
         RESULTS_DIR,
-        f'evaluation_results_{output_prefix}_{datetime.now().strftime("%Y%m%d")}.json',
+        f'evaluation_results_{output_prefix}_{datetime.now().strftime("%Y%m%d")}{suffix}.json',
     )
-
     with open(results_file, "w") as f:
         json.dump(evaluation_results, f, indent=2)
+    return results_file
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse a `i/N` shard specification (0 <= i < N)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{value}', expected i/N") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{value}', expected 0 <= i < N")
+    return index, count
+
+
+def shard_examples(examples: List[Dict], index: int, count: int) -> List[int]:
+    """
+    Positions of the examples of shard `index` out of `count`: every `count`-th
+    example, so that shards get the same mix of easy and hard examples and the
+    same split is drawn on every machine.
+    """
+    return list(range(index, len(examples), count))
+
+
+def merge_evaluation_results(partial_files: List[str], output_prefix: str) -> Tuple[str, float, Tuple[int, int]]:
+    """
+    Merge the partial results files of every shard of an evaluation into the
+    results file a single-process run would have written, with the same averages.
+
+    Returns:
+        Tuple[str, float, Tuple[int, int]]: like `evaluate_model`.
+    """
+    partials = []
+    for path in partial_files:
+        with open(path) as f:
+            partials.append(json.load(f))
+    if not partials or any("shard" not in partial for partial in partials):
+        raise ValueError("Only partial results files of a sharded evaluation can be merged")
+    count = partials[0]["shard"]["count"]
+    indexes = sorted(partial["shard"]["index"] for partial in partials)
+    if indexes != list(range(count)):
+        raise ValueError(f"Expected the partial results of shards 0 to {count - 1}, got {indexes}")
+    if any(partial.get("bleu_scope") != BLEU_SCOPE for partial in partials):
+        raise ValueError(f"Expected partial results with BLEU scored on the {BLEU_SCOPE} only")
+
+    results = sorted(
+        (result for partial in partials for result in partial["detailed_results"]),
+        key=lambda result: result["index"],
+    )
+    for result in results:
+        del result["index"]
+    avg_bleu = sum(r["bleu"] for r in results) / len(results) if results else 0
+
+    report = None
+    if all("execution_check" in partial for partial in partials):
+        verdicts = sorted(
+            (v for partial in partials for v in partial["execution_check"]["verdicts"]),
+            key=lambda v: (v["conversation"], v["snippet"]),
+        )
+        report = {
+            "successful_runs": sum(v["success"] for v in verdicts),
+            "total_snippets": len(verdicts),
+            "verdicts": verdicts,
+        }
+        ks = [
+            int(name.split("@")[1])
+            for name in partials[0]["average_metrics"]
+            if name.startswith("pass@")
+        ]
+        if ks and results:
+            num_samples = len(results[0]["samples"])
+            report["unique_snippets"] = len(
+                {s["completion"].strip() for r in results for s in r["samples"]}
+            )
+            report["pass_at_k"] = {
+                f"pass@{k}": sum(
+                    MetricsCalculator.pass_at_k(num_samples, r["num_correct"], k) for r in results
+                ) / len(results)
+                for k in ks
+            }
 
-    # Log results
-    file_logger.write_and_print(f"\nEvaluation Results ({output_prefix}):\n", heading=2)
-    file_logger.write_and_print(f"\nAverage BLEU Score: {avg_bleu:.4f}", heading=3)
-    file_logger.write_and_print(f"\nDetailed results saved to: {results_file}")
+        if all("performance" in partial for partial in partials):
+            # Seconds are summed over the shards: the throughput is per worker
+            timings = {
+                name: sum(partial["performance"][name] for partial in partials)
+                for name in EVALUATION_TIMINGS
+            }
+            report["performance"] = performance_summary(timings, len(verdicts))
 
-    return results_file, avg_bleu
+    results_file = write_evaluation_results(
+        results, avg_bleu, partials[0]["training_dataset_size"], output_prefix, report
+    )
+    file_logger.write_and_print(
+        f"\nMerged {count} shards ({len(results)} examples) into: {results_file}"
+    )
+    samples_info = (report["successful_runs"], report["total_snippets"]) if report else (0, 0)
+    return results_file, avg_bleu, samples_info
 
 
 def extract_generated_code(output_file: str, output_prefix: str) -> Tuple[bool, str]:
@@ -111,6 +539,10 @@ def evaluate_model(
     test_dataset_path: str,
     train_size: int,
     output_prefix: str = "baseline",
+    write_code_files: bool = False,
+    use_generation_cache: bool = True,
+    num_samples: int = 1,
+    shard: Tuple[int, int] = None,
 ) -> Tuple[str, float, Tuple[int, int]]:
     """
     Evaluate the model using the specified test dataset and training size.
@@ -121,6 +553,15 @@ def evaluate_model(
         test_dataset_path: The path to the test dataset.
         train_size: The size of the training dataset.
         output_prefix: The prefix to use for the output files.
+        write_code_files: Also save every prompt and generated code as text files
+            under GENERATED_CODE_DIR, for inspection.
+        use_generation_cache: Reuse the completions already generated by the same
+            model for the same prompts and sampling options (see `GenerationCache`).
+        num_samples: Completions sampled per prompt. Above 1 the results report
+            pass@k (see `evaluate_pass_at_k`) and count every sample as a snippet.
+        shard: `(i, N)` to evaluate only shard i of N of the test set (see
+            `shard_examples`) and write a partial results file; the partial
+            files of all shards are combined by `merge_evaluation_results`.
 
     Returns:
         Tuple[str, float, Tuple[int, int]]: A tuple containing:
@@ -132,38 +573,103 @@ def evaluate_model(
         Exception: If any step of the evaluation process fails
     """
     try:
-        # Step 1: Compute BLEU scores
-        dataset_path, avg_bleu = compute_bleu_for_model(
-            model, tokenizer, test_dataset_path, train_size, output_prefix
+        # Generate, clean, score and validate in memory; only the results are written.
+        # Generated batches are validated while the next ones are generated.
+        file_logger.write_and_print("Generating and validating code...", heading=3)
+        cache = GenerationCache() if use_generation_cache else None
+        with BuildCheckerClient() as client:
+            examples = load_test_examples(test_dataset_path)
+            positions = list(range(len(examples)))
+            if shard is not None:
+                positions = shard_examples(examples, *shard)
+                file_logger.write_and_print(
+                    f"Shard {shard[0]}/{shard[1]}: {len(positions)} of {len(examples)} examples"
+                )
+                examples = [examples[position] for position in positions]
+            if num_samples > 1:
+                results, avg_bleu, report = evaluate_pass_at_k(
+                    model, tokenizer, examples, client, num_samples, cache=cache
+                )
+            else:
+                results, avg_bleu, report = evaluate_samples(
+                    model, tokenizer, examples, client, cache=cache
+                )
+        cache_hits = sum(r["cache_hit"] for r in results)
+        if cache_hits:
+            file_logger.write_and_print(
+                f"Reused {cache_hits}/{len(results)} cached completions"
+            )
+        work_sampl, tot_sampl = report["successful_runs"], report["total_snippets"]
+
+        shard_info = None
+        if shard is not None:
+            # Positions in the whole test set, for the merge
+            for position, result in zip(positions, results):
+                result["index"] = position
+            for verdict in report["verdicts"]:
+                verdict["conversation"] = positions[verdict["conversation"]]
+            shard_info = {"index": shard[0], "count": shard[1]}
+
+        dataset_path = write_evaluation_results(
+            results, avg_bleu, train_size, output_prefix, report, shard_info
         )
-        if dataset_path is None:
-            raise ValueError("Failed to compute BLEU scores")
 
-        # Step 2: Extract generated code
-        success, generated_code_dir = extract_generated_code(
-            dataset_path, output_prefix
+        file_logger.write_and_print(f"\nEvaluation Results ({output_prefix}):\n", heading=2)
+        file_logger.write_and_print(
+            f"\nAverage BLEU Score ({BLEU_SCOPE} only): {avg_bleu:.4f}", heading=3
         )
-        if not success or not generated_code_dir:
-            raise ValueError("Failed to extract generated code")
-
-        # Step 3: Process the generated code
-        mapped_dataset = DataProcessor.convert_pairs_to_json(generated_code_dir)
-        if not mapped_dataset:
-            raise ValueError("Failed to map generated code to dataset format")
-
-        # Step 4: Run code validation
-        file_logger.write_and_print("Processing dataset inline...", heading=3)
-        client = BuildCheckerClient()
-        work_sampl, tot_sampl = client.process_dataset_inline_content(
-            json.loads(mapped_dataset), run=True
+        file_logger.write_and_print(
+            "\nBLEU of results without a bleu_scope includes the prompt and is not comparable"
         )
-
+        file_logger.write_and_print(f"\nDetailed results saved to: {dataset_path}")
         file_logger.write_and_print(
             f"\nRunning examples: {work_sampl}/{tot_sampl}\n", heading=3
         )
+        for name, value in report.get("pass_at_k", {}).items():
+            file_logger.write_and_print(f"\n{name}: {value:.4f}", heading=3)
+        performance = report["performance"]
+        file_logger.write_and_print(
+            f"\nPerformance: {performance['total_seconds']:.1f}s, "
+            f"{performance['generated_tokens']} tokens at {performance['tokens_per_second']:.1f} tokens/s, "
+            f"time to first token {performance['time_to_first_token_seconds']:.3f}s, "
+            f"{performance['snippets_per_second']:.2f} snippets/s"
+        )
+        file_logger.write_and_print(
+            "\nPhases: " + ", ".join(
+                f"{name[: -len('_seconds')]} {performance[name]:.2f}s"
+                for name in EVALUATION_TIMINGS
+                if name.endswith("_seconds") and name != "total_seconds"
+            )
+        )
+
+        if write_code_files:
+            extract_generated_code(dataset_path, output_prefix)
 
         return dataset_path, avg_bleu, (work_sampl, tot_sampl)
 
     except Exception as e:
         file_logger.write_and_print(f"Error during model evaluation: {str(e)}")
         raise
+
+
+def main(argv=None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evaluation utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    merge_parser = subparsers.add_parser(
+        "merge", help="Merge the partial results files of a sharded evaluation"
+    )
+    merge_parser.add_argument("partial_files", nargs="+", help="Partial results of every shard")
+    merge_parser.add_argument(
+        "--output-prefix", type=str, required=True, help="Prefix of the merged results file"
+    )
+    args = parser.parse_args(argv)
+    if args.command == "merge":
+        merge_evaluation_results(args.partial_files, args.output_prefix)
+
+
+# Merge the results of `train.py --shard i/N` runs:
+# poetry run python evaluate.py merge --output-prefix base ../res/data/results/evaluation_results_base_*_shard*.json
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,247 @@
-import requests
-import json
 import os
-from typing import Tuple
+import sys
+import asyncio
+import requests
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from logger import file_logger
 
+# Checking a snippet is idempotent, so POSTs are retried like GETs
+RETRY_STATUSES = (429, 502, 503, 504)
+
+BUILD_CHECKER_DIR = Path(__file__).resolve().parents[3] / "build_checker" / "build_checker"
+
+
+def snippets_from_pairs(pairs: Iterable[Tuple[str, str]]) -> List[Dict]:
+    """Turn `(prompt, code)` pairs into the payload of the batch endpoint."""
+    return [{"prompt": prompt, "code": code} for prompt, code in pairs]
+
+
+def _batches(snippets: List[Dict], batch_size: int):
+    for start in range(0, len(snippets), batch_size):
+        yield snippets[start : start + batch_size]
+
+
+def verdict_rows(verdicts: Dict) -> List[Dict]:
+    """
+    Expand the column-wise verdicts sent by the server into one dict per snippet
+    with `conversation`, `snippet`, `status`, `success`, `cache_hit`, `attempts`,
+    `error` and `timings_ms` (per phase, None when the phase did not run).
+    """
+    timings = verdicts.get("timings_ms", {})
+    return [
+        {
+            "conversation": verdicts["conversation"][i],
+            "snippet": verdicts["snippet"][i],
+            "status": status,
+            # Flaky snippets passed after failed attempts
+            "success": status in ("passed", "flaky"),
+            "cache_hit": verdicts["cache_hit"][i],
+            "attempts": verdicts["attempts"][i] if "attempts" in verdicts else None,
+            "error": verdicts["error"][i],
+            "timings_ms": {phase: values[i] for phase, values in timings.items()},
+        }
+        for i, status in enumerate(verdicts["status"])
+    ]
+
+
+def _validation_report(result) -> Dict:
+    if result is None:
+        return {"successful_runs": 0, "total_snippets": 0, "verdicts": []}
+    return {
+        "successful_runs": result["successful_runs"],
+        "total_snippets": result["total_snippets"],
+        "verdicts": verdict_rows(result["verdicts"]) if result.get("verdicts") else [],
+    }
+
+
+def _failed_verdicts(count: int, message: str) -> List[Dict]:
+    return [
+        {"success": False, "message": message, "status": "error", "error": message, "cache_hit": False}
+        for _ in range(count)
+    ]
+
+
+class HttpTransport:
+    """
+    Sends requests to a build checker server.
+
+    Connections are kept alive in a pooled session and failed requests
+    (connection errors, 429/5xx) are retried with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        pool_size: int = 10,
+        timeout: float = None,
+    ):
+        self.base_url = base_url
+        self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def post(self, endpoint: str, payload: dict):
+        """Return the decoded response of `endpoint`, or None on error."""
+        try:
+            response = self.session.post(
+                f"{self.base_url}/{endpoint}", json=payload, timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            file_logger.write_and_print(f"API Error ({endpoint}): {e}")
+            return None
+        if response.status_code != 200:
+            file_logger.write_and_print(
+                f"API Error ({response.status_code}): {response.text}"
+            )
+            return None
+        return response.json()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class LocalTransport:
+    """
+    Calls the build checker engine in this process instead of going through HTTP.
+
+    Payloads are handed over as they are (no JSON encoding, no copies) and the
+    responses have the same shape as the server's. Without an explicit `api`,
+    a BuildCheckerAPI is created with the same environment based configuration
+    as the server (BUILD_CHECKER_EXECUTOR, BUILD_CHECKER_POOL_SIZE, ...).
+    """
+
+    def __init__(self, api=None):
+        self._owns_api = api is None
+        self.api = api if api is not None else create_local_api()
+
+    def post(self, endpoint: str, payload: dict):
+        """Return what the server would respond on `endpoint`, or None on error."""
+        try:
+            if endpoint == "check-batch":
+                return self.api.check_batch(
+                    payload["snippets"], payload["build"], payload["run"], payload["use_cache"]
+                )
+            if endpoint == "process-dataset-inline":
+                if not payload["data"]:
+                    file_logger.write_and_print("API Error (400): No data provided in the dataset")
+                    return None
+                report = self.api.validate_dataset(
+                    payload["data"], payload["build"], payload["run"], payload["use_hashes"]
+                )
+                successful_runs = report["successful_runs"]
+                total_snippets = report["total_snippets"]
+                return {
+                    "successful_runs": successful_runs,
+                    "total_snippets": total_snippets,
+                    "completed": True,
+                    "message": f"Processed {successful_runs}/{total_snippets} snippets successfully",
+                    "verdicts": report["verdicts"] if payload.get("return_verdicts", True) else None,
+                }
+        except Exception as e:
+            file_logger.write_and_print(f"API Error ({endpoint}): {e}")
+            return None
+        raise ValueError(f"Unknown endpoint '{endpoint}'")
+
+    def close(self) -> None:
+        if self._owns_api:
+            self.api.close()
+
+
+def create_local_api(**options):
+    """Instantiate the build checker engine of this repository in-process."""
+    if str(BUILD_CHECKER_DIR) not in sys.path:
+        sys.path.append(str(BUILD_CHECKER_DIR))
+    from api import BuildCheckerAPI
+
+    return BuildCheckerAPI(**options)
+
 
 class BuildCheckerClient:
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    """
+    Client of the build checker.
+
+    With `transport="http"` (the default) requests go to the server at
+    `base_url`; with `transport="local"` the engine runs in this process,
+    which avoids the network hop and having to start a server. The default
+    can be changed with the BUILD_CHECKER_TRANSPORT environment variable.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        pool_size: int = 10,
+        timeout: float = None,
+        batch_size: int = 64,
+        transport: str = None,
+        api=None,
+    ):
         self.base_url = base_url
+        self.batch_size = batch_size
+        transport = transport or os.environ.get("BUILD_CHECKER_TRANSPORT", "http")
+        if transport == "local":
+            self.transport = LocalTransport(api)
+        elif transport == "http":
+            self.transport = HttpTransport(
+                base_url, retries, backoff_factor, pool_size, timeout
+            )
+        else:
+            raise ValueError(f"Unknown transport '{transport}', expected 'http' or 'local'")
+
+    def close(self) -> None:
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _post(self, endpoint: str, payload: dict):
+        return self.transport.post(endpoint, payload)
+
+    def check_snippets(
+        self, snippets: List[Dict], build: bool = False, run: bool = True, use_cache: bool = True
+    ) -> List[Dict]:
+        """
+        Check many snippets with one request per `batch_size` snippets.
+
+        Args:
+            snippets: dicts with `code` and optionally `prompt`.
+
+        Returns:
+            One verdict per snippet (`success`, `message`, `cache_hit`), in order.
+            Snippets of a batch the server could not process are reported as failed.
+        """
+        verdicts = []
+        for batch in _batches(snippets, self.batch_size):
+            payload = {"snippets": batch, "build": build, "run": run, "use_cache": use_cache}
+            result = self._post("check-batch", payload)
+            if result is None:
+                verdicts.extend(_failed_verdicts(len(batch), "Build checker API error"))
+            else:
+                verdicts.extend(result["results"])
+        return verdicts
+
+    def check_snippet(self, code: str, prompt: str = None, build: bool = False, run: bool = True) -> Dict:
+        return self.check_snippets([{"code": code, "prompt": prompt}], build, run)[0]
 
     def process_dataset_inline_content(
         self, data_content, build: bool = False, run: bool = True
@@ -20,17 +254,143 @@ class BuildCheckerClient:
             "build": build,
             "run": run,
             "use_hashes": False,
+            "return_verdicts": False,
         }
         file_logger.write_and_print("Sending request to build checker API inline content\n")
 
-        response = requests.post(f"{self.base_url}/process-dataset-inline", json=payload)
+        result = self._post("process-dataset-inline", payload)
+        if result is None:
+            return 0, 0
+        return result["successful_runs"], result["total_snippets"]
+
+    def validate_dataset(self, data_content, build: bool = False, run: bool = True) -> Dict:
+        """
+        Process a dataset and return the per-snippet verdicts along with the counts.
+
+        Returns:
+            Dict with `successful_runs`, `total_snippets` and `verdicts`, one dict per
+            snippet in input order (see `verdict_rows`). On API errors the counts
+            are 0 and `verdicts` is empty.
+        """
+        payload = {"data": data_content, "build": build, "run": run, "use_hashes": False}
+        return _validation_report(self._post("process-dataset-inline", payload))
+
+
+class AsyncBuildCheckerClient:
+    """
+    asyncio variant of BuildCheckerClient, built on httpx.
+
+    Batches are sent concurrently (up to `max_concurrency` in flight), so
+    evaluation loops can keep generating while earlier snippets are checked.
+    With `transport="local"` the batches run in worker threads of this process.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_concurrency: int = 4,
+        timeout: float = None,
+        batch_size: int = 64,
+        transport: str = None,
+        api=None,
+    ):
+        self.base_url = base_url
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.batch_size = batch_size
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        transport = transport or os.environ.get("BUILD_CHECKER_TRANSPORT", "http")
+        if transport not in ("http", "local"):
+            raise ValueError(f"Unknown transport '{transport}', expected 'http' or 'local'")
+        self.local = LocalTransport(api) if transport == "local" else None
+        if self.local is not None:
+            self.client = None
+            return
+
+        import httpx
+
+        self._httpx = httpx
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrency),
+        )
+
+    async def aclose(self) -> None:
+        if self.local is not None:
+            self.local.close()
+        else:
+            await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def _post(self, endpoint: str, payload: dict):
+        if self.local is not None:
+            async with self._semaphore:
+                return await asyncio.to_thread(self.local.post, endpoint, payload)
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    response = await self.client.post(f"/{endpoint}", json=payload)
+                    error = None
+                    if response.status_code not in RETRY_STATUSES:
+                        break
+                except self._httpx.TransportError as e:
+                    response, error = None, e
+                if attempt < self.retries:
+                    await asyncio.sleep(self.backoff_factor * 2**attempt)
+        if response is None:
+            file_logger.write_and_print(f"API Error ({endpoint}): {error}")
+            return None
         if response.status_code != 200:
             file_logger.write_and_print(
                 f"API Error ({response.status_code}): {response.text}"
             )
-            return 0, 0
+            return None
+        return response.json()
 
-        result = response.json()
-        return result["successful_runs"], result["total_snippets"]
+    async def check_snippets(
+        self, snippets: List[Dict], build: bool = False, run: bool = True, use_cache: bool = True
+    ) -> List[Dict]:
+        """Async counterpart of `BuildCheckerClient.check_snippets`."""
+
+        async def check_batch(batch):
+            payload = {"snippets": batch, "build": build, "run": run, "use_cache": use_cache}
+            result = await self._post("check-batch", payload)
+            if result is None:
+                return _failed_verdicts(len(batch), "Build checker API error")
+            return result["results"]
+
+        batches = await asyncio.gather(
+            *(check_batch(batch) for batch in _batches(snippets, self.batch_size))
+        )
+        return [verdict for batch in batches for verdict in batch]
+
+    async def check_snippet(self, code: str, prompt: str = None, build: bool = False, run: bool = True) -> Dict:
+        return (await self.check_snippets([{"code": code, "prompt": prompt}], build, run))[0]
 
+    async def process_dataset_inline_content(
+        self, data_content, build: bool = False, run: bool = True
+    ) -> Tuple[int, int]:
+        payload = {
+            "data": data_content,
+            "build": build,
+            "run": run,
+            "use_hashes": False,
+            "return_verdicts": False,
+        }
+        result = await self._post("process-dataset-inline", payload)
+        if result is None:
+            return 0, 0
+        return result["successful_runs"], result["total_snippets"]
 
+    async def validate_dataset(self, data_content, build: bool = False, run: bool = True) -> Dict:
+        """Async counterpart of `BuildCheckerClient.validate_dataset`."""
+        payload = {"data": data_content, "build": build, "run": run, "use_hashes": False}
+        return _validation_report(await self._post("process-dataset-inline", payload))
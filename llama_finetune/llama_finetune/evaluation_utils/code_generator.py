@@ -1,7 +1,48 @@
-from typing import Any, List
-from unsloth import FastLanguageModel
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import torch
+from transformers import StoppingCriteriaList
+from .generation_cache import GenerationCache, model_fingerprint
+from .stopping_criteria import CodeBlockStoppingCriteria, FirstTokenTimer, trim_completion
+
+# Prompts generated together; throughput grows with it until the GPU saturates
+DEFAULT_BATCH_SIZE = 8
+# Counters of the `timings` of a generation
+GENERATION_TIMINGS = (
+    "tokenization_seconds",
+    "prefill_seconds",
+    "decode_seconds",
+    "batches",
+    "prompt_tokens",
+    "generated_tokens",
+    "cache_hits",
+)
+
 
 class CodeGenerator:
+    @staticmethod
+    def select_device(model: Any = None) -> torch.device:
+        """Device of `model` if it has been placed, otherwise the best one available."""
+        device = getattr(model, "device", None)
+        if device is not None:
+            return torch.device(device)
+        if torch.cuda.is_available():
+            return torch.device("cuda")
+        if getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available():
+            return torch.device("mps")
+        return torch.device("cpu")
+
+    @staticmethod
+    def prepare_for_inference(model: Any) -> None:
+        """Enable Unsloth's fast inference path when available, else plain eval mode."""
+        try:
+            from unsloth import FastLanguageModel
+        except Exception:
+            # Unsloth needs a GPU; plain transformers models run anywhere
+            model.eval()
+            return
+        FastLanguageModel.for_inference(model)
+
     @staticmethod
     def generate_code(
         model: Any,
@@ -10,25 +51,219 @@ class CodeGenerator:
         max_new_tokens: int = 512,
         temperature: float = 1.5,
         min_p: float = 0.1,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        device: Optional[str] = None,
+        cache: Optional[GenerationCache] = None,
+        seed: Optional[int] = None,
+        stop_at_code_end: bool = True,
+        timings: Optional[Dict] = None,
     ) -> List[str]:
-        """Generate code outputs for a list of prompts."""
-        FastLanguageModel.for_inference(model)
-        generated_codes = []
-
-        for prompt in prompts:
-            messages = [{"role": "user", "content": prompt}]
-            inputs = tokenizer.apply_chat_template(
-                messages, tokenize=True, add_generation_prompt=True, return_tensors="pt"
-            ).to("cuda")
-
-            outputs = model.generate(
-                input_ids=inputs,
-                max_new_tokens=max_new_tokens,
-                use_cache=True,
-                temperature=temperature,
-                min_p=min_p,
+        """Generate the completion of each prompt, in the same order."""
+        records = CodeGenerator.generate_records(
+            model, tokenizer, prompts, max_new_tokens, temperature, min_p, batch_size, device,
+            cache=cache, seed=seed, stop_at_code_end=stop_at_code_end, timings=timings,
+        )
+        return [record["completion"] for record in records]
+
+    @staticmethod
+    def generate_records(
+        model: Any,
+        tokenizer: Any,
+        prompts: List[str],
+        max_new_tokens: int = 512,
+        temperature: float = 1.5,
+        min_p: float = 0.1,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        device: Optional[str] = None,
+        cache: Optional[GenerationCache] = None,
+        seed: Optional[int] = None,
+        num_samples: int = 1,
+        stop_at_code_end: bool = True,
+        timings: Optional[Dict] = None,
+    ) -> List[Dict]:
+        """
+        Generate code for a list of prompts, returning one record per prompt in
+        the same order: `prompt`, `completion` (only the generated text, without
+        the chat-templated prompt) and `token_counts` (`prompt` and `completion`).
+        """
+        records = [None] * len(prompts)
+        for positions, batch_records in CodeGenerator.iter_generate_records(
+            model, tokenizer, prompts, max_new_tokens, temperature, min_p, batch_size, device,
+            cache=cache, seed=seed, num_samples=num_samples,
+            stop_at_code_end=stop_at_code_end, timings=timings,
+        ):
+            for position, record in zip(positions, batch_records):
+                records[position] = record
+        return records
+
+    @staticmethod
+    def iter_generate_records(
+        model: Any,
+        tokenizer: Any,
+        prompts: List[str],
+        max_new_tokens: int = 512,
+        temperature: float = 1.5,
+        min_p: float = 0.1,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        device: Optional[str] = None,
+        cache: Optional[GenerationCache] = None,
+        seed: Optional[int] = None,
+        num_samples: int = 1,
+        stop_at_code_end: bool = True,
+        timings: Optional[Dict] = None,
+    ) -> Iterator[Tuple[List[int], List[Dict]]]:
+        """
+        Generate like `generate_records`, yielding every batch as soon as it is
+        done as `(positions, records)`, with the positions of its prompts.
+
+        Prompts are generated `batch_size` at a time, left padded, after sorting
+        them by length so that each batch pads as little as possible. With a
+        `cache`, the prompts it already has come first, in one batch, and the new
+        completions are added to it. Records tell whether they were a `cache_hit`.
+
+        With `num_samples` > 1, every prompt is sampled that many times in the
+        same `generate` call (`batch_size` then counts sequences, not prompts) and
+        records also hold all of them as `samples` (`completion`, `token_counts`);
+        `completion` and `token_counts` are those of the first one.
+
+        With `stop_at_code_end`, every sequence stops as soon as its code is
+        complete (see `CodeBlockStoppingCriteria`) and what follows is dropped.
+
+        A `timings` dict accumulates the seconds spent in each phase
+        (`tokenization_seconds`, `prefill_seconds` up to the first token of each
+        batch, `decode_seconds`), the `batches` generated, their `prompt_tokens`
+        and `generated_tokens`, and the prompts served from the cache
+        (`cache_hits`).
+        """
+        if timings is None:
+            timings = {}
+        for name in GENERATION_TIMINGS:
+            timings.setdefault(name, 0)
+        CodeGenerator.prepare_for_inference(model)
+        device = torch.device(device) if device else CodeGenerator.select_device(model)
+
+        def record(i, samples, cache_hit):
+            result = {"prompt": prompts[i], **samples[0], "cache_hit": cache_hit}
+            if num_samples > 1:
+                result["samples"] = samples
+            return result
+
+        pending = list(range(len(prompts)))
+        if cache is not None:
+            fingerprint = model_fingerprint(model, tokenizer)
+            options = {
+                "max_new_tokens": max_new_tokens,
+                "temperature": temperature,
+                "min_p": min_p,
+                "do_sample": num_samples > 1 or getattr(
+                    getattr(model, "generation_config", None), "do_sample", None
+                ),
+                "seed": seed,
+                "stop_at_code_end": stop_at_code_end,
+            }
+            sample_options = [options] if num_samples == 1 else [
+                {**options, "num_samples": num_samples, "sample": j} for j in range(num_samples)
+            ]
+            keys = [
+                [GenerationCache.key(fingerprint, prompt, opts) for opts in sample_options]
+                for prompt in prompts
+            ]
+            hits = []
+            for i in pending:
+                cached = [cache.get(key) for key in keys[i]]
+                if all(sample is not None for sample in cached):
+                    hits.append((i, record(i, cached, True)))
+            timings["cache_hits"] += len(hits)
+            if hits:
+                yield [i for i, _ in hits], [r for _, r in hits]
+            hit_positions = {i for i, _ in hits}
+            pending = [i for i in pending if i not in hit_positions]
+        if not pending:
+            return
+        if seed is not None:
+            torch.manual_seed(seed)
+        prompts_per_batch = max(1, batch_size // num_samples)
+        sampling = {"num_return_sequences": num_samples, "do_sample": True} if num_samples > 1 else {}
+
+        started = time.perf_counter()
+        texts = {
+            i: tokenizer.apply_chat_template(
+                [{"role": "user", "content": prompts[i]}], tokenize=False, add_generation_prompt=True
             )
-            generated_code = tokenizer.batch_decode(outputs, skip_special_tokens=True)[0]
-            generated_codes.append(generated_code)
+            for i in pending
+        }
+        encoded = tokenizer([texts[i] for i in pending], add_special_tokens=False)["input_ids"]
+        lengths = {i: len(ids) for i, ids in zip(pending, encoded)}
+        order = sorted(pending, key=lambda i: lengths[i], reverse=True)
+
+        # Decoder-only models continue from the last position, so pad on the left
+        padding_side = tokenizer.padding_side
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        timings["tokenization_seconds"] += time.perf_counter() - started
+
+        for start in range(0, len(order), prompts_per_batch):
+            batch = order[start : start + prompts_per_batch]
+            started = time.perf_counter()
+            tokenizer.padding_side = "left"
+            try:
+                inputs = tokenizer(
+                    [texts[i] for i in batch],
+                    padding=True,
+                    add_special_tokens=False,
+                    return_tensors="pt",
+                ).to(device)
+            finally:
+                tokenizer.padding_side = padding_side
+            input_ids = inputs["input_ids"]
+            timings["tokenization_seconds"] += time.perf_counter() - started
 
-        return generated_codes
\ No newline at end of file
+            first_token = FirstTokenTimer()
+            stopping_criteria = StoppingCriteriaList([first_token])
+            if stop_at_code_end:
+                stopping_criteria.append(CodeBlockStoppingCriteria(tokenizer, input_ids.shape[1]))
+            started = time.perf_counter()
+            with torch.inference_mode():
+                outputs = model.generate(
+                    input_ids=input_ids,
+                    attention_mask=inputs["attention_mask"],
+                    max_new_tokens=max_new_tokens,
+                    use_cache=True,
+                    temperature=temperature,
+                    min_p=min_p,
+                    pad_token_id=tokenizer.pad_token_id,
+                    stopping_criteria=stopping_criteria,
+                    **sampling,
+                )
+            finished = time.perf_counter()
+            first_token_at = first_token.at or finished
+            timings["prefill_seconds"] += first_token_at - started
+            timings["decode_seconds"] += finished - first_token_at
+            # Every row starts with the padded prompt; keep only what follows.
+            # The samples of a prompt are consecutive rows.
+            completions = outputs[:, input_ids.shape[1] :]
+            decoded = tokenizer.batch_decode(completions, skip_special_tokens=True)
+            if stop_at_code_end:
+                decoded = [trim_completion(text) for text in decoded]
+            completion_counts = (completions != tokenizer.pad_token_id).sum(dim=1).tolist()
+            timings["batches"] += 1
+            timings["prompt_tokens"] += sum(lengths[i] for i in batch) * num_samples
+            timings["generated_tokens"] += sum(completion_counts)
+            records = []
+            for b, i in enumerate(batch):
+                rows = range(b * num_samples, (b + 1) * num_samples)
+                samples = [
+                    {
+                        "completion": decoded[row],
+                        "token_counts": {
+                            "prompt": lengths[i],
+                            "completion": completion_counts[row],
+                        },
+                    }
+                    for row in rows
+                ]
+                if cache is not None:
+                    for key, sample in zip(keys[i], samples):
+                        cache.put(key, sample)
+                records.append(record(i, samples, False))
+            yield batch, records
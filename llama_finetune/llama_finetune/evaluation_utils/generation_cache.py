@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from contextlib import closing
+from typing import Any, Dict, Optional
+
+import torch
+
+# Default location of the cache, in llama_finetune/res with the other outputs
+# whatever the working directory; GENERATION_CACHE_PATH overrides it
+GENERATION_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../../res/cache/generations.sqlite"
+)
+# LRU limits: least recently used completions are evicted beyond either one
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def _hash_tensor(digest, tensor: torch.Tensor) -> None:
+    # Raw bytes, whatever the dtype (numpy has no bfloat16)
+    digest.update(tensor.detach().reshape(-1).contiguous().view(torch.uint8).cpu().numpy().tobytes())
+
+
+def adapter_hash(model: Any) -> str:
+    """
+    Hash of the LoRA adapter weights of `model`, or "" if it has none. Adapters
+    trained in this process and adapters loaded from disk hash the same.
+    """
+    digest = hashlib.sha256()
+    found = False
+    for name, parameter in sorted(model.named_parameters(), key=lambda item: item[0]):
+        if "lora_" in name:
+            digest.update(name.encode())
+            _hash_tensor(digest, parameter)
+            found = True
+    return digest.hexdigest() if found else ""
+
+
+def model_fingerprint(model: Any, tokenizer: Any) -> Dict:
+    """What, besides the prompt and sampling options, determines a completion."""
+    config = getattr(model, "config", None)
+    return {
+        "base_model": getattr(config, "_name_or_path", ""),
+        "revision": getattr(config, "_commit_hash", None),
+        "adapter": adapter_hash(model),
+        "tokenizer": getattr(tokenizer, "name_or_path", ""),
+        "vocab_size": len(tokenizer),
+        "chat_template": getattr(tokenizer, "chat_template", None),
+    }
+
+
+class GenerationCache:
+    """
+    Completions already generated, stored in SQLite and keyed by the model
+    fingerprint (base model, adapter weights, tokenizer and chat template), the
+    prompt and the sampling options, so that re-evaluating a model costs no GPU
+    time. Sampled completions are cached too: a re-evaluation then scores the
+    same samples; pass `use_generation_cache=False` to draw new ones.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS generations (
+        key TEXT PRIMARY KEY,
+        completion TEXT NOT NULL,
+        prompt_tokens INTEGER NOT NULL,
+        completion_tokens INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        last_used REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS generations_last_used ON generations (last_used);
+    CREATE TABLE IF NOT EXISTS totals (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.path = path or os.environ.get("GENERATION_CACHE_PATH", GENERATION_CACHE_PATH)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+            # Running totals, so that evicting needs no scan of the table; caches
+            # created without them get them computed once
+            conn.execute(
+                "INSERT OR IGNORE INTO totals SELECT 'entries', COUNT(*) FROM generations"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO totals SELECT 'bytes', COALESCE(SUM(size), 0) FROM generations"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def key(fingerprint: Dict, prompt: str, options: Dict) -> str:
+        content = json.dumps(
+            {"model": fingerprint, "prompt": prompt, "options": options}, sort_keys=True
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached `{completion, token_counts}` for `key`, or None."""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT completion, prompt_tokens, completion_tokens FROM generations WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE generations SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+        return {
+            "completion": row[0],
+            "token_counts": {"prompt": row[1], "completion": row[2]},
+        }
+
+    def put(self, key: str, record: Dict) -> None:
+        completion = record["completion"]
+        size = len(completion.encode("utf-8"))
+        with closing(self._connect()) as conn, conn:
+            # Other processes must not change the entry between reading and replacing it
+            conn.execute("BEGIN IMMEDIATE")
+            replaced = conn.execute(
+                "SELECT size FROM generations WHERE key = ?", (key,)
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO generations "
+                "(key, completion, prompt_tokens, completion_tokens, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    completion,
+                    record["token_counts"]["prompt"],
+                    record["token_counts"]["completion"],
+                    size,
+                    time.time(),
+                ),
+            )
+            if replaced is None:
+                self._add_to_totals(conn, 1, size)
+            else:
+                self._add_to_totals(conn, 0, size - replaced[0])
+            self._evict(conn)
+
+    @staticmethod
+    def _add_to_totals(conn: sqlite3.Connection, entries: int, size: int) -> None:
+        conn.executemany(
+            "UPDATE totals SET value = value + ? WHERE name = ?",
+            ((entries, "entries"), (size, "bytes")),
+        )
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        totals = dict(conn.execute("SELECT name, value FROM totals"))
+        entries, total = totals["entries"], totals["bytes"]
+        over_entries = max(0, entries - self.max_entries) if self.max_entries is not None else 0
+        over_bytes = self.max_bytes is not None and total > self.max_bytes
+        if not over_entries and not over_bytes:
+            return
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM generations ORDER BY last_used"):
+            if len(evicted) >= over_entries and (self.max_bytes is None or total <= self.max_bytes):
+                break
+            evicted.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM generations WHERE key = ?", evicted)
+        self._add_to_totals(conn, -len(evicted), total - totals["bytes"])
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
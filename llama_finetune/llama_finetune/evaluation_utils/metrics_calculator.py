@@ -1,4 +1,5 @@
 from typing import List, Dict, Tuple
+import math
 import nltk
 from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
 import sacrebleu
@@ -40,4 +41,17 @@ class MetricsCalculator:
             results.append({"reference": ref, "generated": gen, "bleu": bleu})
 
         avg_bleu = sum(bleu_scores) / len(bleu_scores) if bleu_scores else 0
-        return results, avg_bleu
\ No newline at end of file
+        return results, avg_bleu
+
+    @staticmethod
+    def pass_at_k(num_samples: int, num_correct: int, k: int) -> float:
+        """
+        Unbiased estimate of the probability that at least one of k samples
+        passes, from `num_correct` passing samples out of `num_samples`:
+        1 - C(n - c, k) / C(n, k), computed as a product to stay stable.
+        """
+        if num_samples - num_correct < k:
+            return 1.0
+        return 1.0 - math.prod(
+            1.0 - k / i for i in range(num_samples - num_correct + 1, num_samples + 1)
+        )
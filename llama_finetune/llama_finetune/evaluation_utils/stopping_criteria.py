@@ -0,0 +1,131 @@
+import re
+import time
+from typing import Any, Optional
+
+import torch
+from transformers import StoppingCriteria
+
+# Start of a line that is no longer code once a top-level structure is closed:
+# prose ("This program ...", "Note:"), markdown markup or a stray fence
+PROSE_LINE = re.compile(r"(?:[A-Z][a-z']*[ ,:\n]|\*\*|#{1,6} |\d+\. |```)")
+# Checking the end of the code is only worth it close to the start of a line
+LINE_START_WINDOW = 16
+
+
+def _top_level_line_starts(text: str):
+    """
+    Start index of every line that begins at brace depth 0 after at least one
+    brace was opened, ignoring braces in comments and string or char literals.
+    """
+    depth = 0
+    opened = False
+    i = 0
+    length = len(text)
+    while i < length:
+        c = text[i]
+        if text.startswith("//", i):
+            end = text.find("\n", i)
+            i = length if end == -1 else end
+            continue
+        if text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+            continue
+        if text.startswith('"""', i):
+            end = text.find('"""', i + 3)
+            i = length if end == -1 else end + 3
+            continue
+        if c == '"':
+            i += 1
+            while i < length and text[i] not in '"\n':
+                i += 2 if text[i] == "\\" else 1
+            i += 1
+            continue
+        if c == "'" and (text[i + 2 : i + 3] == "'" or text[i + 1 : i + 2] == "\\"):
+            end = text.find("'", i + 2)
+            i = length if end == -1 else end + 1
+            continue
+        if c == "{":
+            depth += 1
+            opened = True
+        elif c == "}":
+            depth = max(depth - 1, 0)
+        elif c == "\n" and depth == 0 and opened:
+            yield i + 1
+        i += 1
+
+
+def code_end(text: str) -> Optional[int]:
+    """
+    Index at which the code of a completion ends, or None while it may go on.
+
+    Fenced code ends with the fence closing the first code block. Unfenced code
+    ends before the first prose line following a balanced top-level structure,
+    e.g. the explanation after `object Main { ... }`.
+    """
+    opening = re.search(r"^[ \t]*```[^\n]*\n", text, re.MULTILINE)
+    if opening is not None:
+        closing = re.search(r"^[ \t]*```", text[opening.end() :], re.MULTILINE)
+        return opening.end() + closing.end() if closing is not None else None
+    for start in _top_level_line_starts(text):
+        if PROSE_LINE.match(text, start):
+            return len(text[:start].rstrip())
+    return None
+
+
+def trim_completion(text: str) -> str:
+    """`text` without what follows the end of its code."""
+    end = code_end(text)
+    return text if end is None else text[:end]
+
+
+class CodeBlockStoppingCriteria(StoppingCriteria):
+    """
+    Stops every sequence of a `generate` call, independently of the others, as
+    soon as its completion holds a complete code block (see `code_end`), so
+    that no decode step is spent on the explanations models add after it.
+    """
+
+    def __init__(self, tokenizer: Any, prompt_length: int):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.checked = {}
+        self.stopped = set()
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        done = torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+        for row in range(input_ids.shape[0]):
+            if row in self.stopped:
+                done[row] = True
+                continue
+            text = self.tokenizer.decode(
+                input_ids[row, self.prompt_length :], skip_special_tokens=True
+            )
+            new = text[self.checked.get(row, 0) :]
+            self.checked[row] = len(text)
+            # The code can only end on a new line, a fence or at the start of a line
+            line = text[text.rfind("\n") + 1 :]
+            if "\n" not in new and "`" not in new and len(line) > LINE_START_WINDOW:
+                continue
+            if code_end(text) is not None:
+                self.stopped.add(row)
+                done[row] = True
+        return done
+
+
+class FirstTokenTimer(StoppingCriteria):
+    """
+    Never stops generation; records when the first token of a `generate` call
+    was produced (`at`, a `time.perf_counter()` value), which separates the
+    prefill from the decode steps.
+    """
+
+    def __init__(self):
+        self.at = None
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        if self.at is None:
+            if input_ids.is_cuda:
+                torch.cuda.synchronize(input_ids.device)
+            self.at = time.perf_counter()
+        return torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
@@ -83,7 +83,30 @@ def parse_args():
         action="store_true",
         help="Evaluate the not finetuned model using build checker and BLEU score",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--no-generation-cache",
+        action="store_true",
+        help="Generate every completion again instead of reusing cached ones",
+    )
+    parser.add_argument(
+        "--num-samples",
+        type=int,
+        default=1,
+        help="Completions sampled per test prompt; above 1, pass@k is reported",
+    )
+    from evaluate import parse_shard
+
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        help="Evaluate only shard i/N of the test set (with --load-model or --eval-base); "
+        "merge the partial results with `evaluate.py merge`",
+    )
+    args = parser.parse_args()
+    if args.shard is not None and not (args.load_model or args.eval_base):
+        parser.error("--shard only applies to --load-model and --eval-base evaluations")
+    return args
 
 
 def process_loaded_model(
@@ -100,11 +123,21 @@ def process_loaded_model(
 
     # Evaluate loaded model
     print("Evaluating loaded fine-tuned model...")
-    from evaluate import evaluate_model
+    from evaluate import evaluate_model, load_performance
 
     results_file, avg_bleu, samples_info = evaluate_model(
-        model, tokenizer, args.test_dataset_path, train_dataset_size, output_prefix
+        model,
+        tokenizer,
+        args.test_dataset_path,
+        train_dataset_size,
+        output_prefix,
+        use_generation_cache=not args.no_generation_cache,
+        num_samples=args.num_samples,
+        shard=args.shard,
     )
+    if args.shard is not None:
+        # Partial results are not model info; merge the shards first
+        return
 
     # Create training arguments with global parameters
     local_training_params = TRAINING_PARAMS.copy()
@@ -119,6 +152,7 @@ def process_loaded_model(
         avg_bleu,
         samples_info,
         PEFT_PARAMS,
+        performance=load_performance(results_file),
     )
 
 
@@ -211,18 +245,28 @@ def main():
         elif args.eval_base:
             # Evaluate the base (not finetuned) model
             print("Evaluating base (not finetuned) model...")
-            from evaluate import evaluate_model
+            from evaluate import evaluate_model, load_performance
             results_file, avg_bleu, samples_info = evaluate_model(
-                model, tokenizer, args.test_dataset_path, train_dataset_size, output_prefix="base"
+                model,
+                tokenizer,
+                args.test_dataset_path,
+                train_dataset_size,
+                output_prefix="base",
+                use_generation_cache=not args.no_generation_cache,
+                num_samples=args.num_samples,
+                shard=args.shard,
             )
             print(f"Evaluation complete. BLEU: {avg_bleu:.4f} - Results: {results_file}")
-            
+            if args.shard is not None:
+                return
+
             store_base_model_info(
                 "../res/data/trained_models/",
                 train_dataset_size,
                 len(load_dataset("json", data_files=args.test_dataset_path, split="train")),
                 avg_bleu,
-                samples_info
+                samples_info,
+                performance=load_performance(results_file),
             )
         elif args.grid_search:
             best_params = execute_smac_optimization(
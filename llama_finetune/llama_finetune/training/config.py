@@ -164,10 +164,11 @@ def _store_model_record(output_dir, model_hash, record):
             json.dump(trained_models, f, indent=2)
         print(f"Stored new model info with hash: {model_hash}")
 
-def store_model_info(output_dir, train_dataset_size, test_dataset_size, trainer_args, avg_bleu, samples_info, peft_params=PEFT_PARAMS):
+def store_model_info(output_dir, train_dataset_size, test_dataset_size, trainer_args, avg_bleu, samples_info, peft_params=PEFT_PARAMS, performance=None):
     """
     Compute a unique hash for the model and hyperparameters, and append
     model info to 'trained_models.json' if this hash isn't present yet.
+    `performance` is the evaluation's timing and throughput record, if any.
     """
     import os
     import hashlib
@@ -217,10 +218,12 @@ def store_model_info(output_dir, train_dataset_size, test_dataset_size, trainer_
             "total_snippets": samples_info[1]
         },  
     }
+    if performance is not None:
+        record["performance"] = performance
     
     _store_model_record(output_dir, model_hash, record)
 
-def store_base_model_info(output_dir, train_dataset_size, test_dataset_size, avg_bleu, samples_info):
+def store_base_model_info(output_dir, train_dataset_size, test_dataset_size, avg_bleu, samples_info, performance=None):
     """
     Store model info for the base (not fine-tuned) model.
     """
@@ -246,6 +249,8 @@ def store_base_model_info(output_dir, train_dataset_size, test_dataset_size, avg
             "total_snippets": samples_info[1]
         },
     }
+    if performance is not None:
+        record["performance"] = performance
 
     _store_model_record(output_dir, model_hash, record)
 
@@ -41,23 +41,23 @@ def execute_smac_optimization(args, model, tokenizer, max_seq_length, train_data
             # Create output directory if it doesn't exist
             os.makedirs(trial_output_dir, exist_ok=True)
             
-            # Run training
-            process_trained_model(
+            # Run training; evaluation results carry the per-sample verdicts
+            eval_results_path, avg_bleu, _ = process_trained_model(
                 args, max_seq_length, current_model, trial_output_dir,
                 current_tokenizer, train_dataset_size,
                 current_peft_params, current_training_params
             )
             
             # Load and process evaluation results
-            eval_results_path = os.path.join(trial_output_dir, "evaluation_results.json")
             with open(eval_results_path, "r") as f:
                 eval_results = json.load(f)
             
             execution_metrics = eval_results.get("execution_check", {})
             running_snippets = execution_metrics.get("successful_runs", 0)
-            total_snippets = execution_metrics.get("total_snippets", 1)
+            total_snippets = execution_metrics.get("total_snippets", 0) or 1
             execution_rate = running_snippets / total_snippets
-            avg_bleu = eval_results.get("avg_bleu", 0)
+            statuses = [v["status"] for v in execution_metrics.get("verdicts", [])]
+            print(f"Trial verdicts: { {s: statuses.count(s) for s in set(statuses)} }")
             
             # Combine metrics into single score (higher is better)
             score = (0.7 * execution_rate) + (0.3 * avg_bleu)
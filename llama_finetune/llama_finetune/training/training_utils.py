@@ -2,7 +2,7 @@ import os
 import time
 import json
 from datasets import load_dataset
-from evaluate import evaluate_model
+from evaluate import evaluate_model, load_performance
 from logger import file_logger
 from .dataset_utils import prepare_dataset
 from .trainer_setup import setup_trainer
@@ -71,7 +71,13 @@ def process_trained_model(
     output_prefix = f"after_finetuning_trainsize{train_dataset_size}"
 
     results_file, avg_bleu, samples_info = evaluate_model(
-        model, tokenizer, args.test_dataset_path, train_dataset_size, output_prefix
+        model,
+        tokenizer,
+        args.test_dataset_path,
+        train_dataset_size,
+        output_prefix,
+        use_generation_cache=not args.no_generation_cache,
+        num_samples=args.num_samples,
     )
 
     train_time_str = f"\nTraining completed in {training_time:.2f} seconds"
@@ -88,7 +94,10 @@ def process_trained_model(
         avg_bleu,
         samples_info,
         PEFT_PARAMS,
+        performance=load_performance(results_file),
     )
 
     file_logger.write_and_print(train_time_str)
     file_logger.write_and_print(train_metrics_path_str)
+
+    return results_file, avg_bleu, samples_info
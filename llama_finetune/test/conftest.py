@@ -3,6 +3,7 @@ import os
 import subprocess
 import pytest
 import time
+import requests
 
 # Add the project root directory to sys.path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -18,10 +19,72 @@ def start_server():
     server_process = subprocess.Popen([
         "poetry", "run", "python", "../build_checker/build_checker/server.py"
     ])
-    time.sleep(5)  # Wait for the server to start
+    # Wait until the server answers /ready instead of sleeping a fixed time
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if requests.get("http://localhost:8000/ready", timeout=1).json().get("ready"):
+                break
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(0.1)
 
     yield
 
     # Teardown: Stop the server
     server_process.terminate()
-    server_process.wait()
\ No newline at end of file
+    server_process.wait()
+
+@pytest.fixture
+def local_client(tmp_path, monkeypatch):
+    """BuildCheckerClient running the fake executor in-process, with its state in tmp_path."""
+    from evaluation_utils.build_client import BuildCheckerClient, create_local_api
+
+    monkeypatch.setenv("BUILD_CHECKER_FAILING_SNIPPETS", str(tmp_path / "failing_snippets.json"))
+    monkeypatch.setenv("BUILD_CHECKER_WORKSPACES_DIR", str(tmp_path / "workspaces"))
+    api = create_local_api(state_dir=str(tmp_path / "state"), executor="fake")
+    with BuildCheckerClient(transport="local", api=api) as client:
+        yield client
+    api.close()
+
+
+WORDS = "write a scala program that prints hello world using akka actors streams and http".split()
+CHAT_TEMPLATE = (
+    "{{ bos_token }}{% for message in messages %}<user> {{ message['content'] }} {% endfor %}"
+    "{% if add_generation_prompt %}<assistant>{% endif %}"
+)
+
+
+@pytest.fixture(scope="session")
+def tiny_model():
+    """Randomly initialized two-layer Llama with a word-level tokenizer, for CPU tests."""
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    from tokenizers import Tokenizer, models, pre_tokenizers
+
+    vocab = {token: i for i, token in enumerate(["<pad>", "<s>", "</s>", "<unk>", "<user>", "<assistant>", *WORDS])}
+    backend = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer = transformers.PreTrainedTokenizerFast(
+        tokenizer_object=backend,
+        bos_token="<s>",
+        eos_token="</s>",
+        unk_token="<unk>",
+        pad_token="<pad>",
+        additional_special_tokens=["<user>", "<assistant>"],
+    )
+    tokenizer.chat_template = CHAT_TEMPLATE
+    torch.manual_seed(0)
+    config = transformers.LlamaConfig(
+        vocab_size=len(vocab),
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        max_position_embeddings=128,
+        pad_token_id=0,
+        bos_token_id=1,
+        eos_token_id=2,
+    )
+    return transformers.LlamaForCausalLM(config), tokenizer
@@ -3,7 +3,7 @@ import os
 import pytest
 import requests
 from unittest.mock import patch, MagicMock
-from llama_finetune.evaluate import BuildCheckerClient
+from evaluation_utils.build_client import BuildCheckerClient
 
 @pytest.mark.integration
 def test_process_dataset_real_api(tmp_path, start_server):
@@ -34,4 +34,55 @@ def test_process_dataset_real_api(tmp_path, start_server):
     print(f"\nTest file path: {test_file}")
     print(f"Successful runs: {successful_runs}")
     print(f"Total snippets: {total_snippets}")
-    assert total_snippets > 0, "Expected at least one snippet to be processed"
\ No newline at end of file
+    assert total_snippets > 0, "Expected at least one snippet to be processed"
+
+@pytest.mark.integration
+def test_check_snippets_batch_real_api(start_server):
+    snippets = [
+        {"prompt": "Write a Hello World program in Scala",
+         "code": 'object Main extends App { println("Hello, World!") }'},
+        {"prompt": "Write a program that does not compile",
+         "code": 'object Main extends App { println("Hello" }'},
+    ]
+
+    with BuildCheckerClient(base_url="http://localhost:8000") as client:
+        verdicts = client.check_snippets(snippets)
+
+    assert len(verdicts) == 2
+    assert verdicts[0]["success"]
+    assert not verdicts[1]["success"]
+
+
+def test_local_transport_matches_server_semantics(local_client):
+    snippets = [
+        {"prompt": "Hello", "code": 'object Main extends App { println("Hello") }'},
+        {"prompt": "Broken", "code": 'object Main extends App { println("Hello" }'},
+    ]
+    verdicts = local_client.check_snippets(snippets)
+    assert [v["success"] for v in verdicts] == [True, False]
+
+    data = [{"conversations": [
+        {"from": "human", "value": snippet["prompt"]},
+        {"from": "assistant", "value": snippet["code"]},
+    ]} for snippet in snippets]
+    assert local_client.process_dataset_inline_content(data) == (1, 2)
+    assert local_client.process_dataset_inline_content([]) == (0, 0)
+
+
+def test_validate_dataset_returns_verdicts_in_input_order(local_client):
+    codes = [
+        'object Main extends App { println("ok") }',
+        'object Main extends App { println("oops" }',
+        'object Main extends App { ??? }',
+    ]
+    data = [{"conversations": [
+        {"from": "human", "value": f"prompt {i}"},
+        {"from": "assistant", "value": code},
+    ]} for i, code in enumerate(codes)]
+
+    report = local_client.validate_dataset(data, build=True)
+
+    assert (report["successful_runs"], report["total_snippets"]) == (1, 3)
+    assert [v["status"] for v in report["verdicts"]] == ["passed", "build_failed", "run_failed"]
+    assert [v["conversation"] for v in report["verdicts"]] == [0, 1, 2]
+    assert report["verdicts"][1]["error"]
@@ -0,0 +1,94 @@
+import sqlite3
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+from llama_finetune.evaluation_utils.code_generator import CodeGenerator
+
+
+def test_generate_code_batches_keep_prompt_order(tiny_model):
+    model, tokenizer = tiny_model
+    prompts = [
+        "write a scala program",
+        "write a scala program that prints hello world using akka actors",
+        "hello",
+        "akka streams and http",
+        "write hello world",
+    ]
+    # Greedy decoding: batching and padding must not change any output
+    one_by_one = CodeGenerator.generate_code(
+        model, tokenizer, prompts, max_new_tokens=6, batch_size=1, device="cpu"
+    )
+    batched = CodeGenerator.generate_code(
+        model, tokenizer, prompts, max_new_tokens=6, batch_size=3, device="cpu"
+    )
+    assert batched == one_by_one
+    assert tokenizer.padding_side == "right"
+
+
+def test_generate_records_hold_only_the_completion(tiny_model):
+    model, tokenizer = tiny_model
+    prompts = ["write a scala program that prints hello world", "hello"]
+    records = CodeGenerator.generate_records(
+        model, tokenizer, prompts, max_new_tokens=4, batch_size=2, device="cpu"
+    )
+    for prompt, record in zip(prompts, records):
+        assert record["prompt"] == prompt
+        assert prompt not in record["completion"]
+        # Chat template tokens: <s> <user> ... <assistant>
+        assert record["token_counts"]["prompt"] == len(prompt.split()) + 3
+        assert 0 < record["token_counts"]["completion"] <= 4
+
+
+def test_select_device_defaults_to_model_device(tiny_model):
+    model, _ = tiny_model
+    assert CodeGenerator.select_device(model).type == "cpu"
+    assert CodeGenerator.select_device(None).type in ("cpu", "cuda", "mps")
+
+
+def test_generation_cache_reuses_completions(tiny_model, tmp_path):
+    from llama_finetune.evaluation_utils.generation_cache import GenerationCache
+    model, tokenizer = tiny_model
+    cache = GenerationCache(str(tmp_path / "generations.sqlite"))
+    prompts = ["write a scala program", "hello", "akka streams"]
+    options = dict(max_new_tokens=4, batch_size=2, device="cpu", cache=cache)
+
+    first = CodeGenerator.generate_records(model, tokenizer, prompts, **options)
+    assert not any(record["cache_hit"] for record in first)
+    second = CodeGenerator.generate_records(model, tokenizer, prompts + ["http"], **options)
+    assert [record["cache_hit"] for record in second] == [True, True, True, False]
+    assert [record["completion"] for record in second[:3]] == [r["completion"] for r in first]
+
+    # Other sampling options are other completions
+    changed = CodeGenerator.generate_records(
+        model, tokenizer, prompts, **{**options, "max_new_tokens": 3}
+    )
+    assert not any(record["cache_hit"] for record in changed)
+
+
+def test_generation_cache_evicts_least_recently_used(tmp_path):
+    from llama_finetune.evaluation_utils.generation_cache import GenerationCache
+    cache = GenerationCache(str(tmp_path / "generations.sqlite"), max_entries=2)
+    record = {"completion": "x", "token_counts": {"prompt": 1, "completion": 1}}
+    cache.put("a", record)
+    cache.put("b", record)
+    assert cache.get("a") is not None
+    cache.put("c", record)
+    assert len(cache) == 2
+    assert cache.get("b") is None and cache.get("a") is not None
+
+
+def test_generation_cache_evicts_beyond_max_bytes(tmp_path):
+    from llama_finetune.evaluation_utils.generation_cache import GenerationCache
+    path = str(tmp_path / "generations.sqlite")
+    cache = GenerationCache(path, max_bytes=10)
+    for key, completion in [("a", "xxxx"), ("b", "xxxx"), ("a", "xxxxxx")]:
+        cache.put(key, {"completion": completion, "token_counts": {"prompt": 1, "completion": 1}})
+    assert len(cache) == 2
+    cache.put("c", {"completion": "xxxx", "token_counts": {"prompt": 1, "completion": 1}})
+    assert cache.get("b") is None and cache.get("a") is not None
+
+    # The running totals match the table, also when reopened
+    with sqlite3.connect(path) as conn:
+        assert dict(conn.execute("SELECT name, value FROM totals")) == {"entries": 2, "bytes": 10}
+    assert len(GenerationCache(path, max_bytes=10)) == 2
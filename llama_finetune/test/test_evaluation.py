@@ -39,5 +39,133 @@ def test_convert_pairs_to_json(setup_test_dir):
     assert result is not None
 
 
+def test_validate_samples_in_memory(local_client):
+    from llama_finetune.evaluate import validate_samples
+    samples = [
+        {"prompt": "Print hello", "code": 'object Main extends App { println("hello") }'},
+        {"prompt": "Print broken", "code": "object Main extends App { println(1 }"},
+        {"prompt": "Print nothing", "code": ""},
+    ]
+    report = validate_samples(samples, client=local_client)
+    assert report["total_snippets"] == 3
+    assert [v["conversation"] for v in report["verdicts"]] == [0, 1, 2]
+    assert [v["status"] for v in report["verdicts"]][::2] == ["passed", "empty"]
+    assert not report["verdicts"][1]["success"]
+
+
+def test_evaluate_samples_validates_while_generating(tiny_model, local_client):
+    pytest.importorskip("torch")
+    from llama_finetune.evaluate import evaluate_samples
+    model, tokenizer = tiny_model
+    examples = [
+        {"prompt": prompt, "reference": "object Main extends App { println(1) }"}
+        for prompt in ["hello", "write a scala program", "akka streams", "write hello world", "http"]
+    ]
+    results, avg_bleu, report = evaluate_samples(
+        model, tokenizer, examples, local_client, validation_workers=2, queue_size=1,
+        max_new_tokens=4, batch_size=2, device="cpu",
+    )
+    # Batches are validated out of order, but results stay in example order
+    assert [r["prompt"] for r in results] == [e["prompt"] for e in examples]
+    assert [v["conversation"] for v in report["verdicts"]] == [0, 1, 2, 3, 4]
+    assert report["total_snippets"] == 5
+    assert all(r["execution_status"] == v["status"] for r, v in zip(results, report["verdicts"]))
+    assert avg_bleu == sum(r["bleu"] for r in results) / 5
+
+    performance = report["performance"]
+    assert performance["batches"] == 3
+    assert performance["generated_tokens"] == sum(r["token_counts"]["completion"] for r in results)
+    assert performance["prompt_tokens"] == sum(r["token_counts"]["prompt"] for r in results)
+    assert 0 < performance["prefill_seconds"] / 3 == performance["time_to_first_token_seconds"]
+    assert performance["tokens_per_second"] > 0 and performance["snippets_per_second"] > 0
+    assert performance["build_check_seconds"] > 0 and performance["total_seconds"] > 0
+
+
+def test_evaluate_pass_at_k_checks_each_distinct_completion_once(tiny_model, local_client):
+    pytest.importorskip("torch")
+    from llama_finetune.evaluate import evaluate_pass_at_k
+    model, tokenizer = tiny_model
+    examples = [
+        {"prompt": prompt, "reference": "object Main extends App { println(1) }"}
+        for prompt in ["hello", "write a scala program", "akka streams"]
+    ]
+    # One new token from a tiny vocabulary: many samples are identical
+    results, _, report = evaluate_pass_at_k(
+        model, tokenizer, examples, local_client, num_samples=6, ks=(1, 5, 10),
+        max_new_tokens=1, batch_size=12, device="cpu", seed=0,
+    )
+    assert [len(r["samples"]) for r in results] == [6, 6, 6]
+    assert report["total_snippets"] == 18
+    distinct = {s["completion"].strip() for r in results for s in r["samples"]}
+    assert report["unique_snippets"] == len(distinct) < 18
+    assert [(v["conversation"], v["snippet"]) for v in report["verdicts"]][:7] == [
+        (0, 0), (0, 1), (0, 2), (0, 3), (0, 4), (0, 5), (1, 0)
+    ]
+    assert set(report["pass_at_k"]) == {"pass@1", "pass@5"}
+    pass_rate = sum(r["num_correct"] for r in results) / 18
+    assert report["pass_at_k"]["pass@1"] == pytest.approx(pass_rate)
+
+
+def test_merged_shards_match_a_single_process_run(tiny_model, tmp_path, monkeypatch):
+    pytest.importorskip("torch")
+    import json
+    from llama_finetune import evaluate
+
+    monkeypatch.setattr(evaluate, "RESULTS_DIR", str(tmp_path / "results"))
+    monkeypatch.setenv("BUILD_CHECKER_TRANSPORT", "local")
+    monkeypatch.setenv("BUILD_CHECKER_EXECUTOR", "fake")
+    monkeypatch.setenv("BUILD_CHECKER_STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setenv("BUILD_CHECKER_FAILING_SNIPPETS", str(tmp_path / "failing_snippets.json"))
+    monkeypatch.setenv("BUILD_CHECKER_WORKSPACES_DIR", str(tmp_path / "workspaces"))
+    test_set = tmp_path / "test_set.json"
+    test_set.write_text(json.dumps([
+        {"conversations": [{"from": "human", "value": prompt}, {"from": "assistant", "value": "hello world"}]}
+        for prompt in ["hello", "write a scala program", "akka streams", "write hello world", "http"]
+    ]))
+    model, tokenizer = tiny_model
+
+    def run(prefix, shard=None):
+        return evaluate.evaluate_model(
+            model, tokenizer, str(test_set), 10, prefix, use_generation_cache=False, shard=shard
+        )
+
+    single_file, single_bleu, single_info = run("single")
+    partial_files = [run("sharded", (i, 2))[0] for i in range(2)]
+    assert all("_shard" in path for path in partial_files)
+    merged_file, merged_bleu, merged_info = evaluate.merge_evaluation_results(
+        partial_files[::-1], "merged"
+    )
+
+    with open(single_file) as f:
+        single = json.load(f)
+    with open(merged_file) as f:
+        merged = json.load(f)
+    assert merged_bleu == pytest.approx(single_bleu) and merged_info == single_info
+    assert merged["bleu_scope"] == single["bleu_scope"] == "completion"
+    # Counters add up over the shards, each of which generated one batch
+    assert merged["performance"]["batches"] == 2
+    for name in ("prompt_tokens", "generated_tokens"):
+        assert merged["performance"][name] == single["performance"][name]
+    for results in (single, merged):
+        del results["timestamp"]
+        del results["performance"]
+        # The shards reuse the verdicts the single run cached
+        for record in results["detailed_results"] + results["execution_check"]["verdicts"]:
+            record.pop("cache_hit")
+    assert merged == single
+
+    with pytest.raises(ValueError):
+        evaluate.merge_evaluation_results(partial_files[:1], "incomplete")
+
+    # Partial results whose BLEU covered the prompt too cannot be averaged with the others
+    with open(partial_files[0]) as f:
+        partial = json.load(f)
+    del partial["bleu_scope"]
+    with open(partial_files[0], "w") as f:
+        json.dump(partial, f)
+    with pytest.raises(ValueError):
+        evaluate.merge_evaluation_results(partial_files, "mixed")
+
+
 if __name__ == '__main__':
     pytest.main()
\ No newline at end of file
@@ -77,5 +77,15 @@ class TestMetricsCalculator(unittest.TestCase):
         self.assertEqual(results, [])
         self.assertEqual(avg_bleu, 0)
 
+    def test_pass_at_k(self):
+        from math import comb
+        # Matches 1 - C(n - c, k) / C(n, k)
+        for n, c, k in [(10, 3, 1), (10, 3, 5), (20, 1, 10), (5, 0, 2)]:
+            expected = 1 - comb(n - c, k) / comb(n, k)
+            self.assertAlmostEqual(MetricsCalculator.pass_at_k(n, c, k), expected, places=9)
+        # pass@1 is the pass rate; too few failures for k samples always passes
+        self.assertAlmostEqual(MetricsCalculator.pass_at_k(4, 1, 1), 0.25)
+        self.assertEqual(MetricsCalculator.pass_at_k(10, 8, 3), 1.0)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,65 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+from llama_finetune.evaluation_utils.stopping_criteria import (
+    CodeBlockStoppingCriteria,
+    code_end,
+    trim_completion,
+)
+
+FENCED = '```scala\nobject Main extends App {\n  println("}")\n}\n```'
+UNFENCED = "object Main extends App {\n  println('{') // }\n}"
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (FENCED + "\n\nThis program prints a brace.", FENCED),
+        ("Here it is:\n" + FENCED + "\n```scala\nobject B", "Here it is:\n" + FENCED),
+        (UNFENCED + "\n\nThis program prints a brace.", UNFENCED),
+        (UNFENCED + "\n\n**Explanation**", UNFENCED),
+        (UNFENCED + "\n```", UNFENCED),
+    ],
+)
+def test_trim_completion_drops_what_follows_the_code(text, expected):
+    assert trim_completion(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '```scala\nobject Main { val fence = "```" }\n',
+        UNFENCED + "\n\nobject Other {\n}\n",
+        UNFENCED + "\nMain",
+        "object Main {\n  def f = 1\n",
+    ],
+)
+def test_code_end_waits_for_complete_code(text):
+    assert code_end(text) is None
+
+
+class CharTokenizer:
+    """One token per character, 0 being padding."""
+
+    def encode(self, text):
+        return [ord(c) for c in text]
+
+    def decode(self, ids, skip_special_tokens=False):
+        return "".join(chr(i) for i in ids.tolist() if i)
+
+
+def test_stopping_criteria_stops_each_row_independently():
+    tokenizer = CharTokenizer()
+    prompt = tokenizer.encode("prompt:")
+    completions = [FENCED + "\nThis never gets generated", "```scala\nobject Main {"]
+    criteria = CodeBlockStoppingCriteria(tokenizer, prompt_length=len(prompt))
+
+    stopped_at = [None, None]
+    for step in range(1, max(map(len, completions)) + 1):
+        rows = [prompt + tokenizer.encode(c[:step].ljust(step, "\0")) for c in completions]
+        done = criteria(torch.tensor(rows), None)
+        for row, finished in enumerate(done.tolist()):
+            if finished and stopped_at[row] is None:
+                stopped_at[row] = step
+    assert stopped_at == [len(FENCED), None]
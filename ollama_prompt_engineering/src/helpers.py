@@ -9,12 +9,16 @@ sys.path.extend([str(ROOT_DIR), str(LLAMA_FINETUNE_DIR)])
 
 from evaluation_utils.metrics_calculator import MetricsCalculator
 
-def process_variation_result(result, client, variation_metrics, prompt_variation_metrics, debug_response):
+def extract_code(response: str) -> str:
+    """Strip the markdown code fence the models wrap their answer in, if any."""
+    return response.strip('`').replace('scala\n', '', 1) if response.startswith('```') else response
+
+def process_variation_result(result, verdict, variation_metrics, prompt_variation_metrics, debug_response):
+    """Record the BLEU score and the build checker `verdict` of one variation."""
     print("\n" + "-" * 30)
     print(f"Variation: {result['variation_name']}")
     print(f"Time taken: {result['time_taken']:.2f} seconds")
-    response = result["response"]
-    code = response.strip('`').replace('scala\n', '', 1) if response.startswith('```') else response
+    code = extract_code(result["response"])
     
     if debug_response:
         print("\nResponse:")
@@ -40,19 +44,10 @@ def process_variation_result(result, client, variation_metrics, prompt_variation
         }
     
     variation_metrics[result['variation_name']]['bleu_scores'].append(bleu_score)
-    data_content = json.dumps([{
-        "conversations": [
-            {"from": "human", "value": result["prompt"]},
-            {"from": "assistant", "value": code}
-        ]
-    }])
-    
     if debug_response:
-        print("\033[92m" + data_content + "\033[0m")
-    
-    successful_runs, total_snippet = client.process_dataset_inline_content(
-        json.loads(data_content), run=True
-    )
+        print("\033[92m" + verdict["message"] + "\033[0m")
+
+    successful_runs, total_snippet = int(verdict["success"]), 1
     print(f"Build Check: {successful_runs}/{total_snippet} snippets ran successfully")
     
     # Update metrics
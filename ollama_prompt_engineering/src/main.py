@@ -16,6 +16,7 @@ from evaluation_utils.build_client import BuildCheckerClient
 
 # Import helper functions
 from helpers import (
+    extract_code,
     process_variation_result,
     print_prompt_summary,
     save_evaluation_results,
@@ -44,6 +45,9 @@ def main():
     test_set_path = Path(__file__).parent.parent / "res" / "test_set.json"
     test_prompts = load_test_prompts(test_set_path)
 
+    # One pooled client for the whole run; snippets are sent in batches
+    client = BuildCheckerClient()
+
     models = ["llama3.2", "qwen2.5"]
     # models = ["llama3.2"]
     # models = ["qwen2.5"]
@@ -54,40 +58,26 @@ def main():
             print(f"\n=== Evaluating {model} ===")
             evaluator = SimpleModelEvaluator(model_name=model)
             results = evaluator.evaluate_prompts(test_prompts)
-            client = BuildCheckerClient()
+            verdicts = client.check_snippets(
+                [
+                    {"prompt": result["prompt"], "code": extract_code(result["response"])}
+                    for result in results
+                ],
+                run=True,
+            )
 
             total_successful_runs = 0
             total_snippets = 0
 
-            for result in results:
+            for result, verdict in zip(results, verdicts):
                 print(f"\nEvaluating prompt: {result['prompt']}")
                 print(f"Time taken: {result['time_taken']:.2f} seconds")
 
-                code = (
-                    result["response"].strip("`").replace("scala\n", "", 1)
-                    if result["response"].startswith("```")
-                    else result["response"]
-                )
-                data_content = json.dumps(
-                    [
-                        {
-                            "conversations": [
-                                {"from": "human", "value": result["prompt"]},
-                                {"from": "assistant", "value": code},
-                            ]
-                        }
-                    ]
-                )
-
-                successful_runs, total_snippet = client.process_dataset_inline_content(
-                    json.loads(data_content), run=True
-                )
-                print(
-                    f"Build Check: {successful_runs}/{total_snippet} snippets ran successfully"
-                )
+                successful_runs = int(verdict["success"])
+                print(f"Build Check: {successful_runs}/1 snippets ran successfully")
 
                 total_successful_runs += successful_runs
-                total_snippets += total_snippet
+                total_snippets += 1
 
             print(f"\nFinal Results for {model}:")
             print(f"Total running code snippets: {total_successful_runs}/{total_snippets}")
@@ -117,12 +107,18 @@ def main():
                 variations = evaluator.create_variations(prompt)
                 results = evaluator.evaluate_prompt_variations(prompt, variations)
                 all_results.extend(results)
-                client = BuildCheckerClient()  # Create the client for this prompt
+                verdicts = client.check_snippets(
+                    [
+                        {"prompt": result["prompt"], "code": extract_code(result["response"])}
+                        for result in results
+                    ],
+                    run=True,
+                )
 
-                for result in results:
+                for result, verdict in zip(results, verdicts):
                     successful_runs, total_snippet = process_variation_result(
                         result,
-                        client,
+                        verdict,
                         variation_metrics,
                         prompt_variation_metrics,
                         debug_response,
@@ -160,6 +156,8 @@ def main():
             save_evaluation_results(all_results, f"pe_results_{model}.json")
             save_final_report(total_successful_runs, total_snippets, variation_metrics, f"pe_report_{model}.md")
 
+    client.close()
+
 
 if __name__ == "__main__":
     main()
@@ -41,6 +41,16 @@ def extract_prompt_and_code(generated_text):
 
     return prompt, code
 
+def extract_result_prompt_and_code(result):
+    """
+    Prompt and generated code of an evaluation result. Results that store the
+    prompt next to the completion are used as they are; older results that only
+    hold the full decoded conversation in `generated` are parsed.
+    """
+    if "prompt" in result:
+        return result["prompt"], result.get("generated", "")
+    return extract_prompt_and_code(result.get("generated", ""))
+
 def save_to_file(directory, idx, prompt, code, file_extension='.txt'):
     """
     Save the prompt and code to separate files within the specified directory.
@@ -92,8 +102,7 @@ def process_evaluation_results(json_path, output_dir, file_extension='.scala', f
 
     saved_files = []
     for idx, result in enumerate(detailed_results, 1):
-        generated_text = result.get('generated', '')
-        prompt, code = extract_prompt_and_code(generated_text)
+        prompt, code = extract_result_prompt_and_code(result)
         if not prompt:
             prompt = 'Prompt not found.'
         if not code: